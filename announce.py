@@ -5,6 +5,7 @@ import asyncio
 import pytz
 from dotenv import load_dotenv
 import os
+from templates import get_template, template_fields
 
 # Get channel ID's from .env
 load_dotenv()
@@ -165,6 +166,8 @@ class AnnouncementCog(commands.Cog):
                             "time3": f"<t:{int(time3.timestamp())}:F>",
                             "time4": f"<t:{int(time4.timestamp())}:F>",
                         }
+                        # offer the times; pass on only the ones the template uses (delay_announcement rejects extras)
+                        subs = {k: v for k, v in subs.items() if k in template_fields("Schedule")}
                         await delay_cog.delay_announcement(ctx, lower_message, scheduled_time, substitutions=subs)
                     else:
                         # For wonder pick or voting end, pass the substitutions dictionary (user_pack_data) if available.
@@ -316,6 +319,8 @@ class AnnouncementCog(commands.Cog):
                         "time3": f"<t:{int(time3.timestamp())}:F>",
                         "time4": f"<t:{int(time4.timestamp())}:F>",
                     }
+                    # offer the times; pass on only the ones the template uses (delay_announcement rejects extras)
+                    subs = {k: v for k, v in subs.items() if k in template_fields("Schedule")}
                     await delay_cog.delay_announcement(ctx, message, scheduled_time, substitutions=subs)
                 else:
                     await delay_cog.delay_announcement(ctx, message, scheduled_time)
@@ -429,18 +434,8 @@ class AnnouncementCog(commands.Cog):
             await ctx.send(error_msg)
 
     async def get_announcement(self, message, test_mode=False):
-        file_to_open = 'testannouncements.txt' if test_mode else 'announcements.txt'
-        try:
-            with open(file_to_open, 'r', encoding='utf-8') as file:
-                content = file.read()
-                announcements = content.split('===')
-            for announcement in announcements:
-                lines = announcement.strip().splitlines()
-                if lines and lines[0].strip().lower() == message.lower():
-                    return "\n".join(lines[1:])
-        except Exception as e:
-            print(f'Error reading announcements: {str(e)}')
-        return None
+        # parsed once per file version by the shared registry (templates.py)
+        return get_template(message, test_mode=test_mode)
 
     async def process_announcement(self, channel, selected_announcement, message):
         await channel.send(selected_announcement)
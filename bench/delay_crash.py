@@ -0,0 +1,215 @@
+"""
+Crash-consistency check for delay_store.DelayStore (SQLite, WAL).
+
+    python -m bench.delay_crash                  # 200 kill rounds
+    python -m bench.delay_crash --rounds 1000 --max-ms 50
+
+Each round starts a child process that opens the store and applies random
+schedule / warn / cancel operations as fast as it can, printing each one
+before it runs and again once it has committed. The parent SIGKILLs the
+child at a random moment, reopens the database and checks that:
+  - PRAGMA integrity_check is "ok";
+  - every acknowledged operation is there, and the one in flight (if any)
+    is either fully there or not at all.
+The run starts from an old-style delayed_announcements.json, so early kills
+can land inside the one-time import, which must be all-or-nothing.
+
+Only the standard library is needed.
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from delay_store import DelayStore
+
+JSON_ROWS = 300
+
+
+def sample_ann(rng):
+    return {
+        "name": rng.choice(["schedule", "activity check", "wonder pick 1", "voting"]),
+        "announce_channel": rng.randrange(1, 4),
+        "input_channel": 10,
+        "author": rng.randrange(100, 105),
+        "substitutions": {"CHECKTIME": "<t:0:F>"} if rng.random() < 0.3 else None,
+        "warned": False,
+    }
+
+
+# ─── Child: hammer the store until killed ───────────────
+def child(db, json_path, seed):
+    rng = random.Random(seed)
+    out = sys.stdout
+    store = DelayStore(db)
+    if json_path and os.path.exists(json_path):
+        out.write("I\n")
+        out.flush()
+        store.import_json(json_path)
+        out.write("ok\n")
+        out.flush()
+    rows = {ann["id"]: ann["due_at"] for anns in store.load().values() for ann in anns}
+    while True:
+        op = rng.random()
+        if op < 0.6 or not rows:
+            due = rng.randrange(1_000, 1_050)
+            ann = sample_ann(rng)
+            out.write(f"A {due} {json.dumps(ann)}\n")
+            out.flush()
+            ann_id = store.add(due, ann)
+            rows[ann_id] = due
+            out.write(f"ok {ann_id}\n")
+        elif op < 0.8:
+            ann_id = rng.choice(list(rows))
+            out.write(f"W {ann_id}\n")
+            out.flush()
+            store.mark_warned(ann_id)
+            out.write("ok\n")
+        else:
+            due = rows[rng.choice(list(rows))]
+            out.write(f"R {due}\n")
+            out.flush()
+            store.remove_due(due)
+            rows = {i: d for i, d in rows.items() if d != due}
+            out.write("ok\n")
+        out.flush()
+
+
+# ─── Parent: kill, reopen, verify ───────────────────────
+def snapshot(db):
+    conn = sqlite3.connect(db)
+    try:
+        check = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        rows = {
+            row[0]: (row[1], bool(row[2]))
+            for row in conn.execute("SELECT id, due_at, warned FROM delayed_announcements")
+        }
+        imported = conn.execute("SELECT 1 FROM delay_meta WHERE key = 'json_imported'").fetchone() is not None
+    finally:
+        conn.close()
+    return check, rows, imported
+
+
+def apply(state, op, ann_id=None):
+    """`state` ({id: (due_at, warned)}) after one parsed operation; adds need the row id."""
+    state = dict(state)
+    kind = op[0]
+    if kind == "A":
+        state[ann_id] = (op[1], False)
+    elif kind == "W":
+        if op[1] in state:
+            state[op[1]] = (state[op[1]][0], True)
+    elif kind == "R":
+        state = {i: v for i, v in state.items() if v[0] != op[1]}
+    return state
+
+
+def parse(line):
+    parts = line.split(" ", 2)
+    if parts[0] in ("W", "R"):
+        return (parts[0], int(parts[1]))
+    if parts[0] == "A":
+        return ("A", int(parts[1]))
+    return (parts[0],)
+
+
+def run_round(n, db, json_path, import_rows, expected, was_imported, args, rng):
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "bench.delay_crash", "--child", db, "--json", json_path or "", "--seed", str(n)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    time.sleep(rng.uniform(args.min_ms, args.max_ms) / 1000)
+    proc.send_signal(signal.SIGKILL)
+    output, _ = proc.communicate()
+    check, actual, imported = snapshot(db)
+    if check != "ok":
+        return f"integrity_check: {check}"
+
+    # replay acknowledged operations; the last intent may be unacknowledged
+    lines = output.splitlines()
+    in_flight = None
+    i = 0
+    while i < len(lines):
+        op = parse(lines[i])
+        ack = lines[i + 1].split() if i + 1 < len(lines) else []
+        acked = bool(ack) and ack[0] == "ok"
+        if op[0] == "I":
+            # the import runs before any other write, into an empty table
+            if imported and not was_imported:
+                expected = dict(import_rows)
+            elif acked and not imported:
+                return "import acknowledged but its marker is missing"
+            elif not imported and actual:
+                return "import not committed but rows present"
+        elif acked:
+            expected = apply(expected, op, int(ack[1]) if op[0] == "A" else None)
+        else:
+            in_flight = op
+        i += 2 if acked else 1
+
+    if actual == expected:
+        return None
+    if in_flight is not None and in_flight[0] != "I":
+        # an add in flight may have committed under the next id
+        new_id = max(actual, default=0)
+        if actual == apply(expected, in_flight, new_id):
+            return None
+    missing = expected.keys() - actual.keys()
+    extra = actual.keys() - expected.keys()
+    return f"state mismatch: {len(missing)} missing, {len(extra)} unexpected, in flight {in_flight}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--min-ms", type=float, default=60.0, help="earliest kill after spawn (child startup included)")
+    parser.add_argument("--max-ms", type=float, default=250.0, help="latest kill after spawn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", metavar="DB", help=argparse.SUPPRESS)
+    parser.add_argument("--json", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.json, args.seed)
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="delay_crash_")
+    db = os.path.join(workdir, "delayed_announcements.db")
+    json_path = os.path.join(workdir, "delayed_announcements.json")
+    legacy = {}
+    for _ in range(JSON_ROWS):
+        legacy.setdefault(str(rng.randrange(900, 1_000)), []).append(sample_ann(rng))
+    with open(json_path, "w") as f:
+        json.dump(legacy, f, indent=4)
+    # ids the import hands out: file order, starting at 1
+    import_rows = {
+        i: (int(ts), False)
+        for i, ts in enumerate((ts for ts, anns in legacy.items() for _ in anns), 1)
+    }
+
+    expected, imported = {}, False
+    started = time.perf_counter()
+    failures = 0
+    for n in range(args.rounds):
+        error = run_round(n, db, json_path, import_rows, expected, imported, args, rng)
+        if error:
+            failures += 1
+            print(f"   ✗ round {n}: {error}")
+        # the next round starts from whatever survived
+        _, expected, imported = snapshot(db)
+    _, rows, imported = snapshot(db)
+    print(
+        f"{args.rounds} kill rounds in {time.perf_counter() - started:.1f}s · {len(rows)} rows left · "
+        f"JSON imported: {imported} · {failures} failure(s)"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
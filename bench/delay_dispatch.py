@@ -0,0 +1,109 @@
+"""
+Delivery time for a batch of delayed announcements that come due together.
+
+    python -m bench.delay_dispatch                       # 12 announcements over 4 channels
+    python -m bench.delay_dispatch --announcements 40 --channels 8 --send-ms 250
+
+Runs DelayedAnnouncements.send_due against fake channels whose send() sleeps
+for --send-ms (a REST round trip), once with one channel at a time (the old
+serial behaviour) and once with DELAY_DISPATCH_CONCURRENCY slots. Checks
+that every channel received its announcements in scheduling order and that
+each input channel got exactly one confirmation.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+# delay.py reads its channel ids at import time
+for key in ("ANNOUNCEMENT_CHANNEL_ID", "TEST_ANNOUNCEMENT_CHANNEL_ID", "SCHEDULE_CHANNEL_ID", "ACTIVITY_CHECK_CHANNEL_ID"):
+    os.environ.setdefault(key, "1")
+
+
+class FakeChannel:
+    def __init__(self, channel_id, send_s, log):
+        self.id = channel_id
+        self.send_s = send_s
+        self.log = log
+
+    async def send(self, content=None, embed=None):
+        await asyncio.sleep(self.send_s)
+        self.log.append((self.id, content))
+
+
+class FakeBot:
+    def __init__(self, channels):
+        self.channels = channels
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_cog(self, name):
+        return None
+
+
+async def run(delay, args, concurrency):
+    rng = random.Random(args.seed)
+    log = []
+    channels = {cid: FakeChannel(cid, args.send_ms / 1000, log) for cid in range(1, args.channels + 1)}
+    inputs = {cid: FakeChannel(cid, args.send_ms / 1000, log) for cid in range(100, 103)}
+    cog = delay.DelayedAnnouncements(FakeBot({**channels, **inputs}))
+    cog.dispatch_slots = asyncio.Semaphore(concurrency)
+    due = [
+        {"id": i, "name": f"notice {i}", "announce_channel": rng.choice(list(channels)),
+         "input_channel": rng.choice(list(inputs)), "author": 1, "substitutions": None, "warned": False}
+        for i in range(args.announcements)
+    ]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):    # per-send DEBUG lines, missing-template notice
+        await cog.send_due(int(time.time()), due, 0)
+    elapsed = time.perf_counter() - started
+    cog.store.close()
+
+    errors = []
+    for cid in channels:
+        sent = [content for ch, content in log if ch == cid]
+        wanted = [f"Announcement notice {d['id']} is now due." for d in due if d["announce_channel"] == cid]
+        if sent != wanted:
+            errors.append(f"channel {cid}: out of order or missing")
+    for cid in {d["input_channel"] for d in due}:
+        confirms = [c for ch, c in log if ch == cid and c.startswith("Announcement confirmed")]
+        if len(confirms) != 1:
+            errors.append(f"input channel {cid}: {len(confirms)} confirmations")
+    busiest = max(sum(d["announce_channel"] == cid for d in due) for cid in channels)
+    return elapsed, busiest, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--announcements", type=int, default=12)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--send-ms", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="delay_dispatch_")
+    os.environ["DELAY_DB"] = os.path.join(workdir, "delayed_announcements.db")
+    os.chdir(workdir)                      # no announcements.txt here: every item uses the fallback text
+    import delay
+
+    failures = 0
+    for label, concurrency in (("serial", 1), (f"{delay.DISPATCH_CONCURRENCY} slots", delay.DISPATCH_CONCURRENCY)):
+        elapsed, busiest, errors = asyncio.run(run(delay, args, concurrency))
+        failures += len(errors)
+        print(
+            f"{label:>10}: {args.announcements} announcements over {args.channels} channels in {elapsed * 1000:7.0f} ms "
+            f"(busiest channel: {busiest} sends ≈ {busiest * args.send_ms:.0f} ms)"
+        )
+        for error in errors:
+            print(f"   ✗ {error}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,575 @@
+"""
+Offline load test for PollCog: real handlers, fake Discord and Postgres.
+
+    python -m bench.poll_load                    # 5 polls, 20 s, 100 votes/s
+    python -m bench.poll_load --polls 20 --duration 60 --votes 400 --rest-ms 80
+    python -m bench.poll_load --fail-p99-ms 250  # exit 1 if any handler's p99 is slower
+
+Polls are created through PollCog._create_poll on a fake channel. Then
+synthetic interactions arrive at the requested rates (Poisson arrivals)
+and go through the same entry points as real clicks:
+  vote    → PollCog.route("vote") / vote_callback (+ the confirm prompt, sometimes);
+            on ranked polls (every third one) → RankedBallotView picks + Submit
+  add     → PollCog.route("add") → AddOptionModal.on_submit
+  edit    → ⚙️ → Edit → EditPollModal.on_submit
+  export  → ⚙️ → Export Votes → CSV → PollCog.export_poll
+Every fake REST call and SQL statement sleeps for --rest-ms / --db-ms and is
+counted. The coalesced edits, journal flushes and retention loop run as they
+would in production. The report gives p50/p99 latency per handler, REST
+calls and SQL statements by kind, and memory growth (RSS, plus Python heap
+with --tracemalloc). At the end every poll must pass PollState.check(); a
+violation counts as an error and fails the run.
+
+Needs discord.py and pytz from requirements.txt; no token, network or
+database is used.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+# poll.py reads its role ids from the environment at import time
+PLAYER_ROLE = int(os.environ.setdefault("PLAYER_ROLE_ID", "900000000000000001"))
+VOTE_PENDING_ROLE = int(os.environ.setdefault("VOTE_PENDING_ROLE_ID", "900000000000000002"))
+_snowflakes = itertools.count(1400000000000000000)
+
+
+# ─── Fake REST / Postgres layer ─────────────────────────
+class Meter:
+    """Counts and delays every fake network call."""
+
+    def __init__(self, rest_ms, db_ms):
+        self.rest_delay = rest_ms / 1000
+        self.db_delay = db_ms / 1000
+        self.rest = Counter()
+        self.db = Counter()
+        self.db_rows = 0
+
+    async def call(self, route):
+        self.rest[route] += 1
+        if self.rest_delay:
+            await asyncio.sleep(self.rest_delay)
+
+    async def query(self, kind, sql, rows=1):
+        self.db[f"{kind} {sql.split()[0].upper()}"] += 1
+        self.db_rows += rows
+        if self.db_delay:
+            await asyncio.sleep(self.db_delay)
+
+
+class FakeTransaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """Enough of asyncpg's Connection/Pool API for poll_store and VoteJournal."""
+
+    def __init__(self, meter):
+        self.meter = meter
+
+    async def execute(self, sql, *args):
+        await self.meter.query("execute", sql)
+        verb = sql.split()[0].upper()
+        return {"UPDATE": "UPDATE 1", "INSERT": "INSERT 0 1", "DELETE": "DELETE 0"}.get(verb, verb)
+
+    async def executemany(self, sql, rows):
+        rows = list(rows)
+        await self.meter.query("executemany", sql, len(rows))
+
+    async def fetch(self, sql, *args):
+        await self.meter.query("fetch", sql)
+        return []
+
+    async def fetchrow(self, sql, *args):
+        await self.meter.query("fetchrow", sql)
+        return None
+
+    async def fetchval(self, sql, *args):
+        await self.meter.query("fetchval", sql)
+        return None
+
+    def transaction(self):
+        return FakeTransaction()
+
+
+class FakePool(FakeConnection):
+    def acquire(self):
+        pool = self
+
+        class _Acquire:
+            async def __aenter__(self):
+                return FakeConnection(pool.meter)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Acquire()
+
+
+# ─── Fake Discord objects ───────────────────────────────
+class FakeRole:
+    def __init__(self, role_id, name, position=1):
+        self.id = role_id
+        self.name = name
+        self.position = position
+        self.members = []
+        self.mention = f"<@&{role_id}>"
+
+
+class FakeMember:
+    def __init__(self, meter, member_id, name, roles=()):
+        self.meter = meter
+        self.id = member_id
+        self.display_name = name
+        self.roles = list(roles)
+        self.bot = False
+        self.top_role = self.roles[-1] if self.roles else FakeRole(0, "@everyone", 0)
+        self.mention = f"<@{member_id}>"
+
+    def get_role(self, role_id):
+        return next((r for r in self.roles if r.id == role_id), None)
+
+    async def add_roles(self, *roles, reason=None):
+        await self.meter.call("member.add_roles")
+
+    async def remove_roles(self, *roles, reason=None):
+        await self.meter.call("member.remove_roles")
+
+
+class FakeGuild:
+    def __init__(self, meter):
+        self.id = next(_snowflakes)
+        self.meter = meter
+        self.roles = {}
+        self.members = {}
+        self.filesize_limit = 10 * 1024 * 1024
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    async def query_members(self, *, user_ids, limit=100):
+        await self.meter.call("guild.query_members")
+        return [self.members[u] for u in user_ids if u in self.members]
+
+
+class FakeMessage:
+    def __init__(self, channel, content=None, embed=None, view=None):
+        self.id = next(_snowflakes)
+        self.channel = channel
+        self.content = content
+        self.embeds = [embed] if embed else []
+        self.view = view
+
+    async def edit(self, *, content=..., embed=None, view=None, **kwargs):
+        await self.channel.meter.call("message.edit")
+        if content is not ...:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+        self.view = view
+
+    async def delete(self):
+        await self.channel.meter.call("message.delete")
+
+
+class FakeChannel:
+    def __init__(self, meter, guild):
+        self.id = next(_snowflakes)
+        self.meter = meter
+        self.guild = guild
+        self.messages = {}
+
+    async def send(self, content=None, *, embed=None, view=None, **kwargs):
+        await self.meter.call("channel.send")
+        msg = FakeMessage(self, content, embed, view)
+        self.messages[msg.id] = msg
+        return msg
+
+    async def fetch_message(self, message_id):
+        await self.meter.call("channel.fetch_message")
+        return self.messages[message_id]
+
+    def get_partial_message(self, message_id):
+        return self.messages[message_id]
+
+
+class FakeResponse:
+    """interaction.response; remembers the last view/modal sent so the driver can click through."""
+
+    def __init__(self, meter):
+        self.meter = meter
+        self.done = False
+        self.view = None
+        self.modal = None
+
+    def is_done(self):
+        return self.done
+
+    async def _respond(self, kind):
+        if self.done:
+            raise RuntimeError(f"interaction already responded to ({kind})")
+        self.done = True
+        await self.meter.call("interaction.response")
+
+    async def send_message(self, content=None, *, view=None, **kwargs):
+        self.view = view
+        await self._respond("send_message")
+
+    async def defer(self, **kwargs):
+        await self._respond("defer")
+
+    async def send_modal(self, modal):
+        self.modal = modal
+        await self._respond("send_modal")
+
+    async def edit_message(self, **kwargs):
+        await self._respond("edit_message")
+
+
+class FakeFollowup:
+    def __init__(self, meter):
+        self.meter = meter
+        self.files = 0
+
+    async def send(self, content=None, *, files=None, **kwargs):
+        self.files += len(files or [])
+        await self.meter.call("interaction.followup")
+
+
+class FakeInteraction:
+    def __init__(self, bot, user, channel, message=None):
+        self.id = next(_snowflakes)
+        self.client = bot
+        self.user = user
+        self.channel = channel
+        self.guild = channel.guild
+        self.message = message
+        self.response = FakeResponse(bot.meter)
+        self.followup = FakeFollowup(bot.meter)
+
+
+class FakeContext:
+    def __init__(self, channel, author):
+        self.channel = channel
+        self.author = author
+        self.guild = channel.guild
+
+    async def send(self, *args, **kwargs):
+        return await self.channel.send(*args, **kwargs)
+
+
+class FakeBot:
+    def __init__(self, meter, channel):
+        self.meter = meter
+        self.pg_pool = FakePool(meter)
+        self.channel = channel
+        self.user = FakeMember(meter, next(_snowflakes), "PollBot")
+        self.cogs = {}
+
+    def get_channel(self, channel_id):
+        return self.channel if channel_id == self.channel.id else None
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    def add_dynamic_items(self, *items):
+        pass
+
+    def remove_dynamic_items(self, *items):
+        pass
+
+
+def fill(modal_input, value):
+    """Set a modal field the way discord.py does when the modal is submitted."""
+    modal_input._value = value
+
+
+def choose(select, value):
+    """Set a select's picked value the way discord.py does when the user picks."""
+    select._values = [value]
+
+
+def button(view, label):
+    return next(item for item in view.children if getattr(item, "label", None) == label)
+
+
+# ─── Load driver ────────────────────────────────────────
+class LoadTest:
+    def __init__(self, poll_module, args):
+        self.pm = poll_module
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.meter = Meter(args.rest_ms, args.db_ms)
+        self.guild = FakeGuild(self.meter)
+        self.channel = FakeChannel(self.meter, self.guild)
+        self.bot = FakeBot(self.meter, self.channel)
+        self.latency = defaultdict(list)
+        self.errors = Counter()
+        self.polls = []         # (PollState, FakeMessage)
+
+        player = FakeRole(PLAYER_ROLE, "Player", 1)
+        pending = FakeRole(VOTE_PENDING_ROLE, "Vote Pending", 2)
+        moderator = FakeRole(next(_snowflakes), "Moderator", 3)
+        self.guild.roles = {r.id: r for r in (player, pending, moderator)}
+        self.bot.user.top_role = FakeRole(next(_snowflakes), "Bot", 10)
+        self.guild.members[self.bot.user.id] = self.bot.user
+        self.author = FakeMember(self.meter, next(_snowflakes), "Moderator", [moderator])
+        self.members = []
+        for i in range(args.members):
+            member = FakeMember(self.meter, next(_snowflakes), f"Player {i}", [player])
+            player.members.append(member)
+            self.guild.members[member.id] = member
+            self.members.append(member)
+
+    def interaction(self, user, message=None):
+        return FakeInteraction(self.bot, user, self.channel, message)
+
+    async def timed(self, kind, handler):
+        started = time.perf_counter()
+        try:
+            await handler()
+        except Exception as e:
+            self.errors[kind] += 1
+            if self.errors[kind] <= 3:
+                print(f"   ✗ {kind}: {type(e).__name__}: {e}")
+            return
+        self.latency[kind].append(time.perf_counter() - started)
+
+    # ── operations ─────────────────────────────────────
+    async def create(self, n):
+        options = [f"Pack {i}" for i in range(1, self.rng.randint(3, 6) + 1)]
+        end = datetime.now(timezone.utc) + timedelta(days=1)
+        await self.cog._create_poll(
+            FakeContext(self.channel, self.author),
+            question=f"Load test poll {n}?", options=options,
+            multiple=n % 3 == 1, ranked=n % 3 == 2, end_time=end,
+        )
+        message = max(self.channel.messages.values(), key=lambda m: m.id)
+        self.polls.append((self.cog.polls[message.id], message))
+
+    async def vote(self):
+        poll, message = self.rng.choice(self.polls)
+        user = self.rng.choice(self.members)
+        pos = self.rng.randrange(len(poll.options))
+        inter = self.interaction(user, message)
+        if poll.ranked is not None:
+            return await self.ballot(poll, message, user, inter)
+        await self.timed("vote", lambda: self.cog.route(inter, "vote", pos))
+        if self.rng.random() < self.args.redeliver:
+            # Discord delivers the same interaction again: must be dropped without a second response
+            await self.timed("redelivery", lambda: self.cog.route(inter, "vote", pos))
+        if self.rng.random() < self.args.double_tap:
+            tap = self.interaction(user, message)
+            await self.timed("double tap", lambda: self.cog.route(tap, "vote", pos))
+        prompt = inter.response.view
+        if prompt is not None and self.rng.random() < self.args.confirm:
+            confirm = self.interaction(user, message)
+            await self.timed("vote confirm", lambda: prompt.children[0].callback(confirm))
+
+    async def ballot(self, poll, message, user, inter):
+        async def run():
+            await self.cog.route(inter, "rank")
+            view = inter.response.view
+            for _ in range(self.rng.randint(1, len(poll.options))):
+                select = view.children[0]
+                if not isinstance(select, discord.ui.Select):
+                    break                                   # an edit dropped options mid-ballot
+                choose(select, self.rng.choice(select.options).value)
+                await select.callback(self.interaction(user, message))
+            await button(view, "Submit ballot").callback(self.interaction(user, message))
+
+        await self.timed("ranked ballot", run)
+
+    async def add(self):
+        poll, message = self.rng.choice(self.polls)
+        click = self.interaction(self.author, message)
+
+        async def run():
+            await self.cog.route(click, "add")
+            modal = click.response.modal
+            fill(modal.new_option, f"Extra {next(_snowflakes) % 100000}")
+            await modal.on_submit(self.interaction(self.author, message))
+
+        await self.timed("add option", run)
+
+    async def edit(self):
+        poll, message = self.rng.choice(self.polls)
+        options = list(poll.options)
+        if len(options) > 4:
+            options.pop()                                   # drop one (its votes go)
+        else:
+            options[0], options[1] = options[1], options[0] # swap (votes move)
+
+        async def run():
+            settings = self.interaction(self.author, message)
+            await self.cog.route(settings, "settings")
+            click = self.interaction(self.author, message)
+            await button(settings.response.view, "Edit").callback(click)
+            modal = click.response.modal
+            fill(modal.question, poll.question)
+            fill(modal.mentions, poll.mention_text)
+            fill(modal.end_time, modal.end_time.default or "")
+            fill(modal.options, "\n".join(options))
+            await modal.on_submit(self.interaction(self.author, message))
+
+        await self.timed("edit poll", run)
+
+    async def export(self):
+        poll, message = self.rng.choice(self.polls)
+
+        async def run():
+            settings = self.interaction(self.author, message)
+            await self.cog.route(settings, "settings")
+            click = self.interaction(self.author, message)
+            await button(settings.response.view, "Export Votes").callback(click)
+            await button(click.response.view, "CSV").callback(self.interaction(self.author, message))
+
+        await self.timed("export votes", run)
+
+    # ── run ─────────────────────────────────────────────
+    def arrivals(self):
+        """Merged Poisson arrival times for every operation over the run."""
+        out = []
+        for rate, op in ((self.args.votes, self.vote), (self.args.adds, self.add),
+                         (self.args.edits, self.edit), (self.args.exports, self.export)):
+            t = 0.0
+            while rate > 0:
+                t += self.rng.expovariate(rate)
+                if t >= self.args.duration:
+                    break
+                out.append((t, op))
+        out.sort(key=lambda a: a[0])
+        return out
+
+    async def run(self):
+        self.cog = self.pm.PollCog(self.bot)
+        self.bot.cogs["PollCog"] = self.cog
+        await self.cog.cog_load()
+        await self.cog.on_ready()
+
+        rss_start = self.pm.rss_mib()
+        heap_start = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        for n in range(self.args.polls):
+            await self.timed("create poll", lambda n=n: self.create(n))
+
+        plan = self.arrivals()
+        tasks = []
+        started = time.perf_counter()
+        for at, op in plan:
+            delay = at - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(op()))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        # let the last coalesced edits and the journal flush land
+        await asyncio.sleep(self.pm.POLL_RENDER_WINDOW + 0.1)
+        await self.cog.cog_unload()
+        # count invariants on every poll after the mixed traffic
+        for poll, _ in self.polls:
+            for problem in poll.check():
+                self.errors["poll state"] += 1
+                if self.errors["poll state"] <= 3:
+                    print(f"   ✗ poll {poll.id}: {problem}")
+
+        return self.report(len(plan), elapsed, rss_start, heap_start)
+
+    def report(self, ops, elapsed, rss_start, heap_start):
+        def pct(xs, q):
+            return xs[min(len(xs) - 1, int(q * len(xs)))] * 1000
+
+        a = self.args
+        print(f"{a.polls} polls · {a.members} members · {ops:,} interactions in {elapsed:.1f}s "
+              f"({ops / elapsed:,.0f}/s) · REST {a.rest_ms:g} ms · SQL {a.db_ms:g} ms\n")
+        print(f"{'handler':>14} | {'count':>7} | {'p50 ms':>8} | {'p99 ms':>8} | {'max ms':>8} | {'errors':>6}")
+        print("-" * 66)
+        slow = []
+        for kind in ("create poll", "vote", "redelivery", "double tap", "vote confirm", "ranked ballot",
+                     "add option", "edit poll", "export votes"):
+            xs = sorted(self.latency.get(kind, []))
+            if not xs and not self.errors[kind]:
+                continue
+            p50, p99, top = (pct(xs, 0.5), pct(xs, 0.99), xs[-1] * 1000) if xs else (0, 0, 0)
+            print(f"{kind:>14} | {len(xs):>7,} | {p50:>8.1f} | {p99:>8.1f} | {top:>8.1f} | {self.errors[kind]:>6}")
+            if a.fail_p99_ms and p99 > a.fail_p99_ms:
+                slow.append(kind)
+
+        print("\nREST calls")
+        for route, n in sorted(self.meter.rest.items()):
+            print(f"   {route:<28} {n:>8,}")
+        print(f"   {'total':<28} {sum(self.meter.rest.values()):>8,}")
+        print("\nSQL statements")
+        for kind, n in sorted(self.meter.db.items()):
+            print(f"   {kind:<28} {n:>8,}")
+        print(f"   {'rows written/read':<28} {self.meter.db_rows:>8,}")
+
+        dedup = self.cog.seen_interactions
+        print(f"\nDedup: {dedup.hits:,} redelivered click(s) dropped, {self.cog.double_taps:,} double tap(s) absorbed")
+        render = self.cog.render.stats()
+        print(f"\nRender: {render['votes_received']:,} re-render requests → {render['edits_sent']:,} edits "
+              f"({render['edits_saved']:,} coalesced, {render['edits_skipped']:,} identical skipped)")
+        print(f"Memory: RSS {rss_start:.1f} → {self.pm.rss_mib():.1f} MiB", end="")
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            print(f" · Python heap +{(current - heap_start) / 1024:,.0f} KiB (peak +{(peak - heap_start) / 1024:,.0f} KiB)")
+        else:
+            print()
+
+        print(f"PollState.check: {len(self.polls)} poll(s), {self.errors['poll state']} problem(s)")
+
+        failed = slow or sum(self.errors.values())
+        if slow:
+            print(f"\np99 above {a.fail_p99_ms:g} ms: {', '.join(slow)}")
+        return not failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=5)
+    parser.add_argument("--members", type=int, default=500, help="@Player members who vote")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of traffic")
+    parser.add_argument("--votes", type=float, default=100.0, help="vote clicks per second")
+    parser.add_argument("--adds", type=float, default=0.5, help="add-option submits per second")
+    parser.add_argument("--edits", type=float, default=0.5, help="edit-poll submits per second")
+    parser.add_argument("--exports", type=float, default=0.2, help="exports per second")
+    parser.add_argument("--confirm", type=float, default=0.7, help="share of change/remove prompts confirmed")
+    parser.add_argument("--redeliver", type=float, default=0.01, help="share of vote clicks Discord delivers twice")
+    parser.add_argument("--double-tap", type=float, default=0.02, help="share of vote clicks tapped twice")
+    parser.add_argument("--rest-ms", type=float, default=50.0, help="latency of each fake REST call")
+    parser.add_argument("--db-ms", type=float, default=1.0, help="latency of each fake SQL statement")
+    parser.add_argument("--render-window", type=float, default=2.0, help="POLL_RENDER_WINDOW for the run")
+    parser.add_argument("--tracemalloc", action="store_true", help="also trace Python heap growth (slower)")
+    parser.add_argument("--fail-p99-ms", type=float, default=0.0, help="exit 1 if any handler's p99 exceeds this")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="poll_load_")
+    # poll.py reads its configuration at import time
+    os.environ["POLL_JOURNAL_PATH"] = os.path.join(workdir, "poll_journal.jsonl")
+    os.environ["POLL_RENDER_WINDOW"] = str(args.render_window)
+    import poll
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    ok = asyncio.run(LoadTest(poll, args).run())
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
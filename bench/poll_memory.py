@@ -0,0 +1,121 @@
+"""
+Resident memory of loaded polls: the old free-form poll dict vs. PollState.
+
+    python -m bench.poll_memory                  # 1,000 polls, 40 voters each
+    python -m bench.poll_memory --polls 5000 --voters 200
+
+The dict side is what PollCog used to keep per poll after a JSON reload:
+string user-id keys, label-keyed vote_count, and the per-poll runtime keys
+(cog, build_embed, bound button_callback). Discord View objects are left out
+of both sides since they're the same either way.
+"""
+import argparse
+import json
+import random
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from poll_state import PollState
+
+OPTIONS = [f"Pack {i}" for i in range(1, 11)]
+
+
+class _Cog:
+    async def vote_callback(self, interaction):
+        pass
+
+
+def _build_embed(poll):
+    pass
+
+
+def make_doc(poll_id, voters, rng):
+    """A poll as it used to be stored in polls.data (JSON-encoded)."""
+    n_opts = rng.randint(2, len(OPTIONS))
+    options = OPTIONS[:n_opts]
+    multiple = rng.random() < 0.3
+    user_votes = {}
+    for uid in rng.sample(range(10**17, 10**17 + 10**6), voters):
+        if multiple:
+            user_votes[str(uid)] = rng.sample(options, rng.randint(1, min(3, n_opts)))
+        else:
+            user_votes[str(uid)] = rng.choice(options)
+    counts = {opt: 0 for opt in options}
+    for vote in user_votes.values():
+        for opt in (vote if isinstance(vote, list) else [vote]):
+            counts[opt] += 1
+    return json.dumps({
+        "id": str(1300000000000000000 + poll_id),
+        "question": f"Which pack should we open in cycle {poll_id}?",
+        "options": options,
+        "vote_count": counts,
+        "total_votes": sum(counts.values()),
+        "user_votes": user_votes,
+        "voting_type": "multiple" if multiple else "single",
+        "author": "Moderator",
+        "author_id": 111111111111111111,
+        "mention": True,
+        "mention_text": "<@&222222222222222222>",
+        "end_time": (datetime.now(timezone.utc) + timedelta(hours=12)).isoformat(),
+        "end_time_str": "01/01 12:00",
+        "one_hour_reminder": True,
+        "channel_id": 333333333333333333,
+        "closed": False,
+        "embed_color": 0x00BFFF,
+    })
+
+
+def load_dicts(blobs, cog):
+    polls = {}
+    for blob in blobs:
+        poll = json.loads(blob)
+        poll["end_time"] = datetime.fromisoformat(poll["end_time"])
+        poll["cog"] = cog
+        poll["build_embed"] = _build_embed
+        poll["button_callback"] = cog.vote_callback
+        polls[int(poll["id"])] = poll
+    return polls
+
+
+def load_states(blobs):
+    polls = {}
+    for blob in blobs:
+        state = PollState.from_legacy(json.loads(blob))
+        polls[state.id] = state
+    return polls
+
+
+def measure(load, *args):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    polls = load(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return polls, current - base, peak - base
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=1000, help="number of loaded polls")
+    parser.add_argument("--voters", type=int, default=40, help="voters per poll")
+    args = parser.parse_args()
+    rng = random.Random(0)
+    blobs = [make_doc(i, args.voters, rng) for i in range(args.polls)]
+    cog = _Cog()
+
+    dicts, dict_bytes, dict_peak = measure(load_dicts, blobs, cog)
+    states, state_bytes, state_peak = measure(load_states, blobs)
+    assert all(
+        sum(states[pid].counts) == dicts[pid]["total_votes"] for pid in dicts
+    ), "PollState counts disagree with the dict tallies"
+
+    print(f"{args.polls:,} polls × {args.voters} voters")
+    print(f"{'model':>10} | {'retained KiB':>12} | {'bytes/poll':>10} | {'peak KiB':>9}")
+    print("-" * 50)
+    for name, retained, peak in (("dict", dict_bytes, dict_peak), ("PollState", state_bytes, state_peak)):
+        print(f"{name:>10} | {retained / 1024:>12,.1f} | {retained / args.polls:>10,.0f} | {peak / 1024:>9,.1f}")
+    print(f"\nPollState keeps {state_bytes / dict_bytes:.0%} of the dict model's memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Startup time and memory: eager rehydration of every stored poll vs. lazy startup.
+
+    python -m bench.poll_startup                       # 2,000 polls, 5% open, 100 voters each
+    python -m bench.poll_startup --polls 10000 --open-share 0.02 --voters 300
+
+Both modes read the same generated poll_meta / poll_options / poll_votes rows
+from an in-memory fake pool (bench.poll_load's fakes; no database):
+  eager  what on_ready did before lazy loading: load every poll, open or
+         closed, keep it in memory and build and register its poll view and
+         SettingsView. It doesn't schedule jobs, so the old cost is, if
+         anything, understated.
+  lazy   the real PollCog.cog_load + on_ready: only open polls, paged
+         (POLL_LOAD_PAGE); closed ones are materialized by get_poll on the
+         first click, which is timed separately.
+Each mode runs in a fresh subprocess, so the RSS figures don't mix. It
+reports wall time, RSS growth and the Python heap still held afterwards
+(tracemalloc).
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from bench.poll_load import FakeBot, FakeChannel, FakeGuild, FakePool, Meter
+
+
+# ─── Generated rows ─────────────────────────────────────
+def make_rows(args, channel_id):
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    metas, options, votes = [], [], []
+    for n in range(args.polls):
+        pid = 1_300_000_000_000_000_000 + n
+        is_open = rng.random() < args.open_share
+        metas.append({
+            "id": pid, "channel_id": channel_id, "question": f"Which pack next, round {n}?",
+            "author": "Moderator", "author_id": 111, "voting_type": "single", "mention_text": "",
+            "end_time": now + timedelta(days=1) if is_open else now - timedelta(days=rng.randint(1, 300)),
+            "end_time_str": None, "one_hour_reminder": False, "closed": not is_open,
+            "ended_by": None, "embed_color": None, "reminder_status": None,
+        })
+        n_opts = rng.randint(2, 10)
+        options += [{"poll_id": pid, "position": i, "label": f"Pack {i + 1}"} for i in range(n_opts)]
+        votes += [
+            {"poll_id": pid, "user_id": 10_000 + u, "position": rng.randrange(n_opts), "rank": None}
+            for u in range(args.voters)
+        ]
+    return metas, options, votes
+
+
+class RowPool(FakePool):
+    """FakePool that answers poll_store's load queries from generated rows."""
+
+    def __init__(self, meter, metas, options, votes):
+        super().__init__(meter)
+        self.metas = metas
+        self.options_by, self.votes_by = {}, {}
+        for o in options:
+            self.options_by.setdefault(o["poll_id"], []).append(o)
+        for v in votes:
+            self.votes_by.setdefault(v["poll_id"], []).append(v)
+
+    async def fetch(self, sql, *args):
+        if "FROM poll_meta" in sql and "NOT closed" in sql:
+            last_id, limit = args
+            return [m for m in self.metas if not m["closed"] and m["id"] > last_id][:limit]
+        if "FROM poll_options" in sql:
+            return [o for pid in args[0] for o in self.options_by.get(pid, ())]
+        if "FROM poll_votes" in sql:
+            return [v for pid in args[0] for v in self.votes_by.get(pid, ())]
+        return await super().fetch(sql, *args)
+
+    async def fetchrow(self, sql, *args):
+        if "FROM poll_meta WHERE id" in sql:
+            return next((m for m in self.metas if m["id"] == args[0]), None)
+        return await super().fetchrow(sql, *args)
+
+
+class ViewBot(FakeBot):
+    def __init__(self, meter, channel):
+        super().__init__(meter, channel)
+        self.views = []
+
+    def add_view(self, view, *, message_id=None):
+        self.views.append((message_id, view))
+
+
+# ─── One mode, in a child process ───────────────────────
+async def eager(pm, poll_store, bot, metas):
+    cog = pm.PollCog(bot)
+    polls = await poll_store._load_rows(bot.pg_pool, metas)
+    for poll in polls:
+        cog.polls[poll.id] = poll
+        bot.add_view(cog.build_poll_view(poll), message_id=poll.id)
+        bot.add_view(pm.SettingsView(cog, poll, poll.id), message_id=poll.id)
+    return cog, len(polls), None
+
+
+async def lazy(pm, poll_store, bot, metas):
+    cog = pm.PollCog(bot)
+    bot.cogs["PollCog"] = cog
+    await cog.cog_load()
+    await cog.on_ready()
+    loaded = len(cog.polls)
+    # first click on a long-closed poll: materialized on demand
+    closed_id = next(m["id"] for m in metas if m["closed"])
+    started = time.perf_counter()
+    assert await cog.get_poll(closed_id) is not None
+    first_click = time.perf_counter() - started
+    return cog, loaded, first_click
+
+
+def child(mode, args):
+    workdir = tempfile.mkdtemp(prefix="poll_startup_")
+    # poll.py reads its configuration at import time
+    os.environ["POLL_JOURNAL_PATH"] = os.path.join(workdir, "poll_journal.jsonl")
+    import poll
+    import poll_store
+
+    async def main():
+        meter = Meter(0, 0)
+        channel = FakeChannel(meter, FakeGuild(meter))
+        metas, options, votes = make_rows(args, channel.id)
+        bot = ViewBot(meter, channel)
+        bot.pg_pool = RowPool(meter, metas, options, votes)
+        gc.collect()
+        rss_before = poll.rss_mib()
+        tracemalloc.start()
+        heap_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        cog, loaded, first_click = await (eager if mode == "eager" else lazy)(poll, poll_store, bot, metas)
+        seconds = time.perf_counter() - started
+        gc.collect()
+        heap = tracemalloc.get_traced_memory()[0] - heap_before
+        tracemalloc.stop()
+        result = {
+            "mode": mode, "loaded": loaded, "views": len(bot.views), "seconds": seconds,
+            "rss": poll.rss_mib() - rss_before, "heap": heap, "first_click": first_click,
+        }
+        if mode == "lazy":
+            await cog.cog_unload()
+        return result
+
+    print(json.dumps(asyncio.run(main())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=2000, help="polls stored in total")
+    parser.add_argument("--open-share", type=float, default=0.05, help="share of stored polls still open")
+    parser.add_argument("--voters", type=int, default=100, help="votes per poll")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", choices=("eager", "lazy"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child, args)
+
+    print(f"{args.polls:,} stored polls · {args.open_share:.0%} open · {args.voters} votes each\n")
+    print(f"{'mode':>6} | {'polls in memory':>15} | {'views':>6} | {'startup':>9} | {'RSS':>10} | {'heap held':>10}")
+    print("-" * 72)
+    results = {}
+    for mode in ("eager", "lazy"):
+        out = subprocess.run(
+            [sys.executable, "-m", "bench.poll_startup", "--child", mode, "--polls", str(args.polls),
+             "--open-share", str(args.open_share), "--voters", str(args.voters), "--seed", str(args.seed)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        r = results[mode] = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:>6} | {r['loaded']:>15,} | {r['views']:>6,} | {r['seconds'] * 1000:>6,.0f} ms | "
+              f"{r['rss']:>+6.1f} MiB | {r['heap'] / 2**20:>6.1f} MiB")
+    e, l = results["eager"], results["lazy"]
+    print(f"\nlazy vs eager: {e['seconds'] / max(l['seconds'], 1e-9):.1f}x faster startup, "
+          f"{e['heap'] / max(l['heap'], 1):.1f}x less heap held; "
+          f"first click on a closed poll: {l['first_click'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Per-vote write cost: whole-document JSONB rewrite vs. normalized poll_votes row.
+
+    python -m bench.poll_storage                 # offline: payload bytes + encode time
+    DATABASE_URL=postgres://... python -m bench.poll_storage --db
+                                                 # also time real round trips (temp tables)
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+
+VOTER_COUNTS = (10, 100, 500, 1000, 5000)
+OPTIONS = [f"Pack {i}" for i in range(1, 11)]
+
+
+def make_poll(voters):
+    """A poll dict shaped like the one PollCog used to dump into polls.data."""
+    poll = {
+        "id": "1234567890123456789",
+        "question": "Which pack should we open next cycle?",
+        "options": OPTIONS[:],
+        "vote_count": {opt: 0 for opt in OPTIONS},
+        "total_votes": 0,
+        "user_votes": {},
+        "voting_type": "single",
+        "author": "Moderator",
+        "author_id": 111111111111111111,
+        "mention": True,
+        "mention_text": "<@&222222222222222222>",
+        "end_time": datetime.now(timezone.utc) + timedelta(hours=12),
+        "one_hour_reminder": True,
+        "channel_id": 333333333333333333,
+        "closed": False,
+        "embed_color": 0x00BFFF,
+    }
+    for uid in range(400000000000000000, 400000000000000000 + voters):
+        opt = random.choice(OPTIONS)
+        poll["user_votes"][uid] = opt
+        poll["vote_count"][opt] += 1
+    poll["total_votes"] = voters
+    return poll
+
+
+def blob(poll):
+    return json.dumps(poll, default=lambda o: o.isoformat() if hasattr(o, "isoformat") else str(o))
+
+
+def offline(rounds):
+    print(f"{'voters':>7} | {'blob bytes/vote':>15} | {'blob encode µs':>14} | "
+          f"{'row bytes/vote':>14} | {'row encode µs':>13}")
+    print("-" * 76)
+    for voters in VOTER_COUNTS:
+        poll = make_poll(voters)
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            payload = blob(poll).encode()
+        blob_us = (time.perf_counter() - t0) / rounds * 1e6
+
+        t0 = time.perf_counter()
+        for i in range(rounds):
+            # binary wire size of (poll_id BIGINT, user_id BIGINT, position SMALLINT)
+            row = struct.pack("!qqh", 1234567890123456789, 400000000000000000 + i, i % 10)
+        row_us = (time.perf_counter() - t0) / rounds * 1e6
+        print(f"{voters:>7} | {len(payload):>15,} | {blob_us:>14.1f} | {len(row):>14} | {row_us:>13.2f}")
+
+
+async def online(votes):
+    import asyncpg
+    conn = await asyncpg.connect(os.environ["DATABASE_URL"])
+    try:
+        await conn.execute("""
+            CREATE TEMP TABLE bench_polls (id TEXT PRIMARY KEY, data JSONB NOT NULL);
+            CREATE TEMP TABLE bench_votes (
+              poll_id BIGINT, user_id BIGINT, position SMALLINT,
+              PRIMARY KEY (poll_id, user_id, position));
+        """)
+        print(f"\n{'voters':>7} | {'blob ms/vote':>12} | {'row ms/vote':>11} | {'speed-up':>8}")
+        print("-" * 50)
+        for voters in VOTER_COUNTS:
+            poll = make_poll(voters)
+            await conn.execute("INSERT INTO bench_polls VALUES('p', $1::jsonb) "
+                               "ON CONFLICT (id) DO UPDATE SET data = EXCLUDED.data", blob(poll))
+            t0 = time.perf_counter()
+            for i in range(votes):
+                poll["user_votes"][500000000000000000 + i] = OPTIONS[i % 10]
+                await conn.execute("UPDATE bench_polls SET data = $1::jsonb WHERE id = 'p'", blob(poll))
+            blob_ms = (time.perf_counter() - t0) / votes * 1e3
+
+            t0 = time.perf_counter()
+            for i in range(votes):
+                await conn.execute(
+                    "INSERT INTO bench_votes VALUES($1, $2, $3) ON CONFLICT DO NOTHING",
+                    voters, 500000000000000000 + i, i % 10
+                )
+            row_ms = (time.perf_counter() - t0) / votes * 1e3
+            print(f"{voters:>7} | {blob_ms:>12.3f} | {row_ms:>11.3f} | {blob_ms / row_ms:>7.1f}x")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200, help="encode repetitions per size")
+    parser.add_argument("--db", action="store_true", help="also measure against DATABASE_URL")
+    parser.add_argument("--votes", type=int, default=200, help="votes written per size with --db")
+    args = parser.parse_args()
+    random.seed(0)
+    offline(args.rounds)
+    if args.db:
+        asyncio.run(online(args.votes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Concurrency stress test for poll vote application, through PollCog's real handlers.
+
+    python -m bench.poll_votes                   # 5,000 clicks from 300 users on 10 options
+    python -m bench.poll_votes --clicks 50000 --users 2000 --naive
+
+Thousands of simulated clicks run as concurrent asyncio tasks against a
+PollCog on the fake Discord/Postgres layer from bench.poll_load. Each one
+goes through PollCog.route("vote") → vote_callback → apply_vote; when
+the handler opens a remove/change prompt, the click waits (the user
+thinking) and then presses Confirm or Cancel, so prompts and fresh clicks
+interleave. After the burst the script checks the count invariants
+(PollState.check) and that replaying the vote journal gives exactly the
+in-memory votes. It then opens prompts on the single-choice poll, closes
+the poll, and confirms them: nothing may change after the close.
+It also prints clicks/sec for the whole burst and for the bare apply step.
+
+--naive also runs the old dict-based check-then-act handlers on the same
+click stream, to show the drift the serialized apply step prevents.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from bench.poll_load import FakeContext, LoadTest
+from poll_state import PollState
+
+
+async def click(load, message, user, pos, rng, args, stats):
+    """One button press through PollCog.route, plus Confirm/Cancel on any prompt it opens."""
+    await asyncio.sleep(rng.random() * 0.01)            # arrival jitter
+    inter = load.interaction(user, message)
+    await load.cog.route(inter, "vote", pos)
+    prompt = inter.response.view
+    if prompt is None:
+        return
+    stats["prompts"] += 1
+    await asyncio.sleep(rng.random() * 0.02)            # the user reads "Change / remove your vote?"
+    confirm = rng.random() < args.confirm
+    await prompt.children[0 if confirm else 1].callback(load.interaction(user, message))
+
+
+async def naive_click(poll, uid, choice, rng):
+    """The pre-PollState single-choice handler: decide, await the prompt, then mutate."""
+    await asyncio.sleep(rng.random() * 0.01)
+    prev = poll["user_votes"].get(uid)
+    if prev == choice:
+        await asyncio.sleep(rng.random() * 0.02)
+        poll["vote_count"][choice] -= 1
+        poll["user_votes"].pop(uid, None)
+        poll["total_votes"] -= 1
+    elif prev:
+        await asyncio.sleep(rng.random() * 0.02)
+        poll["vote_count"][prev] -= 1
+        poll["user_votes"][uid] = choice
+        poll["vote_count"][choice] += 1
+    else:
+        poll["user_votes"][uid] = choice
+        poll["vote_count"][choice] += 1
+        poll["total_votes"] += 1
+
+
+def naive_problems(poll):
+    expected = {opt: 0 for opt in poll["options"]}
+    for vote in poll["user_votes"].values():
+        expected[vote] += 1
+    problems = [f"{opt}: count {poll['vote_count'][opt]} != {n} voters"
+                for opt, n in expected.items() if poll["vote_count"][opt] != n]
+    if poll["total_votes"] != len(poll["user_votes"]):
+        problems.append(f"total_votes {poll['total_votes']} != {len(poll['user_votes'])} voters")
+    return problems
+
+
+def replay(journal, poll_id):
+    """Net (user, position) votes implied by the journal, in append order."""
+    rows = set()
+    for e in journal.buffer:
+        if e["poll_id"] != str(poll_id):
+            continue
+        key = (e["user_id"], e["position"])
+        if e["op"] == "add":
+            rows.add(key)
+        else:
+            rows.discard(key)
+    return rows
+
+
+async def close_during_prompts(load, poll, message, rng):
+    """Open remove/change prompts, close the poll, then confirm them all; returns problems."""
+    voters = [m for m in load.members if m.id in poll.user_votes][:50]
+    prompts = []
+    await asyncio.sleep(load.pm.POLL_DOUBLE_TAP + 0.05)  # these aren't double taps of the burst's clicks
+    for user in voters:
+        inter = load.interaction(user, message)
+        pos = poll.user_votes[user.id] if rng.random() < 0.5 else rng.randrange(len(poll.options))
+        await load.cog.route(inter, "vote", pos)
+        if inter.response.view is not None:
+            prompts.append((user, inter.response.view))
+    before = (sorted(poll.vote_rows()), load.cog.journal.events_appended)
+    await load.cog._close_poll_job(poll.id)
+    for user, prompt in prompts:
+        await prompt.children[0].callback(load.interaction(user, message))
+    after = (sorted(poll.vote_rows()), load.cog.journal.events_appended)
+    problems = [] if before == after else [f"{len(prompts)} prompts confirmed after close changed the votes"]
+    print(f"  closed | {len(prompts):>7,} prompts confirmed after the poll closed | "
+          f"{'OK' if not problems else 'FAIL'}")
+    return problems
+
+
+async def run(poll_module, args, stream, rng):
+    load = LoadTest(poll_module, argparse.Namespace(seed=args.seed, rest_ms=args.rest_ms, db_ms=0.0, members=args.users))
+    load.cog = poll_module.PollCog(load.bot)
+    load.bot.cogs["PollCog"] = load.cog
+    await load.cog.cog_load()
+    await load.cog.on_ready()
+    ok = True
+    try:
+        for voting_type in ("single", "multiple"):
+            await load.cog._create_poll(
+                FakeContext(load.channel, load.author), question=f"Stress test ({voting_type})?",
+                options=[f"Option {i}" for i in range(args.options)], multiple=voting_type == "multiple",
+                end_time=datetime.now(timezone.utc) + timedelta(days=1),
+            )
+            message = max(load.channel.messages.values(), key=lambda m: m.id)
+            poll = load.cog.polls[message.id]
+            poll.voters_of(0)   # build the reverse index up front so it's stress-tested too
+            stats = {"prompts": 0}
+            appended = load.cog.journal.events_appended
+            t0 = time.perf_counter()
+            await asyncio.gather(*(
+                click(load, message, load.members[uid], pos, rng, args, stats) for uid, pos in stream
+            ))
+            elapsed = time.perf_counter() - t0
+
+            problems = poll.check()
+            if replay(load.cog.journal, poll.id) != {(uid, pos) for _, uid, pos in poll.vote_rows()}:
+                problems.append("journal replay disagrees with in-memory votes")
+            print(f"{voting_type:>8} | {len(stream):>7,} clicks | {len(stream) / elapsed:>9,.0f} clicks/s | "
+                  f"{len(poll.user_votes):>6,} voters | {poll.total_votes:>6,} votes | "
+                  f"{stats['prompts']:>5,} prompts | {load.cog.journal.events_appended - appended:>7,} journaled | "
+                  f"{'OK' if not problems else 'FAIL'}")
+            if voting_type == "single":
+                problems += await close_during_prompts(load, poll, message, rng)
+            for p in problems[:10]:
+                print("   ✗", p)
+            ok &= not problems
+    finally:
+        await load.cog.cog_unload()
+    return ok
+
+
+def apply_throughput(args, rng):
+    poll = PollState(1, [f"Option {i}" for i in range(args.options)])
+    ops = [(rng.randrange(args.users), rng.randrange(args.options)) for _ in range(200_000)]
+    t0 = time.perf_counter()
+    for uid, pos in ops:
+        poll.apply(uid, 'set', pos)
+    elapsed = time.perf_counter() - t0
+    print(f"\nbare apply step: {len(ops) / elapsed:,.0f} votes/s ({elapsed / len(ops) * 1e6:.2f} µs/vote)")
+
+
+async def main_async(poll_module, args):
+    rng = random.Random(args.seed)
+    stream = [(rng.randrange(args.users), rng.randrange(args.options)) for _ in range(args.clicks)]
+    ok = await run(poll_module, args, stream, rng)
+
+    if args.naive:
+        poll = {"options": [f"Option {i}" for i in range(args.options)], "user_votes": {}, "total_votes": 0}
+        poll["vote_count"] = {opt: 0 for opt in poll["options"]}
+        await asyncio.gather(*(naive_click(poll, uid, poll["options"][pos], rng) for uid, pos in stream))
+        problems = naive_problems(poll)
+        print(f"\nold check-then-act handler: {len(problems)} invariant violation(s)")
+        for p in problems[:10]:
+            print("   ✗", p)
+
+    apply_throughput(args, rng)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clicks", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--options", type=int, default=10)
+    parser.add_argument("--confirm", type=float, default=0.7, help="share of change/remove prompts confirmed")
+    parser.add_argument("--rest-ms", type=float, default=5.0, help="latency of each fake REST call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--naive", action="store_true", help="also run the old handler logic for comparison")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="poll_votes_")
+    # poll.py reads its configuration at import time; no flush during the run, so the
+    # journal buffer holds every event for the replay check
+    os.environ["POLL_JOURNAL_PATH"] = os.path.join(workdir, "poll_journal.jsonl")
+    os.environ["POLL_JOURNAL_FLUSH"] = "3600"
+    # the whole burst lands within a second; with the double-tap window on, most
+    # repeats would be absorbed instead of toggling or opening a prompt
+    os.environ["POLL_DOUBLE_TAP"] = "0"
+    import poll
+
+    if not asyncio.run(main_async(poll, args)):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
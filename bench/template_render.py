@@ -0,0 +1,74 @@
+"""
+Render throughput for announcement templates: compiled vs. ad-hoc formatting.
+
+    python -m bench.template_render                        # templates from announcements.txt
+    python -m bench.template_render --file testannouncements.txt --seconds 2
+
+For every template with placeholders (Wonder Pick N, Voting End, Activity
+Check, ...) it times three ways of producing the final text:
+  - compiled: Template.render() from the shared registry (templates.py)
+  - format:   str.format(**subs) on the already-parsed template text
+  - reread:   the pre-registry path: read the file, split on "===", scan for
+              the title, then str.format (what every delayed send used to do)
+and checks that all three produce the same text.
+"""
+import argparse
+import sys
+import time
+
+from templates import TemplateFile
+
+
+def rate(fn, seconds):
+    """Calls per second of `fn` over roughly `seconds`."""
+    calls, batch = 0, 100
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        for _ in range(batch):
+            fn()
+        calls += batch
+        now = time.perf_counter()
+        if now >= deadline:
+            return calls / (now - started)
+
+
+def reread(path, title, subs):
+    with open(path, "r", encoding="utf-8") as file:
+        content = file.read()
+    for section in content.split("==="):
+        lines = section.strip().splitlines()
+        if lines and lines[0].strip().lower() == title.lower():
+            return "\n".join(lines[1:]).format(**subs)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default="announcements.txt")
+    parser.add_argument("--seconds", type=float, default=0.5, help="time spent per template and method")
+    args = parser.parse_args()
+
+    registry = TemplateFile(args.file)
+    mismatches = 0
+    print(f"{'template':<22}{'fields':>7}{'compiled/s':>13}{'format/s':>12}{'reread/s':>12}{'vs format':>11}")
+    for title in registry.titles():
+        template = registry.template(title)
+        if template.error or not template.fields:
+            continue
+        subs = {name: f"<{name.lower()} value>" for name in sorted(template.fields)}
+        text = template.text
+        expected = text.format(**subs)
+        if template.render(subs) != expected or reread(args.file, title, subs) != expected:
+            mismatches += 1
+            print(f"   ✗ {title}: outputs differ")
+            continue
+        compiled = rate(lambda: template.render(subs), args.seconds)
+        adhoc = rate(lambda: text.format(**subs), args.seconds)
+        old = rate(lambda: reread(args.file, title, subs), args.seconds)
+        print(f"{title:<22}{len(template.fields):>7}{compiled:>13,.0f}{adhoc:>12,.0f}{old:>12,.0f}{compiled / adhoc:>10.2f}x")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,86 +1,94 @@
 import discord
-from discord.ext import commands, tasks
-import json
-import os  # For safe file replacement
+from discord.ext import commands
+import os
+import re
+import time
+from collections import deque
 from datetime import datetime
 import pytz
 import asyncio
 from dotenv import load_dotenv
+from jobqueue import JobScheduler
+from delay_store import DelayStore
+from templates import compiled_template, get_template
 
-# File to store scheduled announcements
+# Old JSON store, imported into the database once and then renamed
 DELAY_FILE = "delayed_announcements.json"
-ANNOUNCEMENTS_FILE = "announcements.txt"  # Ensure this file exists
 
 # Get channel ID's from .env
 load_dotenv()
 
+# SQLite database holding pending delayed announcements
+DELAY_DB = os.getenv("DELAY_DB", "delayed_announcements.db")
+
 ANNOUNCEMENT_CHANNEL_ID = int(os.getenv("ANNOUNCEMENT_CHANNEL_ID"))
 TEST_ANNOUNCEMENT_CHANNEL_ID = int(os.getenv("TEST_ANNOUNCEMENT_CHANNEL_ID"))
 SCHEDULE_CHANNEL_ID = int(os.getenv("SCHEDULE_CHANNEL_ID"))
 ACTIVITY_CHECK_CHANNEL_ID = int(os.getenv("ACTIVITY_CHECK_CHANNEL_ID"))
 
+# Seconds before an announcement goes out that its author gets the cancel warning
+WARNING_LEAD = 300
+# Recent delivery lags kept for !!viewdelay
+LAG_HISTORY = 50
+# Channels sent to at once when several announcements come due together
+DISPATCH_CONCURRENCY = int(os.getenv("DELAY_DISPATCH_CONCURRENCY", "4"))
+
 class DelayedAnnouncements(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Load announcements from file into memory
+        # Pending announcements live in SQLite (one row each); memory mirrors them for the scheduler
+        self.store = DelayStore(DELAY_DB)
         self.delayed_announcements = self.load_delayed_announcements()
+        self.pending_count = sum(len(lst) for lst in self.delayed_announcements.values())
         self.lock = asyncio.Lock()
-        self.existing_announcements = self.load_announcements()
-        if not self.check_delays.is_running():
-            self.check_delays.start()
+        # one timer for every pending announcement and warning, armed for the earliest
+        self.jobs = JobScheduler("delay")
+        for ts in self.delayed_announcements:
+            self.schedule_jobs(ts)
+        # (name, due timestamp, seconds late) of the latest deliveries
+        self.lags = deque(maxlen=LAG_HISTORY)
+        # due announcements go out per channel: a few channels at a time, one send at a time in each
+        self.dispatch_slots = asyncio.Semaphore(DISPATCH_CONCURRENCY)
+        self.channel_locks = {}
+        self._starter = None
         # Debug statement output in powershell - temp removal
         #print("DEBUG: DelayedAnnouncementsCog initialized.")
-        
-    def cog_unload(self):
-        # Cancel the check_delays task when the cog unloads
-        self.check_delays.cancel()
 
-    def load_delayed_announcements(self):
-        """Load delayed announcements from the JSON file.
-           Expected structure: { "timestamp": [ann_dict, ...], ... }"""
-        if not os.path.exists(DELAY_FILE):
-            return {}
-        try:
-            with open(DELAY_FILE, "r") as file:
-                data = json.load(file)
-            # Convert keys to ints and ensure each value is a list.
-            return {int(k): (v if isinstance(v, list) else [v]) for k, v in data.items()}
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"Error loading JSON from {DELAY_FILE}: {e}")
-            return {}
+    async def cog_load(self):
+        # nothing is sent before the bot can resolve channels; overdue items go out right after
+        self._starter = asyncio.create_task(self._start_when_ready())
 
-    def save_delayed_announcements(self):
-        """Save the current delayed announcements to the JSON file safely using a temp file."""
-        try:
-            temp_file = DELAY_FILE + ".tmp"
-            with open(temp_file, "w") as file:
-                json.dump(self.delayed_announcements, file, indent=4)
-            os.replace(temp_file, DELAY_FILE)
-        except Exception as e:
-            print(f"Error saving JSON to {DELAY_FILE}: {e}")
+    async def _start_when_ready(self):
+        await self.bot.wait_until_ready()
+        self.jobs.start()
+
+    def cog_unload(self):
+        # Stop the scheduler when the cog unloads
+        if self._starter is not None:
+            self._starter.cancel()
+        self.jobs.stop()
+        self.store.close()
+
+    def schedule_jobs(self, ts):
+        """Arm the delivery (and, if not sent yet, the 5-minute warning) for one timestamp."""
+        self.jobs.schedule(("announce", ts), ts, lambda: self.deliver(ts), f"Announce at {ts}")
+        if not all(ann.get("warned", False) for ann in self.delayed_announcements.get(ts, [])):
+            self.jobs.schedule(("warn", ts), ts - WARNING_LEAD, lambda: self.warn(ts), f"Warn for {ts}")
 
-    def load_announcements(self):
-        """Load announcement names from announcements.txt."""
+    def load_delayed_announcements(self):
+        """Load pending announcements from the database, importing the old JSON file first if it's still there.
+           Structure: { timestamp: [ann_dict, ...], ... }"""
         try:
-            with open(ANNOUNCEMENTS_FILE, "r", encoding="utf-8") as file:
-                lines = file.read().splitlines()
-            return [line.strip().lower() for line in lines if line.strip()]
-        except FileNotFoundError:
-            return []
+            imported = self.store.import_json(DELAY_FILE)
+            if imported:
+                print(f"Imported {imported} delayed announcement(s) from {DELAY_FILE}")
+        except (OSError, ValueError) as e:
+            print(f"Error importing {DELAY_FILE}: {e}")
+        return self.store.load()
 
     async def get_announcement(self, message):
         """Retrieve the full announcement template text by name."""
-        try:
-            with open(ANNOUNCEMENTS_FILE, "r", encoding="utf-8") as file:
-                content = file.read()
-            announcements = content.split("===")
-            for announcement in announcements:
-                lines = announcement.strip().splitlines()
-                if lines and lines[0].strip().lower() == message.lower():
-                    return "\n".join(lines[1:])
-        except Exception as e:
-            print(f"Error reading announcements: {e}")
-        return None
+        return get_template(message)
 
     # ── Helper: Create a schedule embed matching your !!csch output ──
     def create_schedule_embed(self, schedule):
@@ -106,12 +114,18 @@ class DelayedAnnouncements(commands.Cog):
         """
         Schedule an announcement for a later time (format: MM/DD HH:MM).
         If the provided time is in the past or already used, prompt for a new time (or type 'exit' to cancel).
-        The optional substitutions dictionary is stored for later template formatting.
+        The optional substitutions dictionary is stored for later template formatting; it must
+        supply exactly the template's placeholders, so a bad one is refused now rather than at send time.
         """
         normalized_name = announcement_name.lower()
-        if normalized_name not in self.existing_announcements:
+        template = compiled_template(normalized_name)
+        if template is None:
             await ctx.send(f"Error: The announcement {announcement_name} does not exist.")
             return
+        problem = template.problem(substitutions)
+        if problem:
+            await ctx.send(f"Error: Can't schedule **{announcement_name}**: {problem}.")
+            return
 
         schedule_cog = self.bot.get_cog("Schedule")
         user_timezone = await schedule_cog.get_user_timezone(ctx.author.id) if schedule_cog else "UTC"
@@ -150,10 +164,6 @@ class DelayedAnnouncements(commands.Cog):
                     continue
             break
 
-        # Optional debug: warn if scheduling a wonder pick announcement without substitutions.
-        if normalized_name.startswith("wonder pick") and substitutions is None:
-            print(f"DEBUG: Scheduling wonder pick announcement '{announcement_name}' without substitutions.")
-
         # ── Change in channel selection for test mode ──
         if normalized_name == "activity check":
             channel_id = ACTIVITY_CHECK_CHANNEL_ID  # Activity Check channel
@@ -175,33 +185,47 @@ class DelayedAnnouncements(commands.Cog):
             "warned": False
         }
         async with self.lock:
+            ann_data["id"] = self.store.add(timestamp, ann_data)  # single-row insert
             if timestamp in self.delayed_announcements:
                 self.delayed_announcements[timestamp].append(ann_data)
             else:
                 self.delayed_announcements[timestamp] = [ann_data]
-            self.save_delayed_announcements()  # Save changes after scheduling
-            pending_count = sum(len(lst) for lst in self.delayed_announcements.values())
-            print(f"DEBUG: Added announcement at {timestamp}. Current announcements: {self.delayed_announcements}")
+            self.pending_count += 1
+            pending_count = self.pending_count
+            self.schedule_jobs(timestamp)
+            print(f"DEBUG: Added announcement {ann_data['id']} at {timestamp}. Pending: {pending_count}")
         await ctx.send(f"Scheduled announcement: **{announcement_name}** for <t:{timestamp}:F>.\n"
                        f"There are now **{pending_count} announcement(s)** pending.")
 
     @commands.command(name="viewdelay", aliases=["vdelay", "vd"])
     @commands.has_any_role('The BotFather', 'Moderator', 'Manager', 'Server Owner')
-    async def view_delayed_announcements(self, ctx):
-        """Show all pending delayed announcements in a clean format with a small orange diamond emoji."""
+    async def view_delayed_announcements(self, ctx, *, who: str = None):
+        """Show pending delayed announcements (optionally only one author's, or one announcement's) with a small orange diamond emoji.
+           Format: !!viewdelay [@user | announcement name]"""
         async with self.lock:
-            if not self.delayed_announcements:
+            if who:
+                # indexed lookups by author or by name
+                mention = re.fullmatch(r"<@!?(\d+)>", who.strip())
+                found = self.store.find(author=int(mention.group(1))) if mention else self.store.find(name=who.strip())
+                pending = [(ann["due_at"], ann) for ann in found]
+            else:
+                pending = [(ts, ann) for ts, ann_list in sorted(self.delayed_announcements.items()) for ann in ann_list]
+            if not pending:
                 await ctx.send("No pending announcements.")
                 return
             
             embed = discord.Embed(title="Pending Announcements  📋", color=0xFF8C00)
             lines = ["──────────────────────────────"]
             
-            for ts, ann_list in sorted(self.delayed_announcements.items()):
-                for ann in ann_list:
-                    lines.append(f"🔸 **{ann['name']}**\n   - <t:{ts}:F>")
+            for ts, ann in pending:
+                lines.append(f"🔸 **{ann['name']}**\n   - <t:{ts}:F>")
                     
             embed.description = "\n".join(lines)
+            if self.lags:
+                recent = sorted(lag for _, _, lag in self.lags)
+                embed.set_footer(
+                    text=f"Delivery lag (last {len(recent)}): median {recent[len(recent) // 2]:.2f}s, max {recent[-1]:.2f}s"
+                )
             await ctx.send(embed=embed)
 
     @commands.command(name="canceldelay", aliases=["cdelay", "cd"])
@@ -225,8 +249,11 @@ class DelayedAnnouncements(commands.Cog):
                 utc_time = localized_time.astimezone(pytz.utc)
                 timestamp = int(utc_time.timestamp())
                 if timestamp in self.delayed_announcements:
+                    self.store.remove_due(timestamp)
                     removed_list = self.delayed_announcements.pop(timestamp)
-                    self.save_delayed_announcements()  # Save changes after removal
+                    self.pending_count -= len(removed_list)
+                    self.jobs.cancel(("announce", timestamp))
+                    self.jobs.cancel(("warn", timestamp))
                     names = ", ".join(f"**{ann['name']}**" for ann in removed_list)
                     await ctx.send(f"Cancelled {names} originally set for <t:{timestamp}:F>.")
                 else:
@@ -235,64 +262,103 @@ class DelayedAnnouncements(commands.Cog):
             except ValueError:
                 await ctx.send("Invalid time format! Use MM/DD HH:MM.")
 
-    @tasks.loop(minutes=1)
-    async def check_delays(self):
+    # ── Scheduled jobs (one heap-backed timer, see jobqueue.py) ──
+    async def warn(self, ts):
+        """5 minutes before `ts`: tell each author their announcement is about to go out."""
         async with self.lock:
-            now = int(datetime.now(pytz.utc).timestamp())
-            # Send 5-minute warnings for announcements that are not yet due
-            for ts, ann_list in self.delayed_announcements.items():
-                time_remaining = ts - now
-                if 0 < time_remaining <= 300:  # 300 seconds = 5 minutes
-                    for ann in ann_list:
-                        if not ann.get("warned", False):
-                            ann["warned"] = True
-                            input_channel = self.bot.get_channel(ann["input_channel"])
-                            if input_channel:
-                                warning_msg = (
-                                    f"**5 Minute Warning:** The announcement **{ann['name']}** "
-                                    f"scheduled for <t:{ts}:F> from <@{ann['author']}> will be announced in 5 minutes. "
-                                    "You can cancel it using `!!canceldelay`."
-                                )
-                                await input_channel.send(warning_msg)
-            # Process due announcements
-            due_announcements = []
-            for ts in list(self.delayed_announcements.keys()):
-                if ts <= now:
-                    due_announcements.extend(self.delayed_announcements.pop(ts))
-            self.save_delayed_announcements()  # Save after processing due announcements
-            pending_count = sum(len(lst) for lst in self.delayed_announcements.values())
+            if int(time.time()) >= ts:
+                return  # came due while we were down; nothing left to cancel
+            for ann in self.delayed_announcements.get(ts, []):
+                if not ann.get("warned", False):
+                    ann["warned"] = True
+                    self.store.mark_warned(ann["id"])
+                    input_channel = self.bot.get_channel(ann["input_channel"])
+                    if input_channel:
+                        warning_msg = (
+                            f"**5 Minute Warning:** The announcement **{ann['name']}** "
+                            f"scheduled for <t:{ts}:F> from <@{ann['author']}> will be announced in 5 minutes. "
+                            "You can cancel it using `!!canceldelay`."
+                        )
+                        await input_channel.send(warning_msg)
+
+    async def deliver(self, ts):
+        """At `ts`: send every announcement scheduled for it."""
+        async with self.lock:
+            due_announcements = self.delayed_announcements.pop(ts, [])
+            if not due_announcements:
+                return
+            self.jobs.cancel(("warn", ts))
+            # removed before sending: a crash mid-send never repeats an announcement
+            self.store.remove_due(ts)
+            self.pending_count -= len(due_announcements)
+            pending_count = self.pending_count
+        await self.send_due(ts, due_announcements, pending_count)
+
+    async def send_due(self, ts, due_announcements, pending_count):
+        """
+        Send due announcements (plus the schedule embed where needed), then confirm in the input channels.
+        Announcements are grouped by destination channel and the channels are sent to concurrently,
+        so a batch takes about as long as its busiest channel; within a channel they keep their order.
+        """
+        by_channel = {}
+        for data in due_announcements:
+            by_channel.setdefault(data["announce_channel"], []).append(data)
+        schedule_embed = None
+        if "schedule" in (data["name"].lower() for data in due_announcements):
+            schedule_cog = self.bot.get_cog("Schedule")
+            schedule = schedule_cog.get_schedule() if schedule_cog else None
+            schedule_embed = self.create_schedule_embed(schedule) if schedule else None
+
+        results = await asyncio.gather(*(
+            self.send_to_channel(ts, channel_id, items, schedule_embed)
+            for channel_id, items in by_channel.items()
+        ), return_exceptions=True)
+        for channel_id, result in zip(by_channel, results):
+            if isinstance(result, Exception):
+                print(f"Error delivering announcements for {ts} to channel {channel_id}: {result}")
+
         confirmations = {}
         for data in due_announcements:
-            announce_channel = self.bot.get_channel(data["announce_channel"])
             input_channel = self.bot.get_channel(data["input_channel"])
-            announcement_text = await self.get_announcement(data["name"])
-            if announcement_text and data.get("substitutions"):
-                try:
-                    announcement_text = announcement_text.format(**data["substitutions"])
-                except Exception as e:
-                    print("Error formatting announcement:", e)
-            if announce_channel:
-                if announcement_text:
-                    await announce_channel.send(announcement_text)
-                else:
-                    await announce_channel.send(f"Announcement {data['name']} is now due.")
-                # ── Change: If this is a schedule announcement, also send the current schedule embed ──
-                if data["name"].lower() == "schedule":
-                    schedule_cog = self.bot.get_cog("Schedule")
-                    if schedule_cog:
-                        schedule = schedule_cog.get_schedule()
-                        if schedule:
-                            embed = self.create_schedule_embed(schedule)
-                            if embed:
-                                await announce_channel.send(embed=embed)
             if input_channel:
                 confirmations.setdefault(input_channel.id, input_channel)
-        for ch in confirmations.values():
-            await ch.send(f"Announcement confirmed. There are {pending_count} announcement(s) pending.")
+        message = f"Announcement confirmed. There are {pending_count} announcement(s) pending."
+        results = await asyncio.gather(*(
+            self.send_to_channel(ts, ch.id, [], None, confirm=message) for ch in confirmations.values()
+        ), return_exceptions=True)
+        for channel_id, result in zip(confirmations, results):
+            if isinstance(result, Exception):
+                print(f"Error confirming announcements for {ts} in channel {channel_id}: {result}")
 
-    @check_delays.before_loop
-    async def before_check_delays(self):
-        await self.bot.wait_until_ready()
+    async def send_to_channel(self, ts, channel_id, items, schedule_embed, confirm=None):
+        """Send one channel's share of a due batch, in order, holding that channel's lock and a dispatch slot."""
+        channel = self.bot.get_channel(channel_id)
+        if not channel:
+            return
+        lock = self.channel_locks.setdefault(channel_id, asyncio.Lock())
+        # the channel lock first: batches for the same channel queue in due order without holding a slot
+        async with lock, self.dispatch_slots:
+            if confirm:
+                await channel.send(confirm)
+            for data in items:
+                template = compiled_template(data["name"])
+                announcement_text = template.text if template else None
+                if template and data.get("substitutions"):
+                    try:
+                        announcement_text = template.render(data["substitutions"])
+                    except Exception as e:
+                        # only if the template was edited after this was scheduled
+                        print("Error formatting announcement:", e)
+                if announcement_text:
+                    await channel.send(announcement_text)
+                else:
+                    await channel.send(f"Announcement {data['name']} is now due.")
+                lag = time.time() - ts
+                self.lags.append((data["name"], ts, lag))
+                print(f"DEBUG: Delivered announcement '{data['name']}' for {ts} ({lag:.2f}s after its due time)")
+                # ── Change: If this is a schedule announcement, also send the current schedule embed ──
+                if data["name"].lower() == "schedule" and schedule_embed:
+                    await channel.send(embed=schedule_embed)
 
 async def setup(bot):
     await bot.add_cog(DelayedAnnouncements(bot))
@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import time
+
+# ─── Delayed announcement schema ────────────────────────
+# One row per pending announcement. Scheduling is one INSERT, the 5-minute
+# warning one UPDATE, and cancel/delivery one DELETE of a due time's rows.
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS delayed_announcements (
+  id               INTEGER PRIMARY KEY AUTOINCREMENT,
+  due_at           INTEGER NOT NULL,            -- epoch seconds (UTC)
+  name             TEXT    NOT NULL,
+  announce_channel INTEGER NOT NULL,
+  input_channel    INTEGER NOT NULL,
+  author           INTEGER NOT NULL,
+  substitutions    TEXT,                        -- JSON object or NULL
+  warned           INTEGER NOT NULL DEFAULT 0,
+  created_at       INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS delayed_due_idx    ON delayed_announcements (due_at);
+CREATE INDEX IF NOT EXISTS delayed_author_idx ON delayed_announcements (author, due_at);
+CREATE INDEX IF NOT EXISTS delayed_name_idx   ON delayed_announcements (name, due_at);
+
+CREATE TABLE IF NOT EXISTS delay_meta (
+  key   TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+"""
+
+COLUMNS = ("id", "due_at", "name", "announce_channel", "input_channel", "author", "substitutions", "warned")
+
+
+def _row_to_ann(row):
+    ann = dict(zip(COLUMNS, row))
+    ann["substitutions"] = json.loads(ann["substitutions"]) if ann["substitutions"] else None
+    ann["warned"] = bool(ann["warned"])
+    return ann
+
+
+class DelayStore:
+    """
+    Pending delayed announcements in a local SQLite database (WAL mode).
+
+    Every method is one short statement in its own transaction. In WAL mode
+    with synchronous=NORMAL a commit appends to the log without an fsync, so
+    writes cost microseconds on the event loop, and a process crash never
+    loses or tears a committed change (only an OS crash can drop the last
+    few commits).
+    """
+
+    def __init__(self, path="delayed_announcements.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None)   # autocommit; explicit BEGIN where needed
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA_SQL)
+
+    def close(self):
+        self.conn.close()
+
+    # ── writes ─────────────────────────────────────────
+    def add(self, due_at, ann):
+        """Insert one announcement; returns its row id."""
+        subs = ann.get("substitutions")
+        cur = self.conn.execute(
+            "INSERT INTO delayed_announcements(due_at, name, announce_channel, input_channel, author, "
+            "substitutions, warned, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (int(due_at), ann["name"], ann["announce_channel"], ann["input_channel"], ann["author"],
+             json.dumps(subs) if subs is not None else None, int(ann.get("warned", False)), int(time.time()))
+        )
+        return cur.lastrowid
+
+    def mark_warned(self, ann_id):
+        self.conn.execute("UPDATE delayed_announcements SET warned = 1 WHERE id = ?", (ann_id,))
+
+    def remove_due(self, due_at):
+        """Delete everything scheduled for one due time (cancel or delivery); returns the row count."""
+        return self.conn.execute("DELETE FROM delayed_announcements WHERE due_at = ?", (int(due_at),)).rowcount
+
+    # ── reads ──────────────────────────────────────────
+    def load(self):
+        """{due_at: [announcement, ...]} for everything pending, in scheduling order."""
+        pending = {}
+        for row in self.conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM delayed_announcements ORDER BY due_at, id"
+        ):
+            ann = _row_to_ann(row)
+            pending.setdefault(ann["due_at"], []).append(ann)
+        return pending
+
+    def find(self, author=None, name=None):
+        """Pending announcements by one author or with one name, soonest first."""
+        if author is not None:
+            where, arg = "author = ?", int(author)
+        else:
+            where, arg = "name = ?", name.lower()
+        return [
+            _row_to_ann(row) for row in self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM delayed_announcements WHERE {where} ORDER BY due_at, id", (arg,)
+            )
+        ]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM delayed_announcements").fetchone()[0]
+
+    # ── one-time import ────────────────────────────────
+    def import_json(self, json_path):
+        """
+        Import the old delayed_announcements.json ({timestamp: [ann, ...]}) once.
+        The rows and the "imported" marker commit together, so a crash midway
+        leaves nothing half-imported; afterwards the file is renamed to
+        <name>.imported. Returns how many announcements were imported.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        if self.conn.execute("SELECT 1 FROM delay_meta WHERE key = 'json_imported'").fetchone():
+            return 0
+        with open(json_path, "r") as file:
+            data = json.load(file)
+        imported = 0
+        self.conn.execute("BEGIN")
+        try:
+            for ts, anns in data.items():
+                for ann in (anns if isinstance(anns, list) else [anns]):
+                    self.add(int(ts), ann)
+                    imported += 1
+            self.conn.execute(
+                "INSERT INTO delay_meta(key, value) VALUES ('json_imported', ?)", (json_path,)
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        os.replace(json_path, json_path + ".imported")
+        return imported
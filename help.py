@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 from discord.ui import View, Select
 from discord import SelectOption
+from templates import ANNOUNCEMENTS_FILE, template_file
 
 class HelpSelect(Select):
     def __init__(self, cog):
@@ -185,7 +186,8 @@ class HelpCog(commands.Cog):
         elif topic in ['viewdelay', 'vdelay', 'vd']:
             embed = discord.Embed(
                 title="!!viewdelay  //  !!vdelay  //  !!vd",
-                description="View all currently scheduled delayed announcements.",
+                description="View all currently scheduled delayed announcements, with how late recent ones were delivered.\n"
+                            "Format: `!!viewdelay [@user | announcement name]` to show only one author's or one announcement's.",
                 color=0xFFC107
             )
             await send(embed=embed, ephemeral=is_inter)
@@ -201,7 +203,38 @@ class HelpCog(commands.Cog):
         elif topic == 'poll':
             embed = discord.Embed(
                 title="/poll",
-                description="Create a custom poll with options and reaction buttons. Various poll alterations are available through the slash command.",
+                description=(
+                    "Create a custom poll with options and reaction buttons. Various poll alterations are available through the slash command.\n"
+                    "`ranked:True` makes a ranked-choice poll: voters order the options privately and the winner is decided by instant runoff, shown round by round."
+                ),
+                color=0xFFC107
+            )
+            await send(embed=embed, ephemeral=is_inter)
+
+        elif topic in ['pollstats', 'pstats']:
+            embed = discord.Embed(
+                title="!!pollstats  //  !!pstats",
+                description="Show poll votes received versus public poll message edits sent and saved by coalescing.",
+                color=0xFFC107
+            )
+            await send(embed=embed, ephemeral=is_inter)
+
+        elif topic in ['polls', 'history', 'active']:
+            embed = discord.Embed(
+                title="/polls active  //  /polls history",
+                description=(
+                    "`/polls active` lists open polls, soonest to close first, with votes and @Player turnout.\n"
+                    "`/polls history` shows when a poll's votes arrived: per minute for recent activity, in coarser buckets further back.\n"
+                    "Format: `/polls history poll:<message ID or link> [export_csv:True]`"
+                ),
+                color=0xFFC107
+            )
+            await send(embed=embed, ephemeral=is_inter)
+
+        elif topic == 'jobs':
+            embed = discord.Embed(
+                title="!!jobs",
+                description="List pending poll jobs (close, 1-hour reminder, countdown) and when each will fire.",
                 color=0xFFC107
             )
             await send(embed=embed, ephemeral=is_inter)
@@ -355,6 +388,10 @@ class HelpCog(commands.Cog):
                 "- `!!viewdelay`\n"
                 "- `!!canceldelay`\n"
                 "- `!!poll`\n"
+                "- `!!pollstats`\n"
+                "- `!!jobs`\n"
+                "- `/polls active`\n"
+                "- `/polls history`\n"
                 "- `!!expire`\n"
                 "- `!!tracking`\n"
                 "- `!!endcycle`\n"
@@ -374,25 +411,21 @@ class HelpCog(commands.Cog):
         )
 
     async def _announce_help_embed(self):
-        # Reuse original announce help logic:
-        try:
-            with open('announcements.txt', 'r', encoding='utf-8') as f:
-                content = f.read().split('===')
-                titles = [sect.strip().splitlines()[0] for sect in content if sect.strip()]
-            embed = discord.Embed(
-                title="**Available Announcements:**",
-                description="- " + "\n- ".join(titles) +
-                            "\n\n**Input format:**\n`!!announce <name>`\n`!!ann <name>`\n`!!a <name>`\n" +
-                            "**Test:**\n`!!testannounce <name>`\n`!!testann <name>`\n`!!ta <name>`",
-                color=0xFFC107
-            )
-        except Exception as e:
-            embed = discord.Embed(
+        # Titles come from the shared template registry (templates.py)
+        titles = template_file().titles()
+        if not titles:
+            return discord.Embed(
                 title="Error reading announcements",
-                description=str(e),
+                description=f"No announcements found in {ANNOUNCEMENTS_FILE}.",
                 color=0xFF0000
             )
-        return embed
+        return discord.Embed(
+            title="**Available Announcements:**",
+            description="- " + "\n- ".join(titles) +
+                        "\n\n**Input format:**\n`!!announce <name>`\n`!!ann <name>`\n`!!a <name>`\n" +
+                        "**Test:**\n`!!testannounce <name>`\n`!!testann <name>`\n`!!ta <name>`",
+            color=0xFFC107
+        )
 
 async def setup(bot):
     await bot.add_cog(HelpCog(bot))
@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class Job:
+    __slots__ = ("key", "when", "seq", "callback", "description")
+
+    def __init__(self, key, when, seq, callback, description):
+        self.key = key
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.description = description
+
+
+class JobScheduler:
+    """
+    One timer task for any number of delayed jobs.
+
+    Jobs live in a min-heap ordered by due time (epoch seconds) and are
+    addressed by a hashable key, e.g. ("close", message_id).  Scheduling a key
+    that already exists reschedules it; cancel() only forgets the key and the
+    stale heap entry is skipped when it surfaces (lazy deletion), so insert,
+    reschedule and cancel are all O(log n) or better.  The runner sleeps until
+    the earliest job is due and is woken early whenever an earlier job arrives
+    or the earliest one is cancelled.
+    """
+
+    def __init__(self, name="jobs"):
+        self.name = name
+        self._heap = []             # (when, seq, key)
+        self._jobs = {}             # key -> Job (the only live entry for that key)
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._runner = None
+        self._running = set()       # callback tasks, kept referenced until done
+
+        self.fired = 0
+        self.failed = 0
+
+    # ── public API ─────────────────────────────────────
+    def schedule(self, key, when, callback, description=""):
+        """Run `await callback()` at epoch time `when`, replacing any job with the same key."""
+        job = Job(key, float(when), next(self._seq), callback, description)
+        self._jobs[key] = job
+        heapq.heappush(self._heap, (job.when, job.seq, key))
+        if self._heap[0][1] == job.seq:
+            self._wakeup.set()      # new earliest job: re-arm the timer
+        return job
+
+    def reschedule(self, key, when):
+        """Move an existing job to a new due time; returns False if the key is unknown."""
+        job = self._jobs.get(key)
+        if job is None:
+            return False
+        self.schedule(key, when, job.callback, job.description)
+        return True
+
+    def cancel(self, key):
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return False
+        if self._heap and self._heap[0][1] == job.seq:
+            self._wakeup.set()      # the earliest job went away: re-arm for the next one
+        # leave the heap entry behind; compact once stale entries dominate
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._jobs):
+            self._compact()
+        return True
+
+    def get(self, key):
+        return self._jobs.get(key)
+
+    def __contains__(self, key):
+        return key in self._jobs
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def pending(self):
+        """Snapshot of live jobs, soonest first."""
+        return sorted(self._jobs.values(), key=lambda j: (j.when, j.seq))
+
+    def start(self):
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run(), name=f"{self.name}-scheduler")
+
+    def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+
+    # ── internals ──────────────────────────────────────
+    def _compact(self):
+        self._heap = [(j.when, j.seq, j.key) for j in self._jobs.values()]
+        heapq.heapify(self._heap)
+
+    def _peek(self):
+        """Earliest live heap entry, discarding stale ones on the way."""
+        while self._heap:
+            when, seq, key = self._heap[0]
+            job = self._jobs.get(key)
+            if job is not None and job.seq == seq:
+                return job
+            heapq.heappop(self._heap)
+        return None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            job = self._peek()
+            delay = None if job is None else job.when - time.time()
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            del self._jobs[job.key]
+            task = asyncio.create_task(self._fire(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _fire(self, job):
+        self.fired += 1
+        try:
+            await job.callback()
+        except Exception as e:
+            self.failed += 1
+            log.exception("%s job %r failed: %s", self.name, job.key, e)
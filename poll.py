@@ -1,26 +1,65 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands, TextStyle
-import csv
-import io
 import asyncio
 from datetime import datetime, timedelta
+import time
 import pytz
 import re  # for regex matching
 import os
+import io
 from dotenv import load_dotenv
-import json
 import logging
+from poll_render import RenderCoalescer
+from poll_journal import VoteJournal
+from poll_state import PollState, OPTION_EMOJIS, MAX_OPTIONS, format_time_delta
+from poll_export import export_rows, export_rounds, group_parts, write_export, DEFAULT_LIMIT as EXPORT_DEFAULT_LIMIT
+import poll_store
+from jobqueue import JobScheduler
+from role_batch import RestBatch, RoleBatch
+from poll_cache import PollCache, TTLCache
+from poll_timeline import timeline_csv
+from poll_index import ActivePollIndex
 
 # ─── Role IDs for reminders ─────────────────────────────
 load_dotenv()
 PLAYER_ROLE_ID       = int(os.getenv("PLAYER_ROLE_ID"))
 VOTE_PENDING_ROLE_ID = int(os.getenv("VOTE_PENDING_ROLE_ID"))
-
-# Use numeric keycap emojis for consistent display across platforms
-OPTION_EMOJIS = ["1️⃣","2️⃣","3️⃣","4️⃣","5️⃣","6️⃣","7️⃣","8️⃣","9️⃣","🔟"]
-# Shorten bar length to avoid wrapping on mobile
-BAR_LENGTH = 8
+# Minimum seconds between public edits of the same poll message while votes pour in
+POLL_RENDER_WINDOW   = float(os.getenv("POLL_RENDER_WINDOW", "2.0"))
+# Write-behind vote journal: local durability file and Postgres flush interval (seconds)
+POLL_JOURNAL_PATH    = os.getenv("POLL_JOURNAL_PATH", "poll_journal.jsonl")
+POLL_JOURNAL_FLUSH   = float(os.getenv("POLL_JOURNAL_FLUSH", "2.0"))
+# "relative": Discord <t:…:R> timestamps tick on the client, no periodic edits.
+# "literal":  plain "X hours Y minutes" text, refreshed on an adaptive cadence.
+POLL_COUNTDOWN_MODE  = os.getenv("POLL_COUNTDOWN_MODE", "relative").lower()
+# One-hour reminder: parallel role edits, and the most we wait for them before pinging (seconds)
+POLL_ROLE_CONCURRENCY  = int(os.getenv("POLL_ROLE_CONCURRENCY", "4"))
+POLL_REMINDER_DEADLINE = float(os.getenv("POLL_REMINDER_DEADLINE", "120"))
+# Interaction ids remembered to drop redelivered clicks (seconds), and the window in
+# which a second click by the same user on the same option counts as a double tap
+POLL_DEDUP_TTL       = float(os.getenv("POLL_DEDUP_TTL", "60"))
+POLL_DOUBLE_TAP      = float(os.getenv("POLL_DOUBLE_TAP", "1.0"))
+# Polls per page of /polls active
+POLL_ACTIVE_PAGE     = int(os.getenv("POLL_ACTIVE_PAGE", "10"))
+# Buckets listed by /polls history (the CSV export has the whole series)
+POLL_HISTORY_ROWS    = int(os.getenv("POLL_HISTORY_ROWS", "24"))
+# Open polls fetched per query at startup
+POLL_LOAD_PAGE       = int(os.getenv("POLL_LOAD_PAGE", "200"))
+# Closed polls kept in memory (LRU) for late clicks such as Export Votes
+POLL_CLOSED_CACHE    = int(os.getenv("POLL_CLOSED_CACHE", "64"))
+# Retention: closed polls move to poll_archive after POLL_ARCHIVE_AFTER hours;
+# archive rows are deleted after POLL_ARCHIVE_RETENTION days (0 keeps them forever)
+POLL_ARCHIVE_AFTER     = float(os.getenv("POLL_ARCHIVE_AFTER", "24"))
+POLL_ARCHIVE_RETENTION = float(os.getenv("POLL_ARCHIVE_RETENTION", "365"))
+POLL_ARCHIVE_INTERVAL  = float(os.getenv("POLL_ARCHIVE_INTERVAL", "30"))   # minutes between runs
+POLL_ARCHIVE_BATCH     = int(os.getenv("POLL_ARCHIVE_BATCH", "100"))
+# Startup catch-up for polls that ended while the bot was down: parallel message edits,
+# what to do with one-hour reminders that came due meanwhile ("late" sends them now,
+# "skip" drops them), and seconds between the late ones
+POLL_CATCHUP_CONCURRENCY = int(os.getenv("POLL_CATCHUP_CONCURRENCY", "2"))
+POLL_MISSED_REMINDER     = os.getenv("POLL_MISSED_REMINDER", "late").lower()
+POLL_CATCHUP_STAGGER     = float(os.getenv("POLL_CATCHUP_STAGGER", "5"))
 
 def get_user_timezone(user_id):
     """Helper: Look up user timezone in bot_data.db; default to UTC if not set."""
@@ -32,65 +71,91 @@ def get_user_timezone(user_id):
         return result[0] if result else "UTC"
 
 
-def format_time_delta(delta: timedelta):
-    """Helper: Return a human-friendly string for a timedelta."""
-    total_seconds = int(delta.total_seconds())
-    if total_seconds <= 0:
-        return "0 minutes"
-    hours, remainder = divmod(total_seconds, 3600)
-    minutes, _ = divmod(remainder, 60)
-    parts = []
-    if hours > 0:
-        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
-    if minutes > 0:
-        parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
-    return " ".join(parts)
+def rss_mib():
+    """Helper: Resident memory of this process in MiB (peak RSS where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def countdown_interval(remaining: timedelta):
+    """Helper: Seconds until the next literal countdown refresh (coarser when far from the end)."""
+    secs = remaining.total_seconds()
+    if secs > 6 * 3600:
+        return 15 * 60
+    if secs > 3600:
+        return 5 * 60
+    return 60
+
+
+def build_poll_embed(poll: PollState, mode=None):
+    """Helper: Build the public poll embed; the description comes from the poll's render cache."""
+    mode = mode or POLL_COUNTDOWN_MODE
+    now = datetime.utcnow().replace(tzinfo=pytz.utc)
+    embed = discord.Embed(
+        title=f"📊 {poll.question}",
+        description=poll.describe(mode, now),
+        color=poll.embed_color
+    )
+
+    embed.set_footer(text=f"➕ Add Option | ⚙️ Settings | Created by {poll.author}")
+    return embed
+
+
+def embed_signature(embed, view):
+    """Helper: Everything a poll message edit would change, for skipping no-op edits."""
+    items = tuple(
+        (getattr(item, 'custom_id', None), getattr(item, 'label', None), getattr(item, 'disabled', None))
+        for item in (getattr(child, 'item', child) for child in (view.children if view else ()))
+    )
+    return (embed.title, embed.description, embed.color.value if embed.color else None,
+            embed.footer.text, items)
+
+
+def mark_sent(poll: PollState, embed, view):
+    """Helper: Remember what the public message shows after an edit made outside the coalescer."""
+    poll.render_cache().last_sent = embed_signature(embed, view)
+
 
 class AddOptionModal(discord.ui.Modal, title="Add an Option"):
     new_option = discord.ui.TextInput(label="New Option", placeholder="Enter your new poll option here", max_length=100)
 
-    def __init__(self, poll_data, poll_message):
+    def __init__(self, cog, poll: PollState, poll_message):
         super().__init__()
-        self.poll_data = poll_data
+        self.cog = cog
+        self.poll = poll
         self.poll_message = poll_message
 
     async def on_submit(self, interaction: discord.Interaction):
         option_text = self.new_option.value.strip()
+        poll = self.poll
         try:
-            if option_text in self.poll_data['options']:
-                return await interaction.response.send_message("That option already exists.", ephemeral=True)
-            if len(self.poll_data['options']) >= 10:
-                return await interaction.response.send_message("Maximum number of options reached.", ephemeral=True)
-
-            # ── Append and rebuild ──────────────────
-            self.poll_data['options'].append(option_text)
-            self.poll_data['vote_count'][option_text] = 0
-
-            view = self.poll_data['view']
-            view.clear_items()
-            # Re‑add each option button
-            for i, opt in enumerate(self.poll_data['options']):
-                btn = discord.ui.Button(label=OPTION_EMOJIS[i], custom_id=opt)
-                btn.callback = self.poll_data['button_callback']
-                view.add_item(btn)
-
-            # Add‑option button
-            plus = discord.ui.Button(label="➕", style=discord.ButtonStyle.secondary, custom_id="add_option")
-            plus.callback = self.poll_data['cog'].add_option_callback
-            view.add_item(plus)
-
-            # Settings button (use the cog’s callback stored on poll_data)
-            settings = discord.ui.Button(
-                label="⚙️",
-                style=discord.ButtonStyle.secondary,
-                custom_id="settings"
-            )
-            settings.callback = self.poll_data['cog'].settings_callback
-            view.add_item(settings)
-
-            # Update the poll message
-            embed = self.poll_data['build_embed'](self.poll_data)
+            # option changes hold the journal lock, so they never interleave with an
+            # edit; checked once it's held, since the poll may have changed (or closed)
+            # while the modal was open
+            async with self.cog.journal.lock:
+                if poll.closed:
+                    problem = "This poll is closed."
+                elif option_text in poll.options:
+                    problem = "That option already exists."
+                elif len(poll.options) >= MAX_OPTIONS:
+                    problem = "Maximum number of options reached."
+                else:
+                    # ── Persist the one new option row, then append it and rebuild ──
+                    problem = None
+                    await poll_store.add_option(self.cog.bot.pg_pool, poll.id, len(poll.options), option_text)
+                    poll.add_option(option_text)
+            if problem:
+                return await interaction.response.send_message(problem, ephemeral=True)
+
+            # Update the poll message with a view that includes the new button
+            view = self.cog.build_poll_view(poll)
+            embed = build_poll_embed(poll)
             await self.poll_message.edit(embed=embed, view=view)
+            mark_sent(poll, embed, view)
 
             # ACK the modal submission
             await interaction.response.send_message(f"Added option: {option_text}", ephemeral=True)
@@ -114,35 +179,30 @@ class EditPollModal(discord.ui.Modal, title="Edit Poll"):
         max_length=1000
     )
 
-    def __init__(self, cog, poll_data, message_id):
+    def __init__(self, cog, poll: PollState, message_id):
         super().__init__()
         self.cog = cog
-        self.poll_data = poll_data
+        self.poll = poll
         self.message_id = message_id
         # pre‑fill defaults for question and mentions
-        self.question.default = poll_data.get('question', '')
-        self.mentions.default = poll_data.get('mention_text', '')
+        self.question.default = poll.question
+        self.mentions.default = poll.mention_text
 
-                # pre‑fill end_time: use stored string if present, else try formatting existing UTC datetime
+        # pre‑fill end_time: use stored string if present, else format the existing UTC datetime
         default_end = ''
-        # use explicit get to avoid missing-key errors
-        if self.poll_data.get('end_time_str'):
-            default_end = self.poll_data.get('end_time_str') or ''
-        elif self.poll_data.get('end_time'):
-            # safely format UTC datetime; wrap in try to prevent failures if wrong type
-            try:
-                default_end = self.poll_data['end_time'].strftime("%m/%d %H:%M")
-            except Exception:
-                default_end = ''
+        if poll.end_time_str:
+            default_end = poll.end_time_str
+        elif poll.end_time:
+            default_end = poll.end_time.strftime("%m/%d %H:%M")
         # assign default and remember original for comparison
         self.end_time.default = default_end
         self._original_end_str = default_end
-        self._original_end_str = default_end
 
         # pre‑fill options
-        self.options.default = "\n".join(poll_data.get('options', []))
+        self.options.default = "\n".join(poll.options)
 
     async def on_submit(self, interaction: discord.Interaction):
+        poll = self.poll
         try:
             # collect new values
             new_opts = [line.strip() for line in self.options.value.splitlines() if line.strip()]
@@ -152,6 +212,12 @@ class EditPollModal(discord.ui.Modal, title="Edit Poll"):
                     ephemeral=True
                 )
                 return
+            if len(new_opts) > MAX_OPTIONS:
+                await interaction.response.send_message(
+                    f"❌ A poll can have at most {MAX_OPTIONS} options.",
+                    ephemeral=True
+                )
+                return
 
             # determine end_time handling
             end_input = self.end_time.value.strip()
@@ -175,36 +241,58 @@ class EditPollModal(discord.ui.Modal, title="Edit Poll"):
                 new_end_str = None
             else:
                 # unchanged original
-                new_end_utc = self.poll_data.get('end_time')
+                new_end_utc = poll.end_time
                 new_end_str = self._original_end_str
 
-            # prepare updated vote counts
-            old_opts = self.poll_data.get('options', [])
-            old_counts = self.poll_data.get('vote_count', {})
-            new_counts = {}
+            # work out which old option each new line inherits its votes from:
+            # first every label that still exists, then the remaining new lines
+            # take the remaining old positions in order (edited labels)
+            old_opts = list(poll.options)
+            remap = {}      # old position → new position
+            unmatched = []
             for idx, opt in enumerate(new_opts):
-                if opt in old_counts:
-                    new_counts[opt] = old_counts[opt]
-                elif idx < len(old_opts) and old_opts[idx] in old_counts:
-                    new_counts[opt] = old_counts[old_opts[idx]]
+                old = next((i for i, o in enumerate(old_opts) if o == opt and i not in remap), None)
+                if old is None:
+                    unmatched.append(idx)
                 else:
-                    new_counts[opt] = 0
-
-            # apply updates
-            self.poll_data.update({
-                'question': self.question.value,
-                'mention_text': self.mentions.value.strip(),
-                'mention': bool(self.mentions.value.strip()),
-                'options': new_opts,
-                'vote_count': new_counts
-            })
-            if new_end_utc is not None:
-                self.poll_data['end_time'] = new_end_utc
-                self.poll_data['end_time_str'] = new_end_str
-            else:
-                # clear end time fields without removing keys to avoid build_embed errors
-                self.poll_data['end_time'] = None
-                self.poll_data['end_time_str'] = None
+                    remap[old] = idx
+            unclaimed = [i for i in range(len(old_opts)) if i not in remap]
+            remap.update(zip(unclaimed, unmatched))
+
+            meta = dict(
+                question=self.question.value,
+                mention_text=self.mentions.value.strip(),
+                end_time=new_end_utc,
+                end_time_str=new_end_str,
+            )
+
+            # persist first: buffered votes land on their old positions, then the
+            # option rows (and moved/dropped vote rows) change with the meta columns
+            # in one transaction. The journal lock keeps other flushes out meanwhile.
+            pool = self.cog.bot.pg_pool
+            journal = self.cog.journal
+            async with journal.lock:
+                await journal.flush_locked()
+                if new_opts != old_opts:
+                    await poll_store.save_options(pool, poll.id, new_opts, remap, **meta)
+                else:
+                    await poll_store.update_meta(pool, poll.id, **meta)
+
+                # saved: now apply the edit in memory, with no await in between.
+                # Votes on dropped options go, the rest follow their option; clicks
+                # journaled while the rows were moving follow it too.
+                if new_opts != old_opts:
+                    journal.remap_positions(poll.id, remap, new_opts)
+                    poll.set_options(new_opts, remap)
+                for field, value in meta.items():
+                    setattr(poll, field, value)
+                poll.mark_dirty()
+
+            # move the close/reminder/countdown jobs to the new end time in place
+            self.cog.schedule_poll_jobs(self.message_id)
+            # re-sort /polls active by the new end time; dropped options may have dropped voters
+            if not poll.closed:
+                self.cog.index_poll(poll)
 
         except Exception as e:
             log.exception(f"EditPollModal error: {e}")
@@ -215,31 +303,21 @@ class EditPollModal(discord.ui.Modal, title="Edit Poll"):
             return
 
         # rebuild embed & view
-        embed = self.poll_data['build_embed'](self.poll_data)
-        new_view = discord.ui.View()
-        for i, opt in enumerate(self.poll_data['options']):
-            btn = discord.ui.Button(label=OPTION_EMOJIS[i], custom_id=opt)
-            btn.callback = self.poll_data['button_callback']
-            new_view.add_item(btn)
-        plus = discord.ui.Button(label="➕", style=discord.ButtonStyle.secondary, custom_id="add_option")
-        plus.callback = self.cog.add_option_callback
-        settings_btn = discord.ui.Button(label="⚙️", style=discord.ButtonStyle.secondary, custom_id="settings")
-        settings_btn.callback = self.cog.settings_callback
-        new_view.add_item(plus)
-        new_view.add_item(settings_btn)
+        embed = build_poll_embed(poll)
+        new_view = self.cog.build_poll_view(poll)
 
         # apply message edit with mentions allowed
-        channel = self.cog.bot.get_channel(self.poll_data['channel_id'])
+        channel = self.cog.bot.get_channel(poll.channel_id)
         msg = await channel.fetch_message(self.message_id)
         await msg.edit(
-            content=self.poll_data.get('mention_text') or None,
+            content=poll.mention_text or None,
             embed=embed,
             view=new_view,
             allowed_mentions=discord.AllowedMentions(everyone=True, roles=True, users=True)
         )
+        mark_sent(poll, embed, new_view)
 
         await interaction.response.send_message("✅ Poll updated.", ephemeral=True)
-        self.poll_data['view'] = new_view
 
 class ConfirmEndPollModal(discord.ui.Modal, title="Confirm End Poll"):
     # TextInput for user confirmation; must type exactly 'END'
@@ -250,11 +328,11 @@ class ConfirmEndPollModal(discord.ui.Modal, title="Confirm End Poll"):
         max_length=3
     )
 
-    def __init__(self, cog, poll_data, message_id):
+    def __init__(self, cog, poll: PollState, message_id):
         super().__init__()
-        # Keep cog, poll metadata, and original message ID for edits
+        # Keep cog, poll state, and original message ID for edits
         self.cog = cog
-        self.poll_data = poll_data
+        self.poll = poll
         self.message_id = message_id
 
     async def on_submit(self, interaction: discord.Interaction):
@@ -269,21 +347,17 @@ class ConfirmEndPollModal(discord.ui.Modal, title="Confirm End Poll"):
 
         try:
             # Mark poll closed in memory
-            self.poll_data['closed'] = True
-            self.poll_data['end_time'] = datetime.utcnow()
-            self.poll_data['ended_by'] = interaction.user.display_name
-
-            # Disable only voting and "add option" buttons; leave settings enabled
-            for child in self.poll_data['view'].children:
-                if isinstance(child, discord.ui.Button):
-                    # Identify settings button by custom_id or label
-                    if getattr(child, 'custom_id', None) == 'settings' or child.label == 'Settings':
-                        child.disabled = False
-                    else:
-                        child.disabled = True
+            poll = self.poll
+            poll.closed = True
+            poll.mark_dirty()
+            poll.end_time = datetime.utcnow().replace(tzinfo=pytz.utc)
+            poll.ended_by = interaction.user.display_name
+
+            # Closed view: voting and "add option" disabled, settings left enabled
+            view = self.cog.build_poll_view(poll)
 
             # Rebuild embed with closed indicator in description only, ensuring no duplicates
-            embed = self.poll_data['build_embed'](self.poll_data)
+            embed = build_poll_embed(poll)
             closed_line = "❌ Poll closed"
             # Normalize description by stripping existing closed lines
             desc = embed.description or ""
@@ -296,18 +370,21 @@ class ConfirmEndPollModal(discord.ui.Modal, title="Confirm End Poll"):
             # Leave embed.title unchanged
 
             # Fetch and edit the original poll message by ID
-            channel = interaction.channel or self.cog.bot.get_channel(self.poll_data.get('channel_id'))
+            channel = interaction.channel or self.cog.bot.get_channel(poll.channel_id)
             orig_msg = await channel.fetch_message(self.message_id)
-            await orig_msg.edit(embed=embed, view=self.poll_data['view'])
+            await orig_msg.edit(embed=embed, view=view)
+            mark_sent(poll, embed, view)
 
-            # Cleanup: delete from DB and schedule in-memory purge
-            await self.cog.bot.pg_pool.execute(
-                "DELETE FROM polls WHERE id = $1", self.poll_data['id']
-            )
-            async def purge():
-                await asyncio.sleep(86400)
-                self.cog.polls.pop(self.poll_data['id'], None)
-            self.cog.bot.loop.create_task(purge())
+            # Move it to the closed-poll cache, then persist the closure (the retention job
+            # archives it later); the message already shows it closed if the write fails
+            self.cog.retire_poll(self.message_id)
+            try:
+                await poll_store.update_meta(
+                    self.cog.bot.pg_pool, poll.id,
+                    closed=True, end_time=poll.end_time, ended_by=poll.ended_by
+                )
+            except Exception as e:
+                log.warning(f"Couldn't persist closure of poll {poll.id}: {e}")
 
             # Finally, notify user of successful closure
             await interaction.followup.send("✅ Poll ended.", ephemeral=True)
@@ -317,46 +394,48 @@ class ConfirmEndPollModal(discord.ui.Modal, title="Confirm End Poll"):
             print(f"Error updating poll message: {e}")
 
 class SettingsView(discord.ui.View):
-    def __init__(self, cog, poll_data, message_id):
+    def __init__(self, cog, poll: PollState, message_id):
         super().__init__(timeout=None)
         self.cog = cog
-        self.poll_data = poll_data
+        self.poll = poll
         self.message_id = message_id
 
     @discord.ui.button(label="Edit", style=discord.ButtonStyle.primary)
     async def edit(self, interaction: discord.Interaction, button: discord.ui.Button):
         # launch the corrected modal
-        await interaction.response.send_modal(EditPollModal(self.cog, self.poll_data, self.message_id))
+        await interaction.response.send_modal(EditPollModal(self.cog, self.poll, self.message_id))
         
     @discord.ui.button(label="Voters", style=discord.ButtonStyle.primary)
     async def voter_list(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Build select options including a "Not Voted" choice
         options = [
             discord.SelectOption(label=opt, value=opt, emoji=OPTION_EMOJIS[i])
-            for i, opt in enumerate(self.poll_data['options'])
+            for i, opt in enumerate(self.poll.options)
         ]
         options.append(discord.SelectOption(label="Not Voted", value="__NOT_VOTED__"))
 
-        # Define a Select that carries poll_data
+        # Define a Select that carries the cog and poll
         class VoterSelect(discord.ui.Select):
-            def __init__(self, poll_data):
+            def __init__(self, cog, poll):
                 super().__init__(
                     placeholder="Select an option",
                     options=options
                 )
-                self.poll_data = poll_data
+                self.cog = cog
+                self.poll = poll
 
             async def callback(self, select_inter: discord.Interaction):
                 selected = self.values[0]
                 # Handle "Not Voted"
                 if selected == "__NOT_VOTED__":
-                    role = select_inter.guild.get_role(PLAYER_ROLE_ID)
-                    not_voted = [m.mention for m in role.members if m.id not in self.poll_data['user_votes']]
+                    # set difference against the cached @Player ids, not a walk over the role
+                    missing = self.poll.not_voted(self.cog.player_ids(select_inter.guild))
+                    not_voted = [f"<@{uid}>" for uid in sorted(missing)]
                     content = "Users not voted:\n" + ("\n".join(not_voted) if not_voted else "Everyone has voted!")
                 else:
-                    # List voters who chose the selected option
-                    voters = [f"<@{uid}>" for uid, v in self.poll_data['user_votes'].items()
-                              if (isinstance(v, list) and selected in v) or v == selected]
+                    # List voters who chose the selected option, straight from the reverse index
+                    pos = self.poll.position_of(selected)
+                    voters = [f"<@{uid}>" for uid in sorted(self.poll.voters_of(pos))] if pos is not None else []
                     content = f"Voters for {selected}:\n" + ("\n".join(voters) if voters else "No votes yet.")
                 # Edit the original ephemeral to replace its content,
                 # re-using the same view (so the dropdown stays at the top)
@@ -367,7 +446,7 @@ class SettingsView(discord.ui.View):
 
         # Create a view for the select menu and add our VoterSelect
         menu_view = discord.ui.View(timeout=None)
-        menu_view.add_item(VoterSelect(self.poll_data))
+        menu_view.add_item(VoterSelect(self.cog, self.poll))
 
         # Send an ephemeral dropdown menu to the user
         await interaction.response.send_message(
@@ -377,52 +456,27 @@ class SettingsView(discord.ui.View):
     @discord.ui.button(label="End Poll", style=discord.ButtonStyle.primary)
     async def end_poll(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Prevent re-closing
-        if self.poll_data.get('closed'):
-            ended_by = self.poll_data.get('ended_by', 'unknown user')
+        if self.poll.closed:
+            ended_by = self.poll.ended_by or 'unknown user'
             return await interaction.response.send_message(
                 f"❌ Poll already ended by {ended_by}.", ephemeral=True
             )
         # Show confirmation modal
         await interaction.response.send_modal(
-            ConfirmEndPollModal(self.cog, self.poll_data, self.message_id)
+            ConfirmEndPollModal(self.cog, self.poll, self.message_id)
         )
 
     @discord.ui.button(label="Export Votes", style=discord.ButtonStyle.primary)
     async def export_votes(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # no defer — respond immediately with file
-
-        # Build CSV in memory
-        buf = io.StringIO()
-        writer = csv.writer(buf)
-        writer.writerow(["User", "Vote"])
-
-        # 1) All votes
-        for uid, vote in self.poll_data['user_votes'].items():
-            member = interaction.guild.get_member(uid)
-            name = member.display_name if member else str(uid)
-            if isinstance(vote, list):
-                vote = ", ".join(vote)
-            writer.writerow([name, vote])
-
-        # 2) Non‑voters
-        role = interaction.guild.get_role(PLAYER_ROLE_ID)
-        if role:
-            writer.writerow([])
-            writer.writerow(["=== Did Not Vote ==="])
-            for m in role.members:
-                if m.id not in self.poll_data['user_votes']:
-                    writer.writerow([m.display_name, ""])
-
-        buf.seek(0)
-        discord_file = discord.File(fp=io.BytesIO(buf.getvalue().encode()), filename="poll_export.csv")
-
-        # edit the same ephemeral to include the file
-        await interaction.response.send_message(file=discord_file, ephemeral=True)
+        # pick a format; the export itself is streamed by the cog
+        await interaction.response.send_message(
+            "Export format:", view=ExportFormatView(self.cog, self.poll), ephemeral=True
+        )
 
     @discord.ui.button(label="Delete", style=discord.ButtonStyle.danger)
     async def delete(self, interaction: discord.Interaction, button):
         # Ensure only the poll author can delete
-        if interaction.user.id != self.poll_data['author_id']:
+        if interaction.user.id != self.poll.author_id:
             return await interaction.response.send_message(
                 "❌ Only the poll creator can delete this poll.",
                 ephemeral=True
@@ -435,13 +489,16 @@ class SettingsView(discord.ui.View):
         btn_yes = discord.ui.Button(label="Confirm Delete", style=discord.ButtonStyle.danger)
         async def yes_cb(i: discord.Interaction):
             # Delete the poll message and cleanup storage
-            channel = self.cog.bot.get_channel(self.poll_data['channel_id'])
+            channel = self.cog.bot.get_channel(self.poll.channel_id)
             msg = await channel.fetch_message(self.message_id)
             await msg.delete()
             self.cog.polls.pop(self.message_id, None)
-            await self.cog.bot.pg_pool.execute(
-                "DELETE FROM polls WHERE id = $1", self.poll_data["id"]
-            )
+            self.cog.active.remove(self.message_id)
+            self.cog.closed_polls.pop(self.message_id)
+            self.cog.render.discard(self.message_id)
+            self.cog.cancel_poll_jobs(self.message_id)
+            await poll_store.delete_poll(self.cog.bot.pg_pool, self.poll.id)
+            self.cog.journal.forget(self.poll.id)
             # Edit the original ephemeral prompt to show deletion confirmation
             await i.response.edit_message(content="✅ Poll deleted.", view=None)
         btn_yes.callback = yes_cb
@@ -464,71 +521,527 @@ class SettingsView(discord.ui.View):
 
     @discord.ui.button(label="Color", style=discord.ButtonStyle.success)
     async def color(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # pass the live poll_data dict into the modal so it can update embed_color
-        await interaction.response.send_modal(ColorModal(self.poll_data))
+        # pass the live poll into the modal so it can update embed_color
+        await interaction.response.send_modal(ColorModal(self.cog, self.poll))
+
+
+class ExportFormatView(discord.ui.View):
+    def __init__(self, cog, poll: PollState):
+        super().__init__(timeout=60)
+        self.cog = cog
+        self.poll = poll
+        for label, fmt, compress in (
+            ("CSV", "csv", False), ("JSON Lines", "jsonl", False),
+            ("CSV (gzip)", "csv", True), ("JSON Lines (gzip)", "jsonl", True),
+        ):
+            btn = discord.ui.Button(label=label, style=discord.ButtonStyle.secondary)
+            btn.callback = self._exporter(fmt, compress)
+            self.add_item(btn)
+
+    def _exporter(self, fmt, compress):
+        async def callback(interaction: discord.Interaction):
+            self.stop()
+            await self.cog.export_poll(interaction, self.poll, fmt, compress)
+        return callback
+
+
+class ActivePollsView(discord.ui.View):
+    """Pager for /polls active; every page is rendered from the in-memory index."""
+
+    def __init__(self, cog, page=0):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.page = page
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        pages = self.cog.active.pages(POLL_ACTIVE_PAGE)
+        self.page = min(self.page, pages - 1)
+        self.prev_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= pages - 1
+
+    def build_embed(self):
+        index = self.cog.active
+        embed = discord.Embed(title=f"📊 Active Polls ({len(index)})", color=0x00BFFF)
+        polls = index.page(self.page, POLL_ACTIVE_PAGE)
+        if not polls:
+            embed.description = "No open polls."
+            return embed
+        lines = []
+        for poll in polls:
+            guild_id = index.guild_of(poll.id)
+            players = len(self.cog._player_ids.get(guild_id, ()))
+            voted = index.player_votes[poll.id]
+            turnout = f"{voted}/{players} players ({voted / players:.0%})" if players else "no @Player members"
+            end = poll.aware_end()
+            ends = f"ends <t:{int(end.timestamp())}:R>" if end else "no end time"
+            link = f"https://discord.com/channels/{guild_id}/{poll.channel_id}/{poll.id}" if guild_id else ""
+            question = poll.question[:80] + ("…" if len(poll.question) > 80 else "")
+            title = f"[{question}]({link})" if link else question
+            lines.append(
+                f"**{title}**\n"
+                f"   {ends} · **{poll.total_votes}** vote(s) from {len(poll.user_votes)} user(s) · turnout {turnout}"
+            )
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"Page {self.page + 1}/{index.pages(POLL_ACTIVE_PAGE)} · soonest to close first")
+        return embed
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page -= 1
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+
+class PollButton(discord.ui.DynamicItem[discord.ui.Button], template=r"poll:(?P<action>vote|rank|add|settings)(?::(?P<index>[0-9]+))?"):
+    """
+    Stateless poll button with custom_id "poll:vote:<option index>",
+    "poll:rank" (ranked polls), "poll:add" or "poll:settings". One registration
+    serves every poll message; the poll is whichever message the button sits on.
+    """
+
+    def __init__(self, action, index=None, *, label=None, style=discord.ButtonStyle.secondary, disabled=False):
+        custom_id = f"poll:{action}" if index is None else f"poll:{action}:{index}"
+        super().__init__(discord.ui.Button(label=label, style=style, custom_id=custom_id, disabled=disabled))
+        self.action = action
+        self.index = index
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        index = match["index"]
+        return cls(match["action"], int(index) if index is not None else None)
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("PollCog")
+        if cog is not None:
+            await cog.route(interaction, self.action, self.index)
 
 
 class PollCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # hot tier: every open poll, for as long as it runs
         self.polls = {}
+        # closed polls, LRU-bounded; anything else is loaded from Postgres on demand
+        self.closed_polls = PollCache(POLL_CLOSED_CACHE)
+        # open polls by end time with @Player turnout, for /polls active
+        self.active = ActivePollIndex()
+        # interaction ids already handled: a redelivery is dropped before anything else runs
+        self.seen_interactions = TTLCache(POLL_DEDUP_TTL)
+        # (poll, user, option) → what that user's last click did, for absorbing double taps
+        self.recent_clicks = TTLCache(POLL_DOUBLE_TAP)
+        self.double_taps = 0
+        # one coalesced public edit per poll per window, no matter how many votes land
+        self.render = RenderCoalescer(self._flush_poll_message, window=POLL_RENDER_WINDOW)
+        # every vote/change/removal is journaled and flushed to Postgres in batches
+        self.journal = VoteJournal(bot.pg_pool, path=POLL_JOURNAL_PATH)
+        # a single heap-backed timer for every poll's close/reminder/countdown/purge job
+        self.jobs = JobScheduler("poll")
+        # guild id → ids of @Player members, kept current by member events
+        self._player_ids = {}
+        # message id → RoleBatch of the latest one-hour reminders, for !!pollstats
+        self.reminder_batches = {}
+        # startup runs once per process, not on every reconnect
+        self._started = False
+        self.startup_stats = None
+        self.catch_up_stats = None
+        # reminders being sent after their due time by the startup catch-up
+        self._late_reminders = set()
+        self.archive_stats = {"runs": 0, "archived": 0, "pruned": 0, "last": None}
+        # polls whose vote timeline changed since the last flush
+        self._timelines_dirty = set()
+
+    async def cog_load(self):
+        self.jobs.start()
+        # one router for every poll button on every message
+        self.bot.add_dynamic_items(PollButton)
 
     @commands.Cog.listener()
     async def on_ready(self):
-        """Ensure table exists, load saved polls, and schedule their tasks."""
-        # 1) create the table if missing
-        await self.bot.pg_pool.execute(
-            """
-            CREATE TABLE IF NOT EXISTS polls (
-              id TEXT PRIMARY KEY,
-              data JSONB NOT NULL,
-              embed_color INTEGER NOT NULL DEFAULT 52479,
-              created_at TIMESTAMPTZ NOT NULL DEFAULT now()
-            );
-            """
+        """
+        Once per process: ensure tables exist, migrate legacy polls, apply
+        unflushed votes, then load open polls page by page and schedule their
+        jobs. Polls that ended while the bot was down are closed by the
+        catch-up pass instead. Closed polls stay in the database until someone
+        uses one.
+        """
+        # on_ready fires again after every gateway reconnect; the polls are already live
+        if self._started:
+            return
+        self._started = True
+        started = time.perf_counter()
+        rss_before = rss_mib()
+
+        pool = self.bot.pg_pool
+        # 1) create the normalized tables if missing, and move any old JSONB documents over
+        await poll_store.ensure_schema(pool)
+        await poll_store.migrate_legacy(pool)
+
+        # 2) apply votes that only reached the local journal file before the restart
+        recovered = self.journal.recover()
+        if recovered:
+            log.info("Recovered %d unflushed poll vote event(s) from %s", recovered, self.journal.path)
+        await self.journal.flush()
+
+        # 3) load open polls a page at a time; each gets its view and close/reminder jobs.
+        #    Overdue polls and missed reminders are classified here, before any job is
+        #    armed, so they don't all fire at once the moment the scheduler runs.
+        loaded = 0
+        overdue, missed = [], []
+        now = datetime.utcnow().replace(tzinfo=pytz.utc)
+        async for page in poll_store.load_open_polls(pool, page_size=POLL_LOAD_PAGE):
+            for poll in page:
+                end = poll.aware_end()
+                if end is not None and end <= now:
+                    overdue.append(poll)
+                    continue
+                reminder_missed = (
+                    end is not None and poll.one_hour_reminder and poll.reminder_status is None
+                    and end - timedelta(hours=1) <= now
+                )
+                if reminder_missed and POLL_MISSED_REMINDER == "skip":
+                    poll.reminder_status = "skipped"
+                self.activate_poll(poll)
+                if reminder_missed:
+                    missed.append(poll)
+                    if poll.reminder_status is None:
+                        # late reminders go out one by one, not in a single burst
+                        self._late_reminders.add(poll.id)
+                        self.jobs.reschedule(
+                            ("reminder", poll.id), now.timestamp() + len(self._late_reminders) * POLL_CATCHUP_STAGGER
+                        )
+            loaded += len(page)
+            await asyncio.sleep(0)  # let gateway events through between pages
+        loaded -= len(overdue)
+        await self.catch_up(overdue, missed)
+
+        # 4) start the write-behind flush loop and the retention/archival job
+        if not self.flush_journal.is_running():
+            self.flush_journal.start()
+        if not self.archive_polls.is_running():
+            self.archive_polls.start()
+
+        self.startup_stats = {
+            "polls": loaded,
+            "seconds": time.perf_counter() - started,
+            "rss_before": rss_before,
+            "rss_after": rss_mib(),
+        }
+        log.info(
+            "Poll startup: %d open poll(s) in %.2fs, RSS %.1f → %.1f MiB",
+            loaded, self.startup_stats["seconds"], rss_before, self.startup_stats["rss_after"]
+        )
+
+    async def catch_up(self, overdue, missed):
+        """
+        Reconcile polls that passed their end time (or one-hour mark) while the
+        bot was down. Overdue polls are closed in memory and in one UPDATE, then
+        their messages are edited by a small, 429-aware RestBatch in the
+        background. Missed reminders were already sent late (staggered) or
+        skipped by on_ready per POLL_MISSED_REMINDER; skips are persisted here.
+        """
+        pool = self.bot.pg_pool
+        for poll in overdue:
+            poll.closed = True
+            if poll.one_hour_reminder and poll.reminder_status is None:
+                poll.reminder_status = "missed"
+            poll.mark_dirty()
+            self.closed_polls.put(poll)
+        if overdue:
+            await poll_store.close_overdue(pool, [p.id for p in overdue])
+        skipped = [p.id for p in missed if p.reminder_status == "skipped"]
+        if skipped:
+            await poll_store.set_reminder_status(pool, skipped, "skipped")
+
+        self.catch_up_stats = {
+            "closed": len(overdue),
+            "late": len(missed) - len(skipped),
+            "skipped": len(skipped),
+            "batch": None,
+        }
+        if not overdue:
+            if missed:
+                self._log_catch_up()
+            return
+
+        async def progress(batch):
+            if batch.finished is None:
+                log.info("Poll catch-up: %d/%d closed poll message(s) updated", batch.done, batch.total)
+            else:
+                self._log_catch_up()
+
+        # the list holds the polls, so they stay reachable even if the closed-poll cache evicts them
+        batch = RestBatch(
+            overdue, self._push_render, concurrency=POLL_CATCHUP_CONCURRENCY,
+            on_progress=progress, label="Poll catch-up"
+        )
+        self.catch_up_stats["batch"] = batch
+        await batch.run(deadline=0)
+
+    def _log_catch_up(self):
+        st = self.catch_up_stats
+        batch = st["batch"]
+        edits = (
+            f" ({batch.done} message(s) updated, {batch.failed + batch.forbidden} failed, "
+            f"{batch.retries} retried, {batch.stats()['seconds']:.1f}s)" if batch else ""
+        )
+        log.info(
+            "Poll catch-up: closed %d overdue poll(s)%s; missed reminders: %d sent late, %d skipped",
+            st["closed"], edits, st["late"], st["skipped"]
+        )
+
+    def activate_poll(self, poll: PollState):
+        """Make a loaded poll live: keep it in memory and schedule its jobs (clicks arrive via PollButton)."""
+        if poll.closed:
+            # materialized on demand; the cache drops it again once newer ones are used
+            self.closed_polls.put(poll)
+        else:
+            self.polls[poll.id] = poll
+            self.index_poll(poll)
+            # schedule close, one‑hour reminder and countdown on the shared scheduler
+            self.schedule_poll_jobs(poll.id)
+
+    def retire_poll(self, message_id):
+        """A poll just closed: cancel its jobs and move it from the open set to the closed-poll cache."""
+        self.cancel_poll_jobs(message_id)
+        poll = self.polls.pop(message_id, None)
+        self.active.remove(message_id)
+        if poll is not None:
+            self.closed_polls.put(poll)
+
+    def index_poll(self, poll: PollState):
+        """(Re)index an open poll for /polls active: end time and @Player turnout from scratch."""
+        channel = self.bot.get_channel(poll.channel_id)
+        guild = channel.guild if channel else None
+        self.active.add(poll, guild.id if guild else None, self.player_ids(guild) if guild else set())
+
+    def cached_poll(self, message_id):
+        """The in-memory poll for a message (open, or closed and still cached), without touching the LRU."""
+        return self.polls.get(message_id) or self.closed_polls.peek(message_id)
+
+    async def get_poll(self, message_id):
+        """The poll for a message, loading it from Postgres or the archive if it isn't in memory."""
+        poll = self.polls.get(message_id) or self.closed_polls.get(message_id)
+        if poll is None:
+            poll = await poll_store.load_poll(self.bot.pg_pool, message_id)
+            if poll is None:
+                return None
+            # another interaction may have loaded it while we awaited
+            live = self.cached_poll(message_id)
+            if live is not None:
+                return live
+            self.activate_poll(poll)
+        return poll
+
+    async def route(self, interaction: discord.Interaction, action, index=None):
+        """Dispatch a poll button click to the matching cog handler, loading the poll if needed."""
+        # Discord redelivered a click we already handled: drop it before any lookup, mutation or REST call
+        if self.seen_interactions.seen(interaction.id):
+            return
+        poll = await self.get_poll(interaction.message.id)
+        if poll is None:
+            return await interaction.response.send_message("This poll no longer exists.", ephemeral=True)
+        if poll.closed and action in ("vote", "rank", "add"):
+            return await interaction.response.send_message("This poll is closed.", ephemeral=True)
+        if poll.ranked is not None and action in ("vote", "rank"):
+            await self.rank_callback(interaction, poll)
+        elif action == "vote":
+            await self.vote_callback(interaction, poll, index)
+        elif action == "add":
+            await self.add_option_callback(interaction, poll)
+        elif action == "settings":
+            await self.settings_callback(interaction, poll)
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        """
+        Legacy poll messages (sent before PollButton) carry the option text,
+        "add_option" or "settings" as custom_id. Route those clicks here; the
+        next re-render swaps the message over to poll:… custom ids.
+        """
+        if interaction.type is not discord.InteractionType.component:
+            return
+        message = interaction.message
+        custom_id = (interaction.data or {}).get("custom_id", "")
+        if message is None or custom_id.startswith("poll:") or message.flags.ephemeral:
+            return
+        if message.author.id != self.bot.user.id or not message.embeds:
+            return
+        if not (message.embeds[0].title or "").startswith("📊"):
+            return
+        if custom_id == "settings":
+            return await self.route(interaction, "settings")
+        if custom_id == "add_option":
+            return await self.route(interaction, "add")
+        poll = await self.get_poll(message.id)
+        if poll is not None and poll.position_of(custom_id) is not None:
+            await self.route(interaction, "vote", poll.position_of(custom_id))
+
+    # ─── Vote export ─────────────────────────────────────────────────────────
+    async def resolve_names(self, guild, user_ids):
+        """Display names for many users at once: the member cache, then one gateway query per 100 misses."""
+        names, missing = {}, []
+        for uid in user_ids:
+            member = guild.get_member(uid)
+            if member:
+                names[uid] = member.display_name
+            else:
+                missing.append(uid)
+        for i in range(0, len(missing), 100):
+            try:
+                for member in await guild.query_members(user_ids=missing[i:i + 100], limit=100):
+                    names[member.id] = member.display_name
+            except Exception as e:
+                # left-the-server users just show up by id
+                log.warning("Member lookup for poll export failed: %s", e)
+                break
+        return names
+
+    async def export_poll(self, interaction: discord.Interaction, poll: PollState, fmt="csv", compress=False):
+        """Stream a poll's votes (and @Player non-voters) to ephemeral attachments, split under the upload limit."""
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        guild = interaction.guild
+        user_ids = list(poll.user_votes)
+        non_voters = sorted(poll.not_voted(self.player_ids(guild))) if guild.get_role(PLAYER_ROLE_ID) else []
+        names = await self.resolve_names(guild, user_ids + non_voters)
+
+        # serialization runs off the event loop; rows are generated as they're written
+        limit = getattr(guild, "filesize_limit", None) or EXPORT_DEFAULT_LIMIT
+        parts = await asyncio.to_thread(
+            write_export, export_rows(poll, user_ids, names, non_voters), fmt, compress, limit,
+            rounds=export_rounds(poll) if poll.ranked is not None else None,
         )
-        # 2) load polls
-        rows = await self.bot.pg_pool.fetch("SELECT id, data, embed_color FROM polls")
-        for row in rows:
-            poll = json.loads(row["data"])
-            # rehydrate end_time
-            if poll.get("end_time"):
-                dt = datetime.fromisoformat(poll["end_time"])
-                poll["end_time"] = dt if dt.tzinfo else dt.replace(tzinfo=pytz.utc)
-            poll["embed_color"] = row["embed_color"]
-            self.polls[poll["id"]] = poll
-
-            # ── Rebuild main voting View ─────────────────────────────────────────────
-            from discord.ui import View, Button
-            main_view = View(timeout=None)
-            # Option buttons
-            for i, opt in enumerate(poll["options"]):
-                btn = Button(label=OPTION_EMOJIS[i], custom_id=opt)
-                btn.callback = self.polls[poll["id"]]['button_callback']
-                main_view.add_item(btn)
-            # Add‑option
-            plus = Button(label="➕", style=discord.ButtonStyle.secondary, custom_id="add_option")
-            plus.callback = self.add_option_callback
-            main_view.add_item(plus)
-            # Settings
-            settings_btn = Button(label="⚙️", style=discord.ButtonStyle.secondary, custom_id="settings")
-            settings_btn.callback = self.settings_callback
-            main_view.add_item(settings_btn)
-
-            # Tell discord.py to listen for interactions on that view, for that message
-            self.bot.add_view(main_view, message_id=int(poll["id"]))
-            poll["view"] = main_view
-
-            # ── Rebuild SettingsView ────────────────────────────────────────────────────
-            settings_view = SettingsView(self, poll, message_id=int(poll["id"]))
-            self.bot.add_view(settings_view, message_id=int(poll["id"]))
-            poll["settings_view"] = settings_view
-
-            # 3) schedule close & one‑hour reminder
-            self.bot.loop.create_task(self.schedule_poll_end(poll['id']))
-            if poll.get("one_hour_reminder"):
-                self.bot.loop.create_task(self.schedule_poll_reminder(poll['id']))
-                
+        try:
+            # the upload limit covers a whole message, so parts go out in groups that fit it together
+            for group in group_parts(parts, limit):
+                await interaction.followup.send(
+                    files=[discord.File(fp=fp, filename=name) for name, fp in group],
+                    ephemeral=True
+                )
+        finally:
+            for _, fp in parts:
+                fp.close()
+
+    # ─── Cached @Player membership (not-voted lists, reminders, exports) ─────
+    def player_ids(self, guild):
+        """Ids of @Player members in a guild, read from the role once and then kept in step."""
+        ids = self._player_ids.get(guild.id)
+        if ids is None:
+            role = guild.get_role(PLAYER_ROLE_ID)
+            ids = {m.id for m in role.members} if role else set()
+            self._player_ids[guild.id] = ids
+        return ids
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        ids = self._player_ids.get(after.guild.id)
+        if ids is None:
+            return
+        is_player = after.get_role(PLAYER_ROLE_ID) is not None
+        if is_player == (after.id in ids):
+            return
+        if is_player:
+            ids.add(after.id)
+        else:
+            ids.discard(after.id)
+        self.active.player_changed(after.guild.id, after.id, is_player)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        ids = self._player_ids.get(member.guild.id)
+        if ids is not None and member.id in ids:
+            ids.discard(member.id)
+            self.active.player_changed(member.guild.id, member.id, False)
+
+    async def cog_unload(self):
+        self.jobs.stop()
+        self.bot.remove_dynamic_items(PollButton)
+        self.archive_polls.cancel()
+        # Stop the flush loop, then push whatever is still buffered
+        self.flush_journal.cancel()
+        try:
+            await self.journal.flush()
+        except Exception as e:
+            log.warning("Final poll journal flush failed, events kept in %s: %s", self.journal.path, e)
+        self.journal.close()
+        try:
+            await self.flush_timelines()
+        except Exception as e:
+            log.warning("Final poll timeline flush failed: %s", e)
+
+    @tasks.loop(seconds=POLL_JOURNAL_FLUSH)
+    async def flush_journal(self):
+        """Write-behind: move buffered vote events to Postgres in one batch."""
+        try:
+            await self.journal.flush()
+        except Exception as e:
+            # events stay buffered (and on disk); the next tick retries
+            log.warning("Poll journal flush failed: %s", e)
+        try:
+            await self.flush_timelines()
+        except Exception as e:
+            log.warning("Poll timeline flush failed: %s", e)
+
+    async def flush_timelines(self):
+        """Upsert the vote timelines that changed since the last flush, in one batch."""
+        if not self._timelines_dirty:
+            return
+        ids, self._timelines_dirty = self._timelines_dirty, set()
+        polls = [p for p in map(self.cached_poll, ids) if p is not None]
+        try:
+            await poll_store.save_timelines(self.bot.pg_pool, polls)
+        except Exception:
+            # retry these on the next tick
+            self._timelines_dirty |= ids
+            raise
+
+    @tasks.loop(minutes=POLL_ARCHIVE_INTERVAL)
+    async def archive_polls(self):
+        """
+        Retention: pack polls closed more than POLL_ARCHIVE_AFTER hours ago
+        into poll_archive, then delete archive rows past POLL_ARCHIVE_RETENTION
+        days. Both run in batches, yielding to the event loop in between.
+        """
+        pool = self.bot.pg_pool
+        now = datetime.utcnow().replace(tzinfo=pytz.utc)
+        archived = pruned = 0
+        try:
+            # the last buffered votes of a poll must reach poll_votes before it's packed
+            await self.journal.flush()
+            while True:
+                n = await poll_store.archive_closed_polls(
+                    pool, now - timedelta(hours=POLL_ARCHIVE_AFTER), POLL_ARCHIVE_BATCH
+                )
+                archived += n
+                if n < POLL_ARCHIVE_BATCH:
+                    break
+                await asyncio.sleep(0)
+            if POLL_ARCHIVE_RETENTION > 0:
+                while True:
+                    n = await poll_store.prune_archive(
+                        pool, now - timedelta(days=POLL_ARCHIVE_RETENTION), POLL_ARCHIVE_BATCH
+                    )
+                    pruned += n
+                    if n < POLL_ARCHIVE_BATCH:
+                        break
+                    await asyncio.sleep(0)
+        except Exception as e:
+            # whatever was archived stays archived; the rest is picked up next run
+            log.warning("Poll archive run failed: %s", e)
+        st = self.archive_stats
+        st["runs"] += 1
+        st["archived"] += archived
+        st["pruned"] += pruned
+        st["last"] = now
+        if archived or pruned:
+            log.info("Poll retention: archived %d closed poll(s), pruned %d archive row(s)", archived, pruned)
+
     async def _create_poll(
         self,
         ctx,
@@ -538,235 +1051,186 @@ class PollCog(commands.Cog):
         mention: bool = False,
         mention_text: str = "",
         multiple: bool = False,
+        ranked: bool = False,
         one_hour_reminder: bool = False,
         end_time: datetime | None = None,
     ):        
         """
         Create a poll. Format:
-        !!poll [mention @everyone] [multiple] Question? | Opt1 | Opt2 | ... | MM/DD HH:MM
+        !!poll [mention @everyone] [multiple|ranked] Question? | Opt1 | Opt2 | ... | MM/DD HH:MM
         """
         if not 2 <= len(options) <= 10:
             return await ctx.send("Poll must have between 2 and 10 options.")
 
-        # Initialize poll data
-        poll_data = {
-            'question': question,
-            'options': options.copy(),
-            'vote_count': {opt:0 for opt in options},
-            'total_votes': 0,
-            'user_votes': {},
-            'voting_type': 'multiple' if multiple else 'single',
-            'author': ctx.author.display_name,
-            'author_id': ctx.author.id,
-            'mention': mention,
-            'mention_text': mention_text,
-            'end_time': end_time,
-            'one_hour_reminder': one_hour_reminder,
-            'channel_id': ctx.channel.id,
-            'closed': False
-        }
-        # Give the modal access back to this cog instance
-        poll_data['cog'] = self
-
-        # Build embed
-        def format_results():
-            txt = ''
-            for i,opt in enumerate(poll_data['options']):
-                cnt = poll_data['vote_count'].get(opt,0)
-                pct = (cnt/poll_data['total_votes']*100) if poll_data['total_votes']>0 else 0
-                filled = int(BAR_LENGTH * pct//100)
-                txt += f"{OPTION_EMOJIS[i]} {opt}\n{'🟩'*filled}{'⬜'*(BAR_LENGTH-filled)} | {pct:.1f}% ({cnt})\n"
-            return txt
-
-        def build_embed(data):
-            header = ''
-            if data['end_time']:
-                # ensure end_time is timezone‑aware in UTC
-                end = data['end_time']
-                if end.tzinfo is None:
-                    end = end.replace(tzinfo=pytz.utc)
-
-                now = datetime.utcnow().replace(tzinfo=pytz.utc)
-                if not data['closed'] and end > now:
-                    header = f"⏳ Time remaining: {format_time_delta(end - now)}\n\n"
-                else:
-                    header = "❌ Poll closed\n\n"
-            desc = header + format_results()
-            # ─── tell them single vs multiple ────────────────────────────
-            if data['voting_type'] == 'single':
-                desc += "\n*You may select **only one option**.*\n"
-            else:
-                desc += "\n*You may select **multiple options**.*\n"
-            # ── One‑hour‑reminder status line ────────────────────────────────────
-            status = "**On**" if data.get('one_hour_reminder') else "Off"
-            desc += f"*One Hour Reminder: {status}*\n"
-            
-            embed = discord.Embed(
-                title=f"📊 {data['question']}",
-                description=desc,
-                color=data.get('embed_color', 0x00BFFF)  # default bright blue
-            )
-
-            embed.set_footer(text=f"➕ Add Option | ⚙️ Settings | Created by {data['author']}")
-            return embed
+        # Initialize poll state (the id is the message id, known once it's sent)
+        poll = PollState(
+            0, options,
+            channel_id=ctx.channel.id,
+            question=question,
+            author=ctx.author.display_name,
+            author_id=ctx.author.id,
+            voting_type='ranked' if ranked else 'multiple' if multiple else 'single',
+            mention_text=mention_text,
+            end_time=end_time,
+            one_hour_reminder=one_hour_reminder,
+        )
+        view = self.build_poll_view(poll)
+        embed = build_poll_embed(poll)
 
-        # Callbacks
-        async def vote_callback(interaction: discord.Interaction):
-            poll = self.polls[interaction.message.id]
-            uid = interaction.user.id
-            choice = interaction.data['custom_id']
-            prev = poll['user_votes'].get(uid)
-
-            # ─── single-vote mode ───────────────────────────────────────
-            if poll['voting_type'] == 'single':
-                # If clicking the same option: ask confirmation to remove
-                if prev == choice:
-                    view = discord.ui.View(timeout=30)
-                    btn_confirm = discord.ui.Button(label="Confirm Removal", style=discord.ButtonStyle.danger)
-                    btn_cancel = discord.ui.Button(label="Cancel", style=discord.ButtonStyle.secondary)
-
-                    async def confirm_cb(i: discord.Interaction):
-                        poll['vote_count'][choice] -= 1
-                        del poll['user_votes'][uid]
-                        poll['total_votes'] = sum(poll['vote_count'].values())
-                        embed = poll['build_embed'](poll)
-                        await interaction.message.edit(embed=embed, view=poll['view'])
-                        await i.response.edit_message(content="✅ Vote removed.", view=None)
-                    async def cancel_cb(i: discord.Interaction):
-                        await i.response.edit_message(content="❌ Vote removal cancelled.", view=None)
-
-                    btn_confirm.callback = confirm_cb
-                    btn_cancel.callback = cancel_cb
-                    view.add_item(btn_confirm)
-                    view.add_item(btn_cancel)
-                    return await interaction.response.send_message(
-                        "Are you sure you want to remove your vote?", view=view, ephemeral=True
-                    )
+        # send a single message containing both custom mention_text and the embed
+        allowed = discord.AllowedMentions(roles=True, everyone=True)
+        msg = await ctx.send(
+            content=poll.mention_text or None,
+            embed=embed,
+            view=view,
+            allowed_mentions=allowed)
 
-                # If clicking a different option: ask confirmation to change
-                if prev:
-                    view = discord.ui.View(timeout=30)
-                    btn_confirm = discord.ui.Button(label="Confirm Change", style=discord.ButtonStyle.primary)
-                    btn_cancel = discord.ui.Button(label="Cancel", style=discord.ButtonStyle.secondary)
-
-                    async def confirm_change(i: discord.Interaction):
-                        poll['vote_count'][prev] -= 1
-                        poll['user_votes'][uid] = choice
-                        poll['vote_count'][choice] = poll['vote_count'].get(choice, 0) + 1
-                        poll['total_votes'] = sum(poll['vote_count'].values())
-                        embed = poll['build_embed'](poll)
-                        await interaction.message.edit(embed=embed, view=poll['view'])
-                        await i.response.edit_message(content="✅ Vote changed.", view=None)
-                    async def cancel_change(i: discord.Interaction):
-                        await i.response.edit_message(content="❌ Vote change cancelled.", view=None)
-
-                    btn_confirm.callback = confirm_change
-                    btn_cancel.callback = cancel_change
-                    view.add_item(btn_confirm)
-                    view.add_item(btn_cancel)
-                    return await interaction.response.send_message(
-                        "You already voted. Change your vote?", view=view, ephemeral=True
-                    )
+        poll.id = msg.id
+        mark_sent(poll, embed, view)
+        # ── persist new poll to Postgres (metadata + option rows) ──────────
+        # before it goes live: journal flushes drop votes for polls without a poll_meta row
+        try:
+            await poll_store.insert_poll(self.bot.pg_pool, poll)
+        except Exception as e:
+            log.warning(f"Couldn't save new poll {msg.id}: {e}")
+            try:
+                await msg.delete()
+            except discord.HTTPException:
+                pass
+            return await ctx.send("❌ Couldn't save the poll. Please try again.")
 
-                # First-time vote: register immediately
-                poll['user_votes'][uid] = choice
-                poll['vote_count'][choice] = poll['vote_count'].get(choice, 0) + 1
-                poll['total_votes'] = sum(poll['vote_count'].values())
-                embed = poll['build_embed'](poll)
-                await interaction.response.edit_message(embed=embed, view=poll['view'])
-                rp = discord.utils.get(interaction.user.roles, id=VOTE_PENDING_ROLE_ID)
-                if rp:
-                    try: await interaction.user.remove_roles(rp, reason="Voted")
-                    except: pass
-                return
+        # a click during the insert may already have loaded (and activated) it from the database
+        if self.cached_poll(msg.id) is None:
+            self.activate_poll(poll)
 
-            # ─── multiple-vote mode ─────────────────────────────────────
-            if poll['voting_type'] == 'multiple':
-                # Ensure each option can only be voted once per user
-                user_list = poll['user_votes'].setdefault(uid, [])
-                if choice in user_list:
-                    # Toggle off: remove existing vote
-                    user_list.remove(choice)
-                    poll['vote_count'][choice] -= 1
-                else:
-                    # Toggle on: add vote only once per option
-                    user_list.append(choice)
-                    poll['vote_count'][choice] = poll['vote_count'].get(choice, 0) + 1
-
-                # Recompute totals and update embed
-                poll['total_votes'] = sum(poll['vote_count'].values())
-                embed = poll['build_embed'](poll)
-                await interaction.response.edit_message(embed=embed, view=poll['view'])
-
-                # Remove pending-role if present
-                vote_pending = discord.utils.get(interaction.user.roles, id=VOTE_PENDING_ROLE_ID)
-                if vote_pending:
-                    try: await interaction.user.remove_roles(vote_pending, reason="Voted in poll")
-                    except: pass
-                return
-                        
-        # Assemble view
+    def build_poll_view(self, poll: PollState):
+        """
+        Components for a poll message: one button per option (a single 🗳️ ballot
+        button on ranked polls), then ➕ and ⚙️. Every button is a PollButton, so
+        clicks reach the cog through the global router; the view is only a
+        template and is never kept in the view store. Closed polls get
+        everything but ⚙️ disabled.
+        """
         view = discord.ui.View(timeout=None)
         # Option buttons
-        for i,opt in enumerate(options):
-            btn = discord.ui.Button(label=OPTION_EMOJIS[i], custom_id=opt)
-            btn.callback = vote_callback
-            view.add_item(btn)
+        if poll.ranked is not None:
+            view.add_item(PollButton("rank", label="🗳️ Rank options", style=discord.ButtonStyle.primary, disabled=poll.closed))
+        else:
+            for i in range(len(poll.options)):
+                view.add_item(PollButton("vote", i, label=OPTION_EMOJIS[i], disabled=poll.closed))
         # Add option
-        plus = discord.ui.Button(label="➕", style=discord.ButtonStyle.secondary, custom_id="add_option")
-        plus.callback = self.add_option_callback
-        view.add_item(plus)
+        view.add_item(PollButton("add", label="➕", style=discord.ButtonStyle.secondary, disabled=poll.closed))
         # Settings
-        settings = discord.ui.Button(
-            label="⚙️",
-            style=discord.ButtonStyle.secondary,
-            custom_id="settings"
-        )
-        # wire directly to the Cog’s settings_callback
-        settings.callback = self.settings_callback
-        view.add_item(settings)
+        view.add_item(PollButton("settings", label="⚙️", style=discord.ButtonStyle.secondary))
+        # a finished view isn't stored against the message when sent or edited
+        view.stop()
+        return view
+
+    async def vote_callback(self, interaction: discord.Interaction, poll: PollState, pos):
+        """Shared handler for every poll option button."""
+        uid = interaction.user.id
+        if pos is None or not 0 <= pos < len(poll.options):
+            return await interaction.response.send_message("That option no longer exists.", ephemeral=True)
+        choice = poll.options[pos]
+
+        # ─── double tap ─────────────────────────────────────────────
+        # A second click on the same option right after the first repeats the
+        # first click's operation. Votes are idempotent 'set'/'add'/'remove'
+        # operations, so the repeat changes nothing; it is acknowledged silently
+        # instead of toggling the vote back or opening a remove/change prompt.
+        key = (poll.id, uid, pos)
+        intent = self.recent_clicks.get(key)
+        if intent is not None:
+            self.double_taps += 1
+            if intent != 'prompt':
+                self.apply_vote(poll, uid, intent, pos)
+            return await interaction.response.defer()
+
+        # ─── single-vote mode ───────────────────────────────────────
+        if not poll.multiple:
+            prev = poll.choices(uid)
+            # If clicking the same option: ask confirmation to remove
+            if prev == [pos]:
+                self.recent_clicks.put(key, 'prompt')
+                view = discord.ui.View(timeout=30)
+                btn_confirm = discord.ui.Button(label="Confirm Removal", style=discord.ButtonStyle.danger)
+                btn_cancel = discord.ui.Button(label="Cancel", style=discord.ButtonStyle.secondary)
+
+                async def confirm_cb(i: discord.Interaction):
+                    # decided against the state at confirm time, not when the prompt was shown
+                    changed = self.apply_vote(poll, uid, 'remove', pos)
+                    if changed is None:
+                        return await i.response.edit_message(content="This poll is closed.", view=None)
+                    await i.response.edit_message(
+                        content="✅ Vote removed." if changed else "Your vote had already changed.", view=None
+                    )
+                async def cancel_cb(i: discord.Interaction):
+                    await i.response.edit_message(content="❌ Vote removal cancelled.", view=None)
+
+                btn_confirm.callback = confirm_cb
+                btn_cancel.callback = cancel_cb
+                view.add_item(btn_confirm)
+                view.add_item(btn_cancel)
+                return await interaction.response.send_message(
+                    "Are you sure you want to remove your vote?", view=view, ephemeral=True
+                )
 
-        embed = build_embed(poll_data)
-        # send a single message containing both custom mention_text and the embed
-        content = poll_data['mention_text'] if poll_data['mention_text'] else None
-        
-        # Trying to add 'mention' with ping into poll from old code
-        allowed = discord.AllowedMentions(roles=True, everyone=True)
-        msg = await ctx.send(
-            content=poll_data['mention_text'] or None,            embed=embed, 
-            view=view, 
-            allowed_mentions=allowed)
+            # If clicking a different option: ask confirmation to change
+            if prev:
+                self.recent_clicks.put(key, 'prompt')
+                view = discord.ui.View(timeout=30)
+                btn_confirm = discord.ui.Button(label="Confirm Change", style=discord.ButtonStyle.primary)
+                btn_cancel = discord.ui.Button(label="Cancel", style=discord.ButtonStyle.secondary)
+
+                async def confirm_change(i: discord.Interaction):
+                    # total is unchanged: one vote moved between options
+                    if self.apply_vote(poll, uid, 'set', pos) is None:
+                        return await i.response.edit_message(content="This poll is closed.", view=None)
+                    await i.response.edit_message(content="✅ Vote changed.", view=None)
+                async def cancel_change(i: discord.Interaction):
+                    await i.response.edit_message(content="❌ Vote change cancelled.", view=None)
+
+                btn_confirm.callback = confirm_change
+                btn_cancel.callback = cancel_change
+                view.add_item(btn_confirm)
+                view.add_item(btn_cancel)
+                return await interaction.response.send_message(
+                    "You already voted. Change your vote?", view=view, ephemeral=True
+                )
 
-        poll_data['view'] = view
-        poll_data['build_embed'] = build_embed
-        poll_data['button_callback'] = vote_callback
-        # Store the ID as a string
-        poll_data['id'] = str(msg.id)
-        self.polls[msg.id] = poll_data
-        # ── persist new poll to Postgres ───────────────────────────
-        clean = { k: v for k, v in poll_data.items()
-                if k not in ("view","cog","build_embed","button_callback","settings_view") }
-        await self.bot.pg_pool.execute(
-            """
-            INSERT INTO polls(id, data, embed_color)
-            VALUES($1, $2::jsonb, $3)
-            ON CONFLICT (id) DO UPDATE
-            SET data = EXCLUDED.data,
-                embed_color = EXCLUDED.embed_color
-            """,
-            str(msg.id),
-            json.dumps(poll_data, default=lambda o: o.isoformat() if hasattr(o, "isoformat") else str(o)),
-            poll_data.get("embed_color", 0x00BFFF)
-        )
+            # First-time vote: register immediately, ack privately, re-render later
+            self.apply_vote(poll, uid, 'set', pos)
+            self.recent_clicks.put(key, 'set')
+            await interaction.response.send_message(f"✅ Vote recorded: **{choice}**", ephemeral=True)
+            rp = discord.utils.get(interaction.user.roles, id=VOTE_PENDING_ROLE_ID)
+            if rp:
+                try: await interaction.user.remove_roles(rp, reason="Voted")
+                except: pass
+            return
 
-        if end_time:
-            # schedule the one-hour warning
-            if poll_data['one_hour_reminder']:
-                self.bot.loop.create_task(self.schedule_poll_reminder(msg.id))
-            # schedule the actual close
-            self.bot.loop.create_task(self.schedule_poll_end(msg.id))
-            # schedule periodic countdown updates (every 60 seconds)
-            self.bot.loop.create_task(self.schedule_countdown_update(msg.id))
+        # ─── multiple-vote mode ─────────────────────────────────────
+        # Each option can only be voted once per user: clicking again toggles it off
+        changes = self.apply_vote(poll, uid, 'toggle', pos)
+        if changes == [('remove', pos)]:
+            ack = f"✅ Vote removed: **{choice}**"
+            self.recent_clicks.put(key, 'remove')
+        else:
+            ack = f"✅ Vote added: **{choice}**"
+            self.recent_clicks.put(key, 'add')
+
+        # Ack privately; the public re-render was queued by apply_vote
+        await interaction.response.send_message(ack, ephemeral=True)
+
+        # Remove pending-role if present
+        vote_pending = discord.utils.get(interaction.user.roles, id=VOTE_PENDING_ROLE_ID)
+        if vote_pending:
+            try: await interaction.user.remove_roles(vote_pending, reason="Voted in poll")
+            except: pass
+
+    async def rank_callback(self, interaction: discord.Interaction, poll: PollState):
+        """Ranked polls: open a private ballot the user fills in one choice at a time."""
+        view = RankedBallotView(self, poll, interaction.user.id)
+        await interaction.response.send_message(view.content(), view=view, ephemeral=True)
 
     async def get_user_timezone(self, user_id):
         """Fetch a user's timezone from Postgres (default UTC)."""
@@ -776,93 +1240,216 @@ class PollCog(commands.Cog):
         )
         return row["timezone"] if row and row["timezone"] else "UTC"
 
+    def apply_vote(self, poll: PollState, user_id, op, position=None, ranking=None):
+        """
+        Apply one click to a poll (see PollState.apply) and record its effects:
+        bump the render version, journal each row change and queue a coalesced
+        re-render. Nothing here awaits, so clicks on the same poll are applied
+        one at a time, in arrival order; REST work happens after it returns.
+        Returns the row changes, or None (nothing applied) if the poll has
+        closed, e.g. while a confirmation prompt was open.
+        """
+        if poll.closed:
+            return None
+        had_voted = user_id in poll.user_votes
+        changes = poll.apply(user_id, op, position, ranking)
+        if changes:
+            poll.mark_dirty()
+            self.journal.record(poll, user_id, changes)
+            if (user_id in poll.user_votes) != had_voted:
+                guild_id = self.active.guild_of(poll.id)
+                self.active.voter_changed(
+                    poll.id, user_id, not had_voted, self._player_ids.get(guild_id, ())
+                )
+            poll.record_timeline(time.time(), changes)
+            self._timelines_dirty.add(poll.id)
+            self.render.request(poll.id)
+        return changes
+
+    async def _flush_poll_message(self, message_id):
+        """Coalescer flush: push the poll's current state to its public message (skips no-op edits)."""
+        poll = self.cached_poll(message_id)
+        if not poll:
+            return False
+        return await self._push_render(poll)
+
+    async def _push_render(self, poll: PollState):
+        """Edit a poll's public message to match its state; False if there was nothing to send."""
+        channel = self.bot.get_channel(poll.channel_id)
+        if channel is None:
+            return False
+        embed = build_poll_embed(poll)
+        view = self.build_poll_view(poll)
+        signature = embed_signature(embed, view)
+        cache = poll.render_cache()
+        if signature == cache.last_sent:
+            return False
+        # partial message: edit straight away without a fetch_message round trip
+        await channel.get_partial_message(poll.id).edit(embed=embed, view=view)
+        cache.last_sent = signature
+        return True
+
+    @commands.command(name="pollstats", aliases=["pstats"])
+    @commands.has_any_role('The BotFather', 'Moderator', 'Manager', 'Server Owner')
+    async def poll_stats(self, ctx):
+        """Show render coalescing and vote journal counters."""
+        stats = self.render.stats()
+        journal = self.journal.stats()
+        embed = discord.Embed(title="📊 Poll Render Stats", color=0x00BFFF)
+        embed.description = (
+            f"Votes received: **{stats['votes_received']}**\n"
+            f"Message edits sent: **{stats['edits_sent']}**\n"
+            f"Edits saved by coalescing: **{stats['edits_saved']}**\n"
+            f"Identical edits skipped: **{stats['edits_skipped']}**\n"
+            f"Failed edits: **{stats['edits_failed']}**\n"
+            f"Edits pending: **{stats['pending']}**\n"
+            f"Window: **{self.render.window:g}s**\n\n"
+            f"Journal events: **{journal['appended']}** appended, **{journal['flushed']}** flushed "
+            f"in **{journal['flushes']}** batch(es) as **{journal['rows']}** row write(s), **{journal['buffered']}** buffered\n"
+            f"Polls in memory: **{len(self.polls)}** open, "
+            f"**{len(self.closed_polls)}/{self.closed_polls.maxsize}** closed cached"
+        )
+        cs = self.closed_polls.stats()
+        ar = self.archive_stats
+        embed.description += (
+            f"\nClosed-poll cache: **{cs['hits']}** hit(s), **{cs['misses']}** miss(es), "
+            f"**{cs['evictions']}** eviction(s)\n"
+            f"Retention: **{ar['archived']}** poll(s) archived, **{ar['pruned']}** archive row(s) pruned "
+            f"in **{ar['runs']}** run(s)"
+        )
+        # every batch still running, then the latest finished ones (3 lines in all, or more if more are running)
+        batches = list(self.reminder_batches.items())
+        running = [(mid, b) for mid, b in batches if b.finished is None]
+        finished = [(mid, b) for mid, b in batches if b.finished is not None]
+        for message_id, batch in running + finished[len(finished) - max(0, 3 - len(running)):]:
+            rs = batch.stats()
+            embed.description += (
+                f"\nReminder `{message_id}`: **{rs['done']}/{rs['total']}** roles assigned in "
+                f"**{rs['seconds']:.1f}s** ({rs['failed'] + rs['forbidden']} failed, "
+                f"{rs['retries']} retried, {rs['pending']} pending)"
+            )
+        embed.description += (
+            f"\nDuplicate deliveries dropped: **{self.seen_interactions.hits}** "
+            f"of **{self.seen_interactions.hits + self.seen_interactions.misses}** clicks · "
+            f"double taps absorbed: **{self.double_taps}**"
+        )
+        if self.startup_stats:
+            st = self.startup_stats
+            embed.description += (
+                f"\nStartup: **{st['polls']}** open poll(s) in **{st['seconds']:.2f}s**, "
+                f"RSS {st['rss_before']:.1f} → {st['rss_after']:.1f} MiB"
+            )
+        if self.catch_up_stats:
+            st = self.catch_up_stats
+            batch = st["batch"]
+            embed.description += (
+                f"\nStartup catch-up: **{st['closed']}** overdue poll(s) closed"
+                + (f" ({batch.done}/{batch.total} messages updated, {batch.retries} retried)" if batch else "")
+                + f", missed reminders: **{st['late']}** late, **{st['skipped']}** skipped"
+            )
+        await ctx.send(embed=embed)
+
     # Shared callbacks for add_option and settings
-    async def add_option_callback(self, interaction: discord.Interaction):
-        pid = interaction.message.id
-        poll = self.polls.get(pid)
-        if not poll or interaction.user.id != poll['author_id']:
+    async def add_option_callback(self, interaction: discord.Interaction, poll: PollState):
+        if not poll or interaction.user.id != poll.author_id:
             return await interaction.response.send_message("No permission.", ephemeral=True)
-        await interaction.response.send_modal(AddOptionModal(poll, interaction.message))
+        await interaction.response.send_modal(AddOptionModal(self, poll, interaction.message))
 
-    async def settings_callback(self, interaction: discord.Interaction):
-        poll = self.polls.get(interaction.message.id)
+    async def settings_callback(self, interaction: discord.Interaction, poll: PollState):
         roles = [r.name for r in interaction.user.roles]
         if not any(r in roles for r in ('Server Owner','Manager','Moderator','The BotFather')):
             return await interaction.response.send_message("No permission.", ephemeral=True)
         settings_view = SettingsView(self, poll, interaction.message.id)
-        self.polls[interaction.message.id]['settings_view'] = settings_view
         await interaction.response.send_message(
             "Poll Settings:",
             view=settings_view,
             ephemeral=True
         )
         
-    async def schedule_poll_end(self, message_id):
+    # ─── Timed poll jobs (one shared heap scheduler, see jobqueue.py) ─────────
+    POLL_JOB_KINDS = ("close", "reminder", "countdown")
+
+    def schedule_poll_jobs(self, message_id):
         """
-        When end_time is reached: mark closed, disable voting, update embed & view,
-        then after 24h remove from memory.
+        (Re)schedule the close, one-hour reminder and countdown jobs for a poll
+        from its current end_time. Existing jobs are moved in place; jobs that no
+        longer apply (end time cleared, poll closed) are cancelled.
         """
         poll = self.polls.get(message_id)
-        if not poll or not poll.get('end_time'):
+        end = poll.aware_end() if poll else None
+        if not poll or poll.closed or not end:
+            for kind in ("close", "reminder", "countdown"):
+                self.jobs.cancel((kind, message_id))
             return
-        now = datetime.utcnow().replace(tzinfo=pytz.utc)
-        wait = (poll['end_time'] - now).total_seconds()
-        if wait > 0:
-            await asyncio.sleep(wait)
-
-        # mark as closed
-        poll['closed'] = True
+        question = poll.question[:40]
 
-        # disable all buttons except settings
-        for item in poll['view'].children:
-            # each item is a Button
-            if getattr(item, 'custom_id', None) != 'settings':
-                item.disabled = True
-
-        # fetch channel & message, then apply updated embed and disabled view
-        channel = self.bot.get_channel(poll['channel_id'])
-        try:
-            msg = await channel.fetch_message(message_id)
-            await msg.edit(embed=poll['build_embed'](poll), view=poll['view'])
-        except Exception:
-            pass
+        self.jobs.schedule(
+            ("close", message_id), end.timestamp(),
+            lambda: self._close_poll_job(message_id), f"Close “{question}”"
+        )
+        if poll.one_hour_reminder and poll.reminder_status is None:
+            self.jobs.schedule(
+                ("reminder", message_id), (end - timedelta(hours=1)).timestamp(),
+                lambda: self._reminder_job(message_id), f"1h reminder “{question}”"
+            )
+        else:
+            self.jobs.cancel(("reminder", message_id))
+        # relative timestamps count down on the client; only literal text needs edits
+        if POLL_COUNTDOWN_MODE == 'literal':
+            if ("countdown", message_id) not in self.jobs:
+                self._schedule_countdown(message_id, end)
+        else:
+            self.jobs.cancel(("countdown", message_id))
 
-        # wait 24h then purge
-        await asyncio.sleep(86400)
-        self.polls.pop(message_id, None)
+    def cancel_poll_jobs(self, message_id):
+        for kind in self.POLL_JOB_KINDS:
+            self.jobs.cancel((kind, message_id))
 
-    async def schedule_poll_reminder(self, message_id):
+    async def _close_poll_job(self, message_id):
+        """
+        When end_time is reached: mark closed, disable voting, update embed & view,
+        then move the poll to the closed-poll cache.
+        """
         poll = self.polls.get(message_id)
-        if not poll or not poll.get('end_time'):
-            log.warning(f"No end_time for poll {message_id}, skipping reminder")
+        if not poll or poll.closed:
             return
 
-        # Ensure end_time is timezone-aware UTC
-        end_time = poll['end_time']
-        if end_time.tzinfo is None:
-            end_time = end_time.replace(tzinfo=pytz.utc)
+        # mark as closed; nothing else for this poll needs to fire
+        poll.closed = True
+        poll.mark_dirty()
+        self.retire_poll(message_id)
 
-        now = datetime.utcnow().replace(tzinfo=pytz.utc)
-        remind_at = end_time - timedelta(hours=1)
-
-        wait = (remind_at - now).total_seconds()
-        log.info(f"Poll {message_id}: now={now.isoformat()}, remind_at={remind_at.isoformat()}, wait={wait}")
+        # apply updated embed and disabled view (all but settings) straight away,
+        # before the DB write, so a failed write can't leave live buttons showing
+        try:
+            await self.render.flush_now(message_id)
+        except Exception as e:
+            log.warning(f"Couldn't update closed poll {message_id}'s message: {e}")
+        # closed polls aren't reloaded at startup, only materialized on demand; if this
+        # write fails the poll loads as overdue next start and is closed again then
+        try:
+            await poll_store.update_meta(self.bot.pg_pool, message_id, closed=True)
+        except Exception as e:
+            log.warning(f"Couldn't persist closure of poll {message_id}: {e}")
 
-        # if wait is positive, sleep; otherwise fall through immediately
-        if wait > 0:
-            await asyncio.sleep(wait)
-        else:
-            log.warning(f"Poll {message_id}: remind time already passed ({wait}s)—sending immediately")
+    async def _reminder_job(self, message_id):
+        poll = self.polls.get(message_id)
+        if not poll or not poll.end_time:
+            log.warning(f"No end_time for poll {message_id}, skipping reminder")
+            return
 
         # bail out if poll closed
-        if poll.get('closed'):
+        if poll.closed:
             log.info(f"Poll {message_id} already closed, skipping reminder")
             return
+        # sent (or skipped) before a restart
+        if poll.reminder_status is not None:
+            return
 
         # grab channel
-        channel = self.bot.get_channel(poll['channel_id'])
+        channel = self.bot.get_channel(poll.channel_id)
         if not channel:
-            log.error(f"Couldn’t find channel {poll['channel_id']} for poll {message_id}")
+            log.error(f"Couldn’t find channel {poll.channel_id} for poll {message_id}")
             return
         guild = channel.guild
 
@@ -882,58 +1469,105 @@ class PollCog(commands.Cog):
             )
             return
 
-        # --- ASSIGN @Vote_Pending to non-voters ---
-        # normalize your vote list to ints
-        user_votes = set(int(uid) for uid in poll.get('user_votes', []))
-        for member in player_role.members:
-            if member.bot:
-                continue
-            if member.id in user_votes:
+        # --- ASSIGN @Vote_Pending to non-voters (skipping anyone who already has it) ---
+        members = []
+        for uid in poll.not_voted(self.player_ids(guild)):
+            member = guild.get_member(uid)
+            if member is None or member.bot or vote_pending_role in member.roles:
                 continue
+            members.append(member)
 
-            try:
-                await member.add_roles(vote_pending_role, reason="Poll reminder: please vote")
-                log.info("→ Assigned Vote Pending to %s", member)
-            except discord.Forbidden:
-                log.error("Missing permission to assign Vote Pending to %s", member)
-            except Exception as e:
-                log.exception("Error assigning Vote Pending to %s: %s", member, e)
+        async def progress(batch):
+            log.info(
+                "Vote Pending for poll %s: %d/%d assigned, %d failed, %d retried",
+                message_id, batch.done, batch.total, batch.failed + batch.forbidden, batch.retries
+            )
+
+        batch = RoleBatch(
+            vote_pending_role, members, reason="Poll reminder: please vote",
+            concurrency=POLL_ROLE_CONCURRENCY, on_progress=progress
+        )
+        self.reminder_batches[message_id] = batch
+        # !!pollstats shows the latest few; the oldest finished batches beyond 10 are dropped.
+        # Running ones always stay: this dict keeps their worker task referenced.
+        finished = [mid for mid, b in self.reminder_batches.items() if b.finished is not None]
+        for mid in finished[:max(0, len(self.reminder_batches) - 10)]:
+            del self.reminder_batches[mid]
+        # ping once everyone has the role, or at the deadline with whoever has it by then
+        if not await batch.run(deadline=POLL_REMINDER_DEADLINE):
+            log.warning(
+                "Vote Pending for poll %s hit the %ss deadline with %d member(s) left; pinging now",
+                message_id, POLL_REMINDER_DEADLINE, batch.pending
+            )
 
         # --- NOW SEND THE PINGING REMINDER MESSAGE ---
+        # a relative timestamp from the real end time: a late (catch-up) reminder or a
+        # slow role batch can leave well under an hour
+        end_ts = int(poll.aware_end().timestamp())
         try:
             await channel.send(
-                f"{vote_pending_role.mention} Poll “{poll['question']}” ends in 1 hour—please cast your vote!",
+                f"{vote_pending_role.mention} Poll “{poll.question}” ends <t:{end_ts}:R>—please cast your vote!",
                 allowed_mentions=discord.AllowedMentions(roles=True)
             )
-            log.info(f"Sent 1-hour reminder for poll {message_id}")
+            log.info(f"Sent reminder for poll {message_id}")
         except Exception as e:
             log.exception("Failed to send reminder message for poll %s: %s", message_id, e)
+            return
+        # remembered across restarts, so a reminder never goes out twice
+        poll.reminder_status = "late" if message_id in self._late_reminders else "sent"
+        self._late_reminders.discard(message_id)
+        await poll_store.update_meta(self.bot.pg_pool, message_id, reminder_status=poll.reminder_status)
 
+    def _schedule_countdown(self, message_id, end):
+        """Arm the next literal countdown refresh, just after the displayed minute changes."""
+        now = datetime.utcnow().replace(tzinfo=pytz.utc)
+        interval = countdown_interval(end - now)
+        # land on the boundary where the rounded-down text changes, not mid-interval
+        remaining = (end - now).total_seconds()
+        delay = (remaining % interval) or interval
+        poll = self.polls[message_id]
+        self.jobs.schedule(
+            ("countdown", message_id), time.time() + delay + 1,
+            lambda: self._countdown_job(message_id), f"Countdown “{poll.question[:40]}”"
+        )
 
-    async def schedule_countdown_update(self, message_id):
-        # loop until closed or past end, re-fetching poll each iteration
-        while True:
-            poll = self.polls.get(message_id)
-            if not poll or not poll.get('end_time'):
-                return
-            now = datetime.utcnow().replace(tzinfo=pytz.utc)
-            # stop if closed or time’s up
-            if poll.get('closed') or poll['end_time'] <= now:
-                break
-            try:
-                channel = self.bot.get_channel(poll['channel_id'])
-                msg = await channel.fetch_message(message_id)
-                await msg.edit(embed=poll['build_embed'](poll), view=poll['view'])
-            except Exception:
-                pass
-            # wait one minute before next update
-            await asyncio.sleep(60)
+    async def _countdown_job(self, message_id):
+        """Literal mode only: refresh the "Time remaining" text, then re-arm."""
+        poll = self.polls.get(message_id)
+        end = poll.aware_end() if poll else None
+        if not end:
+            return
+        now = datetime.utcnow().replace(tzinfo=pytz.utc)
+        # stop if closed or time’s up
+        if poll.closed or end <= now:
+            return
+        await self.render.flush_now(message_id)
+        self._schedule_countdown(message_id, end)
+
+    @commands.command(name="jobs")
+    @commands.has_any_role('The BotFather', 'Moderator', 'Manager', 'Server Owner')
+    async def list_jobs(self, ctx):
+        """List pending poll jobs from the shared scheduler, soonest first."""
+        pending = self.jobs.pending()
+        if not pending:
+            return await ctx.send("No pending poll jobs.")
+        lines = ["──────────────────────────────"]
+        for job in pending[:25]:
+            kind, message_id = job.key
+            lines.append(f"🔸 **{kind}** · {job.description} · `{message_id}`\n   - <t:{int(job.when)}:R>")
+        if len(pending) > 25:
+            lines.append(f"…and {len(pending) - 25} more")
+        embed = discord.Embed(title=f"Pending Poll Jobs ({len(pending)})  ⏱️", color=0xFF8C00)
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"Fired: {self.jobs.fired} | Failed: {self.jobs.failed}")
+        await ctx.send(embed=embed)
 
     @app_commands.command(name="poll", description="Create a poll via slash")
     @app_commands.describe(
         question="The poll question",
         mentions="Text to mention (e.g. @everyone)",
         multiple="Allow multiple votes",
+        ranked="Ranked choice: voters order the options, decided by instant runoff",
         end_time="End time MM/DD HH:MM (optional)",
         one_hour_reminder="Send 1-hour warning to non-voters",
     )
@@ -943,6 +1577,7 @@ class PollCog(commands.Cog):
         question: str,
         mentions: str = None,
         multiple: bool = False,
+        ranked: bool = False,
         end_time: str = None,
         one_hour_reminder: bool = False,
         option1: str = None,                          
@@ -967,9 +1602,11 @@ class PollCog(commands.Cog):
         ) if o]
         if len(opts) < 2:
             return await interaction.followup.send("Provide at least 2 options.", ephemeral=True)
+        if multiple and ranked:
+            return await interaction.followup.send("Pick either multiple or ranked, not both.", ephemeral=True)
 
         # 3) Reconstruct the text‐command style args string
-        # build exactly: [<@&role>] [multiple ] [reminder ] Question | Opt1 | Opt2 [| end_time]
+        # build exactly: [<@&role>] [multiple |ranked ] [reminder ] Question | Opt1 | Opt2 [| end_time]
         question_and_opts = question + " | " + " | ".join(opts)
         if end_time:
             question_and_opts += f" | {end_time}"
@@ -977,6 +1614,8 @@ class PollCog(commands.Cog):
         flags = ""
         if multiple:
             flags += "multiple "
+        if ranked:
+            flags += "ranked "
         if one_hour_reminder:
             flags += "one_hour_reminder "
 
@@ -1007,6 +1646,7 @@ class PollCog(commands.Cog):
                 mention=bool(mentions),
                 mention_text=mentions or "",
                 multiple=multiple,
+                ranked=ranked,
                 one_hour_reminder=one_hour_reminder,
                 end_time=end_time_aware
             )
@@ -1015,33 +1655,84 @@ class PollCog(commands.Cog):
             await interaction.followup.send(f"🚨 Poll creation error: {e}", ephemeral=True)
             raise
 
+    # ─── /polls … (poll insights) ─────────────────────────────────────────────
+    polls_group = app_commands.Group(name="polls", description="Poll insights")
+
+    @polls_group.command(name="history", description="When a poll's votes arrived")
+    @app_commands.describe(
+        poll="Poll message ID or link",
+        export_csv="Attach the full timeline as CSV",
+    )
+    @app_commands.checks.has_any_role('The BotFather', 'Moderator', 'Manager', 'Server Owner')
+    async def poll_history(self, interaction: discord.Interaction, poll: str, export_csv: bool = False):
+        """Show a poll's vote timeline: per-minute recently, coarser buckets further back."""
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        match = re.search(r"(\d{15,20})/?\s*$", poll.strip())
+        state = await self.get_poll(int(match.group(1))) if match else None
+        if state is None:
+            return await interaction.followup.send("❌ No poll found for that message ID or link.", ephemeral=True)
+
+        series = state.timeline.series() if state.timeline else []
+        embed = discord.Embed(title=f"🕒 Vote timeline: {state.question[:200]}", color=state.embed_color)
+        if not series:
+            embed.description = "No vote activity recorded for this poll."
+        else:
+            shown = series[-POLL_HISTORY_ROWS:]
+            peak = max(adds for _, _, adds, _ in shown) or 1
+            lines = []
+            step = None
+            for start, bucket, adds, removes in shown:
+                if bucket != step:
+                    step = bucket
+                    lines.append(f"**Every {format_time_delta(timedelta(seconds=step))}:**")
+                bar = "▇" * (round(adds / peak * 10) or (1 if adds else 0))
+                lines.append(f"<t:{start}:f> · +{adds} / −{removes} {bar}")
+            embed.description = "\n".join(lines)
+            added = sum(p[2] for p in series)
+            removed = sum(p[3] for p in series)
+            embed.add_field(name="Recorded", value=f"+{added} / −{removed} across {len(series)} bucket(s)")
+            end = state.aware_end()
+            if state.one_hour_reminder and end:
+                reminder = int((end - timedelta(hours=1)).timestamp())
+                embed.add_field(
+                    name="After the 1h reminder",
+                    value=f"+{state.timeline.votes_since(reminder)} vote(s)"
+                )
+            if len(series) > len(shown):
+                embed.set_footer(text=f"Latest {len(shown)} of {len(series)} buckets")
+
+        files = []
+        if export_csv and series:
+            files.append(discord.File(
+                io.BytesIO(timeline_csv(series).encode("utf-8")), filename=f"poll_{state.id}_timeline.csv"
+            ))
+        await interaction.followup.send(embed=embed, files=files, ephemeral=True)
+
+    @polls_group.command(name="active", description="Open polls: closing time, votes and turnout")
+    @app_commands.checks.has_any_role('The BotFather', 'Moderator', 'Manager', 'Server Owner')
+    async def polls_active(self, interaction: discord.Interaction):
+        """Dashboard of open polls, soonest to close first; no fetches or queries, just the index."""
+        view = ActivePollsView(self)
+        await interaction.response.send_message(embed=view.build_embed(), view=view, ephemeral=True)
+
 class ConfirmChangeView(discord.ui.View):
-    def __init__(self, poll, user_id, new_choice):
+    def __init__(self, cog, poll: PollState, user_id, new_choice):
         super().__init__(timeout=60)
+        self.cog = cog
         self.poll = poll
         self.user_id = user_id
         self.new_choice = new_choice
 
     @discord.ui.button(label="Change Vote", style=discord.ButtonStyle.primary)
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # 1) remove old vote
-        prev = self.poll['user_votes'].get(self.user_id)
-        if prev:
-            self.poll['vote_count'][prev] -= 1
-
-        # 2) set new vote
-        self.poll['user_votes'][self.user_id] = self.new_choice
-        self.poll['vote_count'][self.new_choice] = (
-            self.poll['vote_count'].get(self.new_choice, 0) + 1
-        )
-        # 3) recompute totals if you display percentages
-        self.poll['total_votes'] = sum(self.poll['vote_count'].values())
-
-        # 4) update the original message
-        channel = interaction.guild.get_channel(self.poll['channel_id'])
-        msg = await channel.fetch_message(self.poll['id'])
-        await msg.edit(embed=self.poll['build_embed'](self.poll), view=self.poll['view'])
-
+        pos = self.poll.position_of(self.new_choice)
+        if pos is None:
+            return await interaction.response.edit_message(content="That option no longer exists.", view=None)
+        # replace the old vote with the new one in a single step (the running total follows along)
+        if self.cog.apply_vote(self.poll, self.user_id, 'set', pos) is None:
+            return await interaction.response.edit_message(content="This poll is closed.", view=None)
+
+        # ack; the cog coalesces the public re-render
         await interaction.response.send_message("✅ Vote changed.", ephemeral=True)
         self.stop()
 
@@ -1052,26 +1743,18 @@ class ConfirmChangeView(discord.ui.View):
         self.stop()
 
 class RemoveVoteView(discord.ui.View):
-    def __init__(self, poll: dict, user_id: int, *, timeout: float = 180):
+    def __init__(self, cog, poll: PollState, user_id: int, *, timeout: float = 180):
         super().__init__(timeout=timeout)
+        self.cog = cog
         self.poll = poll
         self.user_id = user_id
 
     @discord.ui.button(label="✅ Remove Vote", style=discord.ButtonStyle.danger)
     async def confirm_remove(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # remove the user's previous vote
-        choice = self.poll["user_votes"].pop(self.user_id, None)
-        if choice is not None:
-            # decrement that option's count
-            self.poll["vote_count"][choice] = max(
-                0, self.poll["vote_count"].get(choice, 1) - 1
-            )
-        # update the embed in the original poll message
-        channel = interaction.guild.get_channel(self.poll["channel_id"])
-        msg     = await channel.fetch_message(self.poll["id"])
-        
-        await msg.edit(embed=self.poll["build_embed"](self.poll), view=self.poll["view"])
-        # acknowledge to the user
+        # remove the user's previous vote(s)
+        if self.cog.apply_vote(self.poll, self.user_id, "clear") is None:
+            return await interaction.response.edit_message(content="This poll is closed.", view=None)
+        # acknowledge to the user; the cog coalesces the public re-render
         await interaction.response.send_message("Your vote was removed.", ephemeral=True)
         self.stop()
 
@@ -1081,10 +1764,90 @@ class RemoveVoteView(discord.ui.View):
         await interaction.response.edit_message(content="❌ Vote unchanged.", view=None)
         self.stop()
 
+class RankedBallotView(discord.ui.View):
+    """
+    Private ballot for a ranked poll: each pick from the select becomes the
+    next rank, then Submit casts the whole ordering in one vote. Options left
+    unranked get nothing from this ballot.
+    """
+
+    def __init__(self, cog, poll: PollState, user_id: int):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.poll = poll
+        self.user_id = user_id
+        self.ranking = []
+        self._build()
+
+    def content(self):
+        lines = ["**Rank the options**, most preferred first."]
+        current = self.poll.ranked.ballot(self.user_id)
+        if current and not self.ranking:
+            lines.append("Your ballot: " + " > ".join(self.poll.options[p] for p in current))
+        lines += [
+            f"{n}. {OPTION_EMOJIS[p]} {self.poll.options[p]}"
+            for n, p in enumerate(self.ranking, 1) if p < len(self.poll.options)
+        ]
+        return "\n".join(lines)
+
+    def _build(self):
+        self.clear_items()
+        remaining = [i for i in range(len(self.poll.options)) if i not in self.ranking]
+        if remaining:
+            select = discord.ui.Select(
+                placeholder=f"Choice #{len(self.ranking) + 1}",
+                options=[
+                    discord.SelectOption(label=self.poll.options[i][:100], value=str(i), emoji=OPTION_EMOJIS[i])
+                    for i in remaining
+                ],
+            )
+
+            async def pick(interaction: discord.Interaction):
+                self.ranking.append(int(select.values[0]))
+                self._build()
+                await interaction.response.edit_message(content=self.content(), view=self)
+
+            select.callback = pick
+            self.add_item(select)
+
+        submit = discord.ui.Button(label="Submit ballot", style=discord.ButtonStyle.success, disabled=not self.ranking)
+        submit.callback = self.submit
+        self.add_item(submit)
+        restart = discord.ui.Button(label="Start over", style=discord.ButtonStyle.secondary, disabled=not self.ranking)
+        restart.callback = self.restart
+        self.add_item(restart)
+        if self.user_id in self.poll.user_votes:
+            withdraw = discord.ui.Button(label="Withdraw ballot", style=discord.ButtonStyle.danger)
+            withdraw.callback = self.withdraw
+            self.add_item(withdraw)
+
+    async def submit(self, interaction: discord.Interaction):
+        if self.cog.apply_vote(self.poll, self.user_id, 'rank', ranking=self.ranking) is None:
+            return await interaction.response.edit_message(content="This poll is closed.", view=None)
+        ballot = " > ".join(self.poll.labels_for(self.user_id))
+        await interaction.response.edit_message(content=f"✅ Ballot recorded: **{ballot}**", view=None)
+        self.stop()
+        rp = discord.utils.get(interaction.user.roles, id=VOTE_PENDING_ROLE_ID)
+        if rp:
+            try: await interaction.user.remove_roles(rp, reason="Voted")
+            except: pass
+
+    async def restart(self, interaction: discord.Interaction):
+        self.ranking = []
+        self._build()
+        await interaction.response.edit_message(content=self.content(), view=self)
+
+    async def withdraw(self, interaction: discord.Interaction):
+        if self.cog.apply_vote(self.poll, self.user_id, 'clear') is None:
+            return await interaction.response.edit_message(content="This poll is closed.", view=None)
+        await interaction.response.edit_message(content="✅ Ballot withdrawn.", view=None)
+        self.stop()
+
 class ColorModal(discord.ui.Modal):
-    def __init__(self, poll_data):
+    def __init__(self, cog, poll: PollState):
         super().__init__(title="Choose embed color")
-        self.poll = poll_data
+        self.cog = cog
+        self.poll = poll
         self.color_input = discord.ui.TextInput(
             label="Hex code (#RRGGBB) or name (e.g. RED,PURPLE)",
             placeholder="#FF00FF"
@@ -1135,41 +1898,18 @@ class ColorModal(discord.ui.Modal):
 
         color_int = int(hexcode, 16)
 
-        poll = self.poll  # use the poll_data we stored in __init__
-        poll['embed_color'] = color_int
-        # ── strip out non‑serializable entries before saving ─────────────────
-        clean = {
-            k: v
-            for k, v in poll.items()
-            if k not in ("view", "cog", "build_embed", "button_callback", "settings_view")
-        }
-        # ── persist the new color and cleaned data ──────────────────────────
-        # strip non‑serializable bits
-        clean = {
-            k: v
-            for k, v in poll.items()
-            if k not in ("view","cog","build_embed","button_callback","settings_view")
-        }
-        await interaction.client.pg_pool.execute(
-            "UPDATE polls SET embed_color = $1, data = $2::jsonb WHERE id = $3",
-            color_int,
-            json.dumps(clean, default=lambda o: o.isoformat() if hasattr(o, "isoformat") else str(o)),
-            poll["id"]
-        )
-
-        # ── persist cleaned data-only (no color change) ─────────────────────
-        await interaction.client.pg_pool.execute(
-            "UPDATE polls SET data = $1::jsonb WHERE id = $2",
-            json.dumps(clean, default=lambda o: o.isoformat() if hasattr(o, "isoformat") else str(o)),
-            poll["id"]
-        )
+        poll = self.poll  # use the poll we stored in __init__
+        poll.embed_color = color_int
+        # ── persist the new colour: one column on one poll_meta row ─────────
+        await poll_store.update_meta(interaction.client.pg_pool, poll.id, embed_color=color_int)
 
         # 2) edit the public poll message embed (so everyone sees the new color)
-        channel = interaction.client.get_channel(poll['channel_id'])
-        msg = await channel.fetch_message(int(poll["id"]))
-        embed = poll['build_embed'](poll)
-        embed.color = color_int
-        await msg.edit(embed=embed, view=poll['view'])
+        channel = interaction.client.get_channel(poll.channel_id)
+        msg = await channel.fetch_message(poll.id)
+        embed = build_poll_embed(poll)
+        view = self.cog.build_poll_view(poll)
+        await msg.edit(embed=embed, view=view)
+        mark_sent(poll, embed, view)
 
         # 3) send one follow‑up in the modal thread to confirm success
         if interaction.message:
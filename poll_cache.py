@@ -0,0 +1,111 @@
+import time
+from collections import OrderedDict
+
+
+class PollCache:
+    """
+    Least-recently-used cache of closed polls.
+
+    Open polls are pinned in PollCog.polls for as long as they run; once a
+    poll closes it moves here, and is loaded back here from Postgres (or the
+    archive) when a late interaction needs it. Only `maxsize` closed polls are
+    kept; using one makes it the most recent, and adding past the bound
+    evicts the least recent.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = max(1, maxsize)
+        self._polls = OrderedDict()     # poll id → PollState, least recent first
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, poll_id):
+        poll = self._polls.get(poll_id)
+        if poll is None:
+            self.misses += 1
+            return None
+        self._polls.move_to_end(poll_id)
+        self.hits += 1
+        return poll
+
+    def peek(self, poll_id):
+        """Look a poll up without counting a hit or refreshing its recency."""
+        return self._polls.get(poll_id)
+
+    def put(self, poll):
+        self._polls[poll.id] = poll
+        self._polls.move_to_end(poll.id)
+        while len(self._polls) > self.maxsize:
+            self._polls.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, poll_id):
+        return self._polls.pop(poll_id, None)
+
+    def __contains__(self, poll_id):
+        return poll_id in self._polls
+
+    def __len__(self):
+        return len(self._polls)
+
+    def stats(self):
+        return {
+            "size": len(self._polls),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TTLCache:
+    """
+    Keys remembered for `ttl` seconds (at most `maxsize` at a time), with an
+    optional value each. Entries go in in time order, so expiry just pops
+    from the front; no timers or background task.
+    """
+
+    def __init__(self, ttl, maxsize=50_000):
+        self.ttl = ttl
+        self.maxsize = max(1, maxsize)
+        self._entries = OrderedDict()   # key → (expires at, value), oldest first
+
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now):
+        entries = self._entries
+        while entries:
+            expires, _ = next(iter(entries.values()))
+            if expires > now and len(entries) <= self.maxsize:
+                break
+            entries.popitem(last=False)
+
+    def seen(self, key):
+        """True if `key` was recorded within the TTL (a hit); otherwise record it and return False."""
+        now = time.monotonic()
+        self._expire(now)
+        if key in self._entries:
+            self.hits += 1
+            return True
+        self.misses += 1
+        self._entries[key] = (now + self.ttl, None)
+        self._expire(now)
+        return False
+
+    def get(self, key):
+        """The live value stored under `key`, or None."""
+        self._expire(time.monotonic())
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def put(self, key, value):
+        now = time.monotonic()
+        self._entries.pop(key, None)
+        self._entries[key] = (now + self.ttl, value)
+        self._expire(now)
+
+    def __len__(self):
+        return len(self._entries)
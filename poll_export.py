@@ -0,0 +1,187 @@
+import csv
+import gzip
+import io
+import json
+from tempfile import SpooledTemporaryFile
+
+# Keep up to this much of each part in memory before it spills to a temp file
+SPOOL_MAX = 1024 * 1024
+# Discord's upload limit for guilds without boosts (discord.py's Guild.filesize_limit
+# default); callers pass guild.filesize_limit
+DEFAULT_LIMIT = 25 * 1024 * 1024
+# the limit covers every attachment of a message plus the request around them,
+# so parts and each message's group of parts stay this far below it
+MESSAGE_SLACK = 256 * 1024
+# gzip holds back compressed output, so leave this much more headroom below the limit
+GZIP_SLACK = 256 * 1024
+# a message carries at most this many attachments
+MAX_FILES = 10
+
+FORMATS = ("csv", "jsonl")
+
+
+def export_rows(poll, user_ids, names, non_voters):
+    """
+    Yield (user_id, display name, chosen labels) for every voter, then
+    (user_id, display name, None) for every non-voter. Labels are read lazily
+    so nothing but the id lists is materialized up front.
+    """
+    for uid in user_ids:
+        labels = poll.labels_for(uid)
+        if labels:
+            yield uid, names.get(uid, str(uid)), labels
+    for uid in non_voters:
+        yield uid, names.get(uid, str(uid)), None
+
+
+def export_rounds(poll):
+    """
+    (round number, [(label, votes), ...], exhausted, eliminated labels,
+    winner label or None) for each instant-runoff round of a ranked poll.
+    """
+    if poll.ranked is None or not len(poll.ranked):
+        return []
+    labels = poll.options
+    return [
+        (n, [(labels[p], v) for p, v in rnd.tallies.items()], rnd.exhausted,
+         [labels[p] for p in rnd.eliminated], None if rnd.winner is None else labels[rnd.winner])
+        for n, rnd in enumerate(poll.ranked.rounds(len(labels)), 1)
+    ]
+
+
+class ExportWriter:
+    """
+    Streams export rows into spooled temp files, starting a new part before
+    any part would exceed `limit` bytes. Each part is a complete file on its
+    own (CSV parts repeat the header). Ranked exports list each ballot in
+    rank order and end with the instant-runoff rounds.
+    """
+
+    def __init__(self, fmt="csv", compress=False, limit=DEFAULT_LIMIT, basename="poll_export", ranked=False):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        self.fmt = fmt
+        self.compress = compress
+        self.limit = limit - MESSAGE_SLACK - (GZIP_SLACK if compress else 0)
+        self.basename = basename
+        self.ranked = ranked
+        self.parts = []         # finished (raw spooled file) objects
+        self.rows = 0
+        self._raw = None
+        self._sink = None
+        self._part_rows = 0
+        self._section = "votes"     # "votes", "non_voters" or "rounds"
+        self._line = io.StringIO()
+        self._csv = csv.writer(self._line)
+
+    # ── encoding ───────────────────────────────────────
+    def _csv_line(self, *cells):
+        self._line.seek(0)
+        self._line.truncate()
+        self._csv.writerow(cells)
+        return self._line.getvalue().encode("utf-8")
+
+    def _encode(self, uid, name, labels):
+        if self.fmt == "jsonl":
+            record = {"user_id": uid, "name": name, "voted": labels is not None, "votes": labels or []}
+            return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        data = b""
+        if labels is None and (self._section != "non_voters" or self._part_rows == 0):
+            # section break: once, and again at the top of any part that starts inside it
+            data = self._csv_line() + self._csv_line("=== Did Not Vote ===")
+        sep = " > " if self.ranked else ", "
+        return data + self._csv_line(name, sep.join(labels) if labels else "")
+
+    def _encode_round(self, number, tallies, exhausted, eliminated, winner):
+        if self.fmt == "jsonl":
+            record = {
+                "round": number, "tallies": dict(tallies), "exhausted": exhausted,
+                "eliminated": eliminated, "winner": winner,
+            }
+            return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        data = b""
+        if self._section != "rounds" or self._part_rows == 0:
+            data = (self._csv_line() + self._csv_line("=== Instant-Runoff Rounds ===")
+                    + self._csv_line("Round", "Option", "Votes", "Result"))
+        for label, votes in tallies:
+            result = "winner" if label == winner else "eliminated" if label in eliminated else ""
+            data += self._csv_line(number, label, votes, result)
+        if exhausted:
+            data += self._csv_line(number, "(exhausted)", exhausted, "")
+        return data
+
+    # ── parts ──────────────────────────────────────────
+    def _open_part(self):
+        self._raw = SpooledTemporaryFile(max_size=SPOOL_MAX)
+        self._sink = gzip.GzipFile(fileobj=self._raw, mode="wb") if self.compress else self._raw
+        self._part_rows = 0
+        if self.fmt == "csv":
+            self._sink.write(self._csv_line("User", "Ranking" if self.ranked else "Vote"))
+
+    def _close_part(self):
+        if self._sink is not self._raw:
+            self._sink.close()  # finishes the gzip stream; the spooled file stays open
+        self._raw.seek(0)
+        self.parts.append(self._raw)
+        self._raw = self._sink = None
+
+    def _put(self, encode):
+        if self._raw is None:
+            self._open_part()
+        data = encode()
+        if self._part_rows and self._raw.tell() + len(data) > self.limit:
+            self._close_part()
+            self._open_part()
+            data = encode()
+        self._sink.write(data)
+        self._part_rows += 1
+        self.rows += 1
+
+    def write(self, uid, name, labels):
+        self._put(lambda: self._encode(uid, name, labels))
+        self._section = "votes" if labels is not None else "non_voters"
+
+    def write_round(self, number, tallies, exhausted, eliminated, winner):
+        """One instant-runoff round (see export_rounds); written after every vote row."""
+        self._put(lambda: self._encode_round(number, tallies, exhausted, eliminated, winner))
+        self._section = "rounds"
+
+    def finish(self):
+        """Close the last part and return [(filename, file object positioned at 0), ...]."""
+        if self._raw is None:
+            self._open_part()   # empty export still yields a (header-only) file
+        self._close_part()
+        ext = self.fmt + (".gz" if self.compress else "")
+        if len(self.parts) == 1:
+            return [(f"{self.basename}.{ext}", self.parts[0])]
+        return [(f"{self.basename}_part{i}.{ext}", fp) for i, fp in enumerate(self.parts, 1)]
+
+
+def write_export(rows, fmt="csv", compress=False, limit=DEFAULT_LIMIT, basename="poll_export", rounds=None):
+    """Drain a row generator (then any runoff rounds) through an ExportWriter; returns its finished parts."""
+    writer = ExportWriter(fmt, compress, limit, basename, ranked=rounds is not None)
+    for row in rows:
+        writer.write(*row)
+    for rnd in rounds or ():
+        writer.write_round(*rnd)
+    return writer.finish()
+
+
+def group_parts(parts, limit=DEFAULT_LIMIT):
+    """
+    Split finished parts into messages: at most MAX_FILES each, and together
+    under the upload limit (less MESSAGE_SLACK). Yields lists of (filename, file object).
+    """
+    budget = limit - MESSAGE_SLACK
+    group, size = [], 0
+    for name, fp in parts:
+        fp.seek(0, io.SEEK_END)
+        part_size = fp.tell()
+        fp.seek(0)
+        if group and (len(group) == MAX_FILES or size + part_size > budget):
+            yield group
+            group, size = [], 0
+        group.append((name, fp))
+        size += part_size
+    if group:
+        yield group
@@ -0,0 +1,76 @@
+from bisect import bisect_left, insort
+
+NO_END = float("inf")   # polls without an end time sort last
+
+
+class ActivePollIndex:
+    """
+    Open polls ordered by end time, with how many @Player members voted in
+    each, so /polls active is served from memory alone.
+
+    Entries are kept in a sorted list of (end timestamp, poll id). Adding,
+    removing or moving one poll is a bisect plus a list insert/delete.
+    Player turnout is a per-poll counter, updated when a user gains or loses
+    their last vote on a poll and when a member gains or loses @Player, so
+    reading a page never walks any poll's voters.
+    """
+
+    def __init__(self):
+        self._order = []        # sorted [(end timestamp, poll id)]
+        self._keys = {}         # poll id → its key in _order
+        self._polls = {}        # poll id → PollState
+        self._guilds = {}       # poll id → guild id (whose @Player set turnout is counted against)
+        self.player_votes = {}  # poll id → voters who are @Player members
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, poll_id):
+        return poll_id in self._keys
+
+    @staticmethod
+    def _key(poll):
+        end = poll.aware_end()
+        return (end.timestamp() if end else NO_END, poll.id)
+
+    def add(self, poll, guild_id, player_ids):
+        """Index an open poll (or re-index it after an edit): end time and turnout from scratch."""
+        self.remove(poll.id)
+        key = self._key(poll)
+        insort(self._order, key)
+        self._keys[poll.id] = key
+        self._polls[poll.id] = poll
+        self._guilds[poll.id] = guild_id
+        self.player_votes[poll.id] = len(player_ids & poll.user_votes.keys())
+
+    def remove(self, poll_id):
+        key = self._keys.pop(poll_id, None)
+        if key is None:
+            return
+        del self._order[bisect_left(self._order, key)]
+        del self._polls[poll_id]
+        del self._guilds[poll_id]
+        del self.player_votes[poll_id]
+
+    def voter_changed(self, poll_id, user_id, voted, player_ids):
+        """A user cast their first vote (voted=True) or removed their last one on a poll."""
+        if poll_id in self._keys and user_id in player_ids:
+            self.player_votes[poll_id] += 1 if voted else -1
+
+    def player_changed(self, guild_id, user_id, is_player):
+        """A member gained or lost @Player: adjust turnout on every open poll they voted in."""
+        step = 1 if is_player else -1
+        for poll_id, poll in self._polls.items():
+            if self._guilds[poll_id] == guild_id and user_id in poll.user_votes:
+                self.player_votes[poll_id] += step
+
+    def page(self, number, size):
+        """Polls on page `number` (0-based), soonest-closing first."""
+        keys = self._order[number * size:(number + 1) * size]
+        return [self._polls[poll_id] for _, poll_id in keys]
+
+    def pages(self, size):
+        return max(1, -(-len(self._order) // size))
+
+    def guild_of(self, poll_id):
+        return self._guilds.get(poll_id)
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+import logging
+
+log = logging.getLogger(__name__)
+
+class VoteJournal:
+    """
+    Write-behind journal for poll votes.
+
+    append() is synchronous and cheap: the event goes into an in-memory buffer
+    and onto a local append-only file (so a crash between flushes loses
+    nothing).  flush() collapses the buffer to its net row changes and applies
+    them to poll_votes as batched single-row inserts/deletes in one
+    transaction, then trims the local file down to whatever arrived while the
+    flush was in flight.  Flushes never overlap: `lock` is held for the whole
+    write, so a second caller waits and then drains whatever is left.
+    """
+
+    def __init__(self, pool, path="poll_journal.jsonl"):
+        self.pool = pool
+        self.path = path
+        self.buffer = []
+        self._file = None
+        self.lock = asyncio.Lock()
+
+        self.events_appended = 0
+        self.events_flushed = 0
+        self.rows_written = 0
+        self.flushes = 0
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def append(self, poll_id, user_id, op, option, position, rank=None):
+        event = {
+            "event_id": uuid.uuid4().hex,
+            "poll_id": str(poll_id),
+            "user_id": int(user_id),
+            "op": op,
+            "option": option,
+            "position": position,
+            "rank": rank,
+            "ts": time.time(),
+        }
+        self.buffer.append(event)
+        f = self._open()
+        f.write(json.dumps(event) + "\n")
+        f.flush()
+        self.events_appended += 1
+        return event
+
+    def record(self, poll, user_id, changes):
+        """Journal the row changes returned by PollState.apply() (with the option's rank on ranked polls)."""
+        for op, position in changes:
+            rank = poll.rank_of(user_id, position) if op == "add" else None
+            self.append(poll.id, user_id, op, poll.options[position], position, rank)
+
+    def recover(self):
+        """Load events that were written locally but never made it to Postgres."""
+        if not os.path.exists(self.path):
+            return 0
+        recovered = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    recovered.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # torn final line from a crash mid-write
+                    log.warning("Skipping corrupt poll journal line: %r", line[:80])
+        known = {e["event_id"] for e in self.buffer}
+        self.buffer[:0] = [e for e in recovered if e["event_id"] not in known]
+        return len(recovered)
+
+    async def flush(self):
+        """Apply buffered events to poll_votes in a single batched transaction."""
+        async with self.lock:
+            return await self.flush_locked()
+
+    async def flush_locked(self):
+        """flush() for a caller that already holds `lock`."""
+        if not self.buffer:
+            return 0
+        batch = self.buffer[:]
+        # last event per (poll, user, option) wins; adds and removes never share a key
+        net = {}
+        for e in batch:
+            net[(int(e["poll_id"]), e["user_id"], e["position"])] = (e["op"], e.get("rank"))
+        adds = [(*key, rank) for key, (op, rank) in net.items() if op == "add"]
+        removes = [key for key, (op, _) in net.items() if op == "remove"]
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if removes:
+                    await conn.executemany(
+                        "DELETE FROM poll_votes WHERE poll_id = $1 AND user_id = $2 AND position = $3",
+                        removes,
+                    )
+                if adds:
+                    # polls deleted while their votes were still buffered are skipped;
+                    # an 'add' for a row that exists is a re-ranked option on a ranked poll
+                    await conn.executemany(
+                        """
+                        INSERT INTO poll_votes(poll_id, user_id, position, rank)
+                        SELECT $1, $2, $3, $4 WHERE EXISTS (SELECT 1 FROM poll_meta WHERE id = $1)
+                        ON CONFLICT (poll_id, user_id, position) DO UPDATE SET rank = EXCLUDED.rank
+                        WHERE poll_votes.rank IS DISTINCT FROM EXCLUDED.rank
+                        """,
+                        adds,
+                    )
+        # anything appended while we were awaiting stays buffered
+        flushed = {e["event_id"] for e in batch}
+        self.buffer = [e for e in self.buffer if e["event_id"] not in flushed]
+        self._rewrite_local()
+        self.events_flushed += len(batch)
+        self.rows_written += len(adds) + len(removes)
+        self.flushes += 1
+        return len(batch)
+
+    def _rewrite_local(self):
+        """Trim the local file to the still-unflushed tail, atomically."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            for e in self.buffer:
+                f.write(json.dumps(e) + "\n")
+        os.replace(temp_file, self.path)
+
+    def remap_positions(self, poll_id, remap, labels):
+        """
+        Carry a poll's buffered events across an option edit (old position → new,
+        as in poll_store.save_options); events on dropped options are discarded.
+        """
+        pid = str(poll_id)
+        kept = []
+        for e in self.buffer:
+            if e["poll_id"] == pid:
+                new = remap.get(e["position"])
+                if new is None:
+                    continue
+                e["position"], e["option"] = new, labels[new]
+            kept.append(e)
+        self.buffer = kept
+        self._rewrite_local()
+
+    def forget(self, poll_id):
+        """Drop buffered events for a poll that no longer exists."""
+        pid = str(poll_id)
+        self.buffer = [e for e in self.buffer if e["poll_id"] != pid]
+        self._rewrite_local()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self):
+        return {
+            "appended": self.events_appended,
+            "flushed": self.events_flushed,
+            "rows": self.rows_written,
+            "flushes": self.flushes,
+            "buffered": len(self.buffer),
+        }
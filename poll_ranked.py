@@ -0,0 +1,119 @@
+from collections import Counter, namedtuple
+
+# One instant-runoff round: votes per continuing option position, ballots with
+# no continuing choice left, positions eliminated after the round, and the
+# winning position (only on the last round, None if nobody was ranked at all).
+Round = namedtuple("Round", "tallies exhausted eliminated winner")
+
+# A ballot packs into one BIGINT for poll_archive: 4 bits per choice, position + 1
+_BITS = 4
+
+
+def pack_ballot(ranking):
+    code = 0
+    for pos in reversed(ranking):
+        code = code << _BITS | (pos + 1)
+    return code
+
+
+def unpack_ballot(code):
+    ranking = []
+    while code:
+        ranking.append((code & ((1 << _BITS) - 1)) - 1)
+        code >>= _BITS
+    return tuple(ranking)
+
+
+class RankedTally:
+    """
+    Ranked ballots for one poll and their instant-runoff result.
+
+    `ballots` maps a user id to their ranking (a tuple of option positions,
+    most preferred first). Ballots are also counted by identical ranking in
+    `groups`, kept in step on every change, so a runoff round walks the
+    distinct rankings once instead of every voter. The rounds are computed
+    on first use and reused until a ballot or the option count changes.
+    """
+
+    __slots__ = ("ballots", "groups", "_rounds")
+
+    def __init__(self):
+        self.ballots: dict[int, tuple[int, ...]] = {}
+        self.groups: Counter = Counter()     # ranking → number of ballots with exactly it
+        self._rounds = None                  # (option count, [Round, ...])
+
+    def __len__(self):
+        return len(self.ballots)
+
+    def ballot(self, user_id):
+        return self.ballots.get(user_id, ())
+
+    def rank_of(self, user_id, position):
+        """1-based rank of an option on a user's ballot, or None if unranked."""
+        ranking = self.ballots.get(user_id, ())
+        return ranking.index(position) + 1 if position in ranking else None
+
+    def set(self, user_id, ranking):
+        """Replace a user's ballot (an empty ranking withdraws it); returns the old one."""
+        old = self.ballots.pop(user_id, ())
+        if old:
+            self.groups[old] -= 1
+            if not self.groups[old]:
+                del self.groups[old]
+        if ranking:
+            self.ballots[user_id] = ranking
+            self.groups[ranking] += 1
+        self._rounds = None
+        return old
+
+    def remap(self, remap):
+        """Carry ballots across an option edit (old position → new; others are dropped from rankings)."""
+        ballots = self.ballots
+        self.ballots, self.groups = {}, Counter()
+        for uid, ranking in ballots.items():
+            self.set(uid, tuple(remap[p] for p in ranking if p in remap))
+        self._rounds = None
+
+    def rounds(self, n_options):
+        """
+        Instant-runoff rounds over options 0..n_options-1. Each round credits
+        every ranking group to its highest still-continuing choice; an option
+        with more than half of the continuing votes wins, otherwise the last
+        place option is eliminated (all zero-vote options at once). Last-place
+        ties go to whichever did worse in the latest earlier round, then to
+        the later option.
+        """
+        if self._rounds is not None and self._rounds[0] == n_options:
+            return self._rounds[1]
+        continuing = set(range(n_options))
+        rounds = []
+        while continuing:
+            tallies = dict.fromkeys(sorted(continuing), 0)
+            exhausted = 0
+            for ranking, count in self.groups.items():
+                for pos in ranking:
+                    if pos in continuing:
+                        tallies[pos] += count
+                        break
+                else:
+                    exhausted += count
+            active = sum(tallies.values())
+            if not active:
+                rounds.append(Round(tallies, exhausted, [], None))
+                break
+            leader = max(tallies, key=lambda p: (tallies[p], -p))
+            if tallies[leader] * 2 > active or len(continuing) == 1:
+                rounds.append(Round(tallies, exhausted, [], leader))
+                break
+            low = min(tallies.values())
+            if low == 0:
+                eliminated = [p for p, v in tallies.items() if v == 0]
+            else:
+                tied = [p for p, v in tallies.items() if v == low]
+                eliminated = [min(tied, key=lambda p: (
+                    tuple(r.tallies.get(p, 0) for r in reversed(rounds)), -p
+                ))]
+            rounds.append(Round(tallies, exhausted, eliminated, None))
+            continuing.difference_update(eliminated)
+        self._rounds = (n_options, rounds)
+        return rounds
@@ -0,0 +1,130 @@
+import asyncio
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class RenderCoalescer:
+    """
+    Coalesces public poll message edits so a burst of votes costs at most one
+    edit per `window` seconds per poll.
+
+    Vote handlers update poll state in memory and call request(); the actual
+    edit is done by the `flush` coroutine passed in, which renders from
+    whatever the state is at the moment it runs.
+    """
+
+    def __init__(self, flush, window: float = 2.0):
+        self.flush = flush          # async def flush(message_id) -> False if skipped
+        self.window = window
+        self._pending = {}          # message_id -> asyncio.Task waiting to flush
+        self._last_edit = {}        # message_id -> time.monotonic() of last flush
+
+        # counters surfaced through !!pollstats
+        self.votes_received = 0
+        self.edits_sent = 0
+        self.edits_saved = 0
+        self.edits_failed = 0
+        self.edits_skipped = 0
+
+    def request(self, message_id):
+        """Mark a poll as needing a re-render. Never blocks, never hits REST."""
+        self.votes_received += 1
+        if message_id in self._pending:
+            # an edit is already queued and will pick up this change too
+            self.edits_saved += 1
+            return
+        due = self._last_edit.get(message_id, 0.0) + self.window
+        delay = max(0.0, due - time.monotonic())
+        self._pending[message_id] = asyncio.create_task(self._run(message_id, delay))
+
+    async def flush_now(self, message_id):
+        """Drop any queued edit and render immediately (poll closed, edited, ...)."""
+        task = self._pending.pop(message_id, None)
+        if task:
+            task.cancel()
+        await self._flush(message_id)
+
+    def discard(self, message_id):
+        """Forget a poll entirely (deleted or purged from memory)."""
+        task = self._pending.pop(message_id, None)
+        if task:
+            task.cancel()
+        self._last_edit.pop(message_id, None)
+
+    async def _run(self, message_id, delay):
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            return
+        # remove ourselves before flushing so votes landing mid-edit queue a new one
+        self._pending.pop(message_id, None)
+        await self._flush(message_id)
+
+    async def _flush(self, message_id):
+        self._last_edit[message_id] = time.monotonic()
+        try:
+            # flush returns False when the message already shows this exact render
+            if await self.flush(message_id) is False:
+                self.edits_skipped += 1
+            else:
+                self.edits_sent += 1
+        except Exception as e:
+            self.edits_failed += 1
+            log.warning("Coalesced edit for poll %s failed: %s", message_id, e)
+
+    def stats(self):
+        return {
+            "votes_received": self.votes_received,
+            "edits_sent": self.edits_sent,
+            "edits_saved": self.edits_saved,
+            "edits_failed": self.edits_failed,
+            "edits_skipped": self.edits_skipped,
+            "pending": len(self._pending),
+        }
+
+
+class RenderCache:
+    """
+    Per-poll memo of the rendered embed description.
+
+    The whole description is reused while the cache key (state version,
+    countdown bucket, render mode) is unchanged; when it does change, option
+    lines whose inputs are unchanged are reused and only the rest are rebuilt.
+    `last_sent` holds the signature of what the public message currently shows,
+    so an edit that would change nothing can be skipped.
+    """
+
+    __slots__ = ("key", "description", "_lines", "last_sent", "hits", "misses")
+
+    def __init__(self):
+        self.key = None
+        self.description = None
+        self._lines = {}
+        self.last_sent = None
+        self.hits = 0
+        self.misses = 0
+
+    def description_for(self, key, build):
+        if key == self.key and self.description is not None:
+            self.hits += 1
+            return self.description
+        self.misses += 1
+        self.description = build()
+        self.key = key
+        return self.description
+
+    def lines(self, keys, build_line):
+        """Render one line per key, reusing lines whose key was seen last time."""
+        old, new = self._lines, {}
+        out = []
+        for key in keys:
+            line = old.get(key)
+            if line is None:
+                line = build_line(key)
+            new[key] = line
+            out.append(line)
+        self._lines = new
+        return out
@@ -0,0 +1,420 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+
+from poll_ranked import RankedTally
+from poll_render import RenderCache
+from poll_timeline import VoteTimeline
+
+# Use numeric keycap emojis for consistent display across platforms
+OPTION_EMOJIS = ["1️⃣","2️⃣","3️⃣","4️⃣","5️⃣","6️⃣","7️⃣","8️⃣","9️⃣","🔟"]
+MAX_OPTIONS = len(OPTION_EMOJIS)
+# Shorten bar length to avoid wrapping on mobile
+BAR_LENGTH = 8
+DEFAULT_COLOR = 0x00BFFF  # bright blue
+
+
+def format_time_delta(delta: timedelta):
+    """Helper: Return a human-friendly string for a timedelta."""
+    total_seconds = int(delta.total_seconds())
+    if total_seconds <= 0:
+        return "0 minutes"
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, _ = divmod(remainder, 60)
+    parts = []
+    if hours > 0:
+        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+    if minutes > 0:
+        parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
+    return " ".join(parts)
+
+
+def _result_line(key):
+    i, opt, cnt, total = key
+    pct = (cnt/total*100) if total>0 else 0
+    filled = int(BAR_LENGTH * pct//100)
+    return f"{OPTION_EMOJIS[i]} {opt}\n{'🟩'*filled}{'⬜'*(BAR_LENGTH-filled)} | {pct:.1f}% ({cnt})\n"
+
+
+class PollState:
+    """
+    In-memory state of one poll.
+
+    Options are addressed by position everywhere: `counts[i]` is the tally for
+    `options[i]`, and `user_votes` maps an int user id to a bitmask of the
+    positions that user picked (exactly one bit in single mode); `voters` is
+    the reverse index, position → user ids. Ranked polls also keep each
+    user's ordering in `ranked` (their mask is the set of options they
+    ranked). Nothing here knows about Discord: the cog renders the embed
+    from describe() and builds the buttons on demand.
+    """
+
+    __slots__ = (
+        "id", "channel_id", "question", "author", "author_id", "voting_type",
+        "mention_text", "end_time", "end_time_str", "one_hour_reminder", "closed",
+        "ended_by", "embed_color", "reminder_status",
+        "options", "counts", "user_votes", "total_votes", "voters",
+        "version", "cache", "timeline", "ranked",
+    )
+
+    def __init__(self, poll_id, options, *, channel_id=0, question="", author="", author_id=0,
+                 voting_type="single", mention_text="", end_time=None, end_time_str=None,
+                 one_hour_reminder=False, closed=False, ended_by=None, embed_color=DEFAULT_COLOR,
+                 reminder_status=None):
+        self.id: int = int(poll_id)
+        self.channel_id: int = int(channel_id or 0)
+        self.question: str = question or ""
+        self.author: str = author or ""
+        self.author_id: int = int(author_id or 0)
+        self.voting_type: str = voting_type or "single"
+        self.mention_text: str = mention_text or ""
+        self.end_time: datetime | None = end_time
+        self.end_time_str: str | None = end_time_str
+        self.one_hour_reminder: bool = bool(one_hour_reminder)
+        self.closed: bool = bool(closed)
+        self.ended_by: str | None = ended_by
+        self.embed_color: int = DEFAULT_COLOR if embed_color is None else int(embed_color)
+        # one-hour reminder outcome: None (not due yet), 'sent', 'late', 'skipped' or 'missed'
+        self.reminder_status: str | None = reminder_status
+
+        self.options: list[str] = list(options)
+        self.counts = array("I", [0] * len(self.options))   # votes per option position
+        self.user_votes: dict[int, int] = {}                 # user id → bitmask of positions
+        self.total_votes: int = 0
+        # option position → set of user ids; built on first lookup, then kept in step
+        self.voters: list[set[int]] | None = None
+
+        self.version: int = 0                                # bumped on every visible change
+        self.cache: RenderCache | None = None                # created on first render
+        self.timeline: VoteTimeline | None = None            # created on the first vote change
+        # ranked polls only: each user's ordering and the instant-runoff tally
+        self.ranked: RankedTally | None = RankedTally() if self.voting_type == "ranked" else None
+
+    @classmethod
+    def from_legacy(cls, doc):
+        """Build from an old `polls.data` JSON document (label-keyed votes, str user ids)."""
+        state = cls(
+            doc["id"], doc.get("options", []),
+            **{k: doc.get(k) for k in (
+                "channel_id", "question", "author", "author_id", "voting_type", "mention_text",
+                "end_time_str", "one_hour_reminder", "closed", "ended_by", "embed_color",
+            )}
+        )
+        end = doc.get("end_time")
+        if isinstance(end, str):
+            end = datetime.fromisoformat(end)
+        state.end_time = end
+        positions = {label: i for i, label in enumerate(state.options)}
+        for uid, vote in doc.get("user_votes", {}).items():
+            for label in (vote if isinstance(vote, list) else [vote]):
+                if label in positions:
+                    state.add_vote(int(uid), positions[label])
+        return state
+
+    # ── votes ───────────────────────────────────────────
+    @property
+    def multiple(self):
+        return self.voting_type == "multiple"
+
+    def position_of(self, label):
+        """Option position for a label, or None if it no longer exists."""
+        try:
+            return self.options.index(label)
+        except ValueError:
+            return None
+
+    def has_vote(self, user_id, position):
+        return bool(self.user_votes.get(user_id, 0) >> position & 1)
+
+    def choices(self, user_id):
+        """Positions the user voted for, lowest first."""
+        mask = self.user_votes.get(user_id, 0)
+        return [i for i in range(len(self.options)) if mask >> i & 1]
+
+    def labels_for(self, user_id):
+        """Labels the user voted for (in ranked order for ranked polls)."""
+        if self.ranked is not None:
+            return [self.options[i] for i in self.ranked.ballot(user_id)]
+        return [self.options[i] for i in self.choices(user_id)]
+
+    def rank_of(self, user_id, position):
+        """1-based rank the user gave an option on a ranked poll, else None."""
+        return self.ranked.rank_of(user_id, position) if self.ranked is not None else None
+
+    def voters_of(self, position):
+        """User ids that voted for an option (reverse index, O(voters of that option))."""
+        if self.voters is None:
+            voters = [set() for _ in self.options]
+            for uid, mask in self.user_votes.items():
+                for i in range(len(voters)):
+                    if mask >> i & 1:
+                        voters[i].add(uid)
+            self.voters = voters
+        return self.voters[position]
+
+    def not_voted(self, member_ids):
+        """Ids from `member_ids` (a set) with no vote on this poll."""
+        return member_ids - self.user_votes.keys()
+
+    def add_vote(self, user_id, position):
+        """Set one (user, option) vote; False if it was already there."""
+        mask = self.user_votes.get(user_id, 0)
+        bit = 1 << position
+        if mask & bit:
+            return False
+        self.user_votes[user_id] = mask | bit
+        self.counts[position] += 1
+        self.total_votes += 1
+        if self.voters is not None:
+            self.voters[position].add(user_id)
+        return True
+
+    def remove_vote(self, user_id, position):
+        """Clear one (user, option) vote; False if it wasn't there."""
+        mask = self.user_votes.get(user_id, 0)
+        bit = 1 << position
+        if not mask & bit:
+            return False
+        mask &= ~bit
+        if mask:
+            self.user_votes[user_id] = mask
+        else:
+            del self.user_votes[user_id]
+        self.counts[position] -= 1
+        self.total_votes -= 1
+        if self.voters is not None:
+            self.voters[position].discard(user_id)
+        return True
+
+    def apply(self, user_id, op, position=None, ranking=None):
+        """
+        The single step through which votes change. It is synchronous, so on
+        the event loop it always runs to completion without another click
+        interleaving, and every decision is taken against the current state:
+          'set'    → single mode: make `position` the user's only vote
+          'toggle' → multiple mode: flip `position`
+          'add' / 'remove' → set / clear `position`
+          'clear'  → drop all of the user's votes
+          'rank'   → ranked mode: make `ranking` (positions, best first) the user's ballot
+        Returns the row changes made, [('add'|'remove', position), ...]
+        (for 'rank', re-ranked options count as 'add' so their new rank is written);
+        empty if the click changed nothing (double-click, stale prompt).
+        """
+        if position is not None and not 0 <= position < len(self.options):
+            return []
+        changes = []
+        if op in ('set', 'clear'):
+            for old in self.choices(user_id):
+                if old != position or op == 'clear':
+                    self.remove_vote(user_id, old)
+                    changes.append(('remove', old))
+            if op == 'set' and self.add_vote(user_id, position):
+                changes.append(('add', position))
+            if op == 'clear' and self.ranked is not None:
+                self.ranked.set(user_id, ())
+        elif op == 'rank':
+            changes = self._rank(user_id, ranking)
+        elif op == 'toggle':
+            if self.remove_vote(user_id, position):
+                changes.append(('remove', position))
+            else:
+                self.add_vote(user_id, position)
+                changes.append(('add', position))
+        elif op == 'add':
+            if self.add_vote(user_id, position):
+                changes.append(('add', position))
+        elif op == 'remove':
+            if self.remove_vote(user_id, position):
+                changes.append(('remove', position))
+        else:
+            raise ValueError(f"Unknown vote op: {op}")
+        return changes
+
+    def _rank(self, user_id, ranking):
+        # options edited away while the ballot was being filled in are skipped
+        n = len(self.options)
+        ranking = tuple(dict.fromkeys(p for p in ranking or () if 0 <= p < n))
+        old = self.ranked.ballot(user_id)
+        if ranking == old:
+            return []
+        changes = []
+        for pos in old:
+            if pos not in ranking:
+                self.remove_vote(user_id, pos)
+                changes.append(('remove', pos))
+        for rank, pos in enumerate(ranking):
+            if self.add_vote(user_id, pos) or old.index(pos) != rank:
+                changes.append(('add', pos))
+        self.ranked.set(user_id, ranking)
+        return changes
+
+    def check(self):
+        """Consistency problems between counts, totals, the voter map and the reverse index (empty if none)."""
+        problems = []
+        expected = array("I", [0] * len(self.options))
+        for uid, mask in self.user_votes.items():
+            if not mask or mask >> len(self.options):
+                problems.append(f"user {uid} has bad mask {mask:b}")
+            if self.voting_type == "single" and mask & (mask - 1):
+                problems.append(f"user {uid} holds several votes in a single-choice poll")
+            for i in range(len(expected)):
+                if mask >> i & 1:
+                    expected[i] += 1
+            if self.ranked is not None and mask != sum(1 << p for p in self.ranked.ballot(uid)):
+                problems.append(f"user {uid} has ballot {self.ranked.ballot(uid)} but mask {mask:b}")
+        if self.counts != expected:
+            problems.append(f"counts {list(self.counts)} != recount {list(expected)}")
+        if self.total_votes != sum(expected):
+            problems.append(f"total_votes {self.total_votes} != {sum(expected)}")
+        if self.ranked is not None and len(self.ranked) != len(self.user_votes):
+            problems.append(f"{len(self.ranked)} ballots for {len(self.user_votes)} voters")
+        if self.voters is not None:
+            for i, ids in enumerate(self.voters):
+                if len(ids) != expected[i] or any(not self.has_vote(uid, i) for uid in ids):
+                    problems.append(f"reverse index for option {i} is out of step")
+        return problems
+
+    def recount(self):
+        """Rebuild counts/total_votes from user_votes (the source of truth)."""
+        counts = array("I", [0] * len(self.options))
+        for mask in self.user_votes.values():
+            for i in range(len(counts)):
+                if mask >> i & 1:
+                    counts[i] += 1
+        self.counts = counts
+        self.total_votes = sum(counts)
+        self.voters = None   # rebuilt on the next lookup
+
+    def record_timeline(self, ts, changes):
+        """Count a click's row changes into the poll's vote timeline."""
+        if self.timeline is None:
+            self.timeline = VoteTimeline()
+        self.timeline.record(ts, changes)
+
+    def vote_rows(self):
+        """(poll_id, user_id, position) for every vote, as stored in poll_votes."""
+        return [(self.id, uid, pos) for uid in self.user_votes for pos in self.choices(uid)]
+
+    # ── options ─────────────────────────────────────────
+    def add_option(self, label):
+        """Append an option; returns its position."""
+        self.options.append(label)
+        self.counts.append(0)
+        if self.voters is not None:
+            self.voters.append(set())
+        self.mark_dirty()
+        return len(self.options) - 1
+
+    def set_options(self, labels, remap):
+        """
+        Replace the option list. `remap` maps old position → new position for
+        options that keep their votes; votes on any other old position are dropped.
+        """
+        new_votes = {}
+        for uid, mask in self.user_votes.items():
+            moved = 0
+            for old, new in remap.items():
+                if mask >> old & 1:
+                    moved |= 1 << new
+            if moved:
+                new_votes[uid] = moved
+        self.options = list(labels)
+        self.user_votes = new_votes
+        if self.ranked is not None:
+            self.ranked.remap(remap)
+        self.recount()
+        self.mark_dirty()
+
+    # ── rendering ───────────────────────────────────────
+    def mark_dirty(self):
+        """Bump the state version so the cached render is rebuilt."""
+        self.version += 1
+
+    def render_cache(self):
+        if self.cache is None:
+            self.cache = RenderCache()
+        return self.cache
+
+    def format_results(self):
+        """Render the option lines with bars, percentages and counts (unchanged lines are reused)."""
+        total = self.total_votes
+        keys = [(i, opt, self.counts[i], total) for i, opt in enumerate(self.options)]
+        return "".join(self.render_cache().lines(keys, _result_line))
+
+    def format_rounds(self, final):
+        """Render the option list and the instant-runoff rounds of a ranked poll."""
+        parts = [f"{OPTION_EMOJIS[i]} {opt}\n" for i, opt in enumerate(self.options)]
+        ballots = len(self.ranked)
+        if not ballots:
+            parts.append("\n*No ballots yet.*\n")
+            return "".join(parts)
+        parts.append(f"\n**Instant runoff** · {ballots} ballot{'s' if ballots != 1 else ''}\n")
+        for n, rnd in enumerate(self.ranked.rounds(len(self.options)), 1):
+            cells = " · ".join(
+                f"{OPTION_EMOJIS[p]} {v}" for p, v in sorted(rnd.tallies.items(), key=lambda kv: (-kv[1], kv[0]))
+            )
+            if rnd.exhausted:
+                cells += f" · {rnd.exhausted} exhausted"
+            if rnd.winner is not None:
+                active = sum(rnd.tallies.values())
+                pct = rnd.tallies[rnd.winner] / active * 100
+                verb = "wins" if final else "leads"
+                outcome = f"🏆 **{self.options[rnd.winner]}** {verb} ({pct:.1f}%)"
+            else:
+                outcome = "out: " + " ".join(OPTION_EMOJIS[p] for p in rnd.eliminated)
+            parts.append(f"**Round {n}:** {cells} → {outcome}\n")
+        return "".join(parts)
+
+    def aware_end(self):
+        end = self.end_time
+        if end is not None and end.tzinfo is None:
+            # ensure end_time is timezone‑aware in UTC
+            end = end.replace(tzinfo=timezone.utc)
+        return end
+
+    def describe(self, mode, now=None):
+        """
+        The embed description, reused while the version and countdown bucket
+        are unchanged. mode "relative" renders the countdown as a Discord
+        relative timestamp that clients update themselves; "literal" renders
+        plain text that only changes when the message is edited.
+        """
+        end = self.aware_end()
+        now = now or datetime.now(timezone.utc)
+        is_open = end is not None and not self.closed and end > now
+
+        # the header only changes when the poll opens/closes, or (literal mode) the shown minute ticks
+        if end is None:
+            bucket = None
+        elif not is_open:
+            bucket = 'closed'
+        elif mode == 'literal':
+            bucket = int((end - now).total_seconds() // 60)
+        else:
+            bucket = 'open'
+
+        def build_description():
+            parts = []
+            if is_open and mode == 'literal':
+                parts.append(f"⏳ Time remaining: {format_time_delta(end - now)}\n\n")
+            elif is_open:
+                ts = int(end.timestamp())
+                parts.append(f"⏳ Ends <t:{ts}:R> (<t:{ts}:f>)\n\n")
+            elif end is not None:
+                parts.append("❌ Poll closed\n\n")
+            if self.ranked is not None:
+                parts.append(self.format_rounds(final=self.closed or (end is not None and not is_open)))
+            else:
+                parts.append(self.format_results())
+            # ─── tell them single vs multiple ────────────────────────────
+            if self.ranked is not None:
+                parts.append("\n*Rank the options in **order of preference**.*\n")
+            elif self.multiple:
+                parts.append("\n*You may select **multiple options**.*\n")
+            else:
+                parts.append("\n*You may select **only one option**.*\n")
+            # ── One‑hour‑reminder status line ────────────────────────────────────
+            status = "**On**" if self.one_hour_reminder else "Off"
+            parts.append(f"*One Hour Reminder: {status}*\n")
+            return "".join(parts)
+
+        return self.render_cache().description_for((self.version, bucket, mode), build_description)
@@ -0,0 +1,497 @@
+import json
+import logging
+from datetime import datetime
+
+import pytz
+
+from poll_ranked import pack_ballot, unpack_ballot
+from poll_state import PollState, MAX_OPTIONS
+from poll_timeline import VoteTimeline
+
+log = logging.getLogger(__name__)
+
+# ─── Normalized poll schema ─────────────────────────────
+# One row per poll, one row per option, one row per (user, chosen option).
+# A vote is a single-row insert/delete; an option edit only touches option rows.
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS poll_meta (
+  id                BIGINT PRIMARY KEY,
+  channel_id        BIGINT NOT NULL,
+  question          TEXT NOT NULL,
+  author            TEXT NOT NULL,
+  author_id         BIGINT NOT NULL,
+  voting_type       TEXT NOT NULL DEFAULT 'single',
+  mention_text      TEXT NOT NULL DEFAULT '',
+  end_time          TIMESTAMPTZ,
+  end_time_str      TEXT,
+  one_hour_reminder BOOLEAN NOT NULL DEFAULT FALSE,
+  closed            BOOLEAN NOT NULL DEFAULT FALSE,
+  ended_by          TEXT,
+  embed_color       INTEGER NOT NULL DEFAULT 49151,
+  created_at        TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS poll_meta_open_end_idx ON poll_meta (end_time) WHERE NOT closed;
+CREATE INDEX IF NOT EXISTS poll_meta_open_id_idx ON poll_meta (id) WHERE NOT closed;
+
+CREATE TABLE IF NOT EXISTS poll_options (
+  poll_id  BIGINT   NOT NULL REFERENCES poll_meta(id) ON DELETE CASCADE,
+  position SMALLINT NOT NULL,
+  label    TEXT     NOT NULL,
+  PRIMARY KEY (poll_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS poll_votes (
+  poll_id  BIGINT   NOT NULL REFERENCES poll_meta(id) ON DELETE CASCADE,
+  user_id  BIGINT   NOT NULL,
+  position SMALLINT NOT NULL,
+  voted_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (poll_id, user_id, position)
+);
+CREATE INDEX IF NOT EXISTS poll_votes_option_idx ON poll_votes (poll_id, position);
+
+-- Cold tier: one row per closed poll with its final results, options and
+-- votes packed into arrays (voter_ids[i] picked the positions in vote_masks[i]).
+CREATE TABLE IF NOT EXISTS poll_archive (
+  id                BIGINT PRIMARY KEY,
+  channel_id        BIGINT NOT NULL,
+  question          TEXT NOT NULL,
+  author            TEXT NOT NULL,
+  author_id         BIGINT NOT NULL,
+  voting_type       TEXT NOT NULL DEFAULT 'single',
+  mention_text      TEXT NOT NULL DEFAULT '',
+  end_time          TIMESTAMPTZ,
+  end_time_str      TEXT,
+  one_hour_reminder BOOLEAN NOT NULL DEFAULT FALSE,
+  closed            BOOLEAN NOT NULL DEFAULT TRUE,
+  ended_by          TEXT,
+  embed_color       INTEGER NOT NULL DEFAULT 49151,
+  created_at        TIMESTAMPTZ NOT NULL,
+  archived_at       TIMESTAMPTZ NOT NULL DEFAULT now(),
+  options           TEXT[]    NOT NULL,
+  counts            INTEGER[] NOT NULL,
+  total_votes       INTEGER   NOT NULL,
+  voter_ids         BIGINT[]  NOT NULL,
+  vote_masks        INTEGER[] NOT NULL
+);
+CREATE INDEX IF NOT EXISTS poll_archive_archived_at_idx ON poll_archive (archived_at);
+
+-- Vote arrival timeline per poll (poll_timeline.VoteTimeline), bounded in size.
+-- Not tied to poll_meta so it survives archiving; dropped with the poll.
+CREATE TABLE IF NOT EXISTS poll_timeline (
+  poll_id    BIGINT PRIMARY KEY,
+  series     JSONB NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS poll_meta_closed_end_idx ON poll_meta (COALESCE(end_time, created_at)) WHERE closed;
+
+-- Ranked polls: the 1-based rank of each chosen option (NULL for single/multiple),
+-- and in the archive each voter's ballot packed by poll_ranked.pack_ballot.
+ALTER TABLE poll_votes ADD COLUMN IF NOT EXISTS rank SMALLINT;
+ALTER TABLE poll_archive ADD COLUMN IF NOT EXISTS ballots BIGINT[];
+
+-- What became of a poll's one-hour reminder (PollState.reminder_status); NULL until it is due.
+ALTER TABLE poll_meta ADD COLUMN IF NOT EXISTS reminder_status TEXT;
+ALTER TABLE poll_archive ADD COLUMN IF NOT EXISTS reminder_status TEXT;
+"""
+
+# Columns of poll_meta that mirror PollState attributes
+META_FIELDS = (
+    "channel_id", "question", "author", "author_id", "voting_type", "mention_text",
+    "end_time", "end_time_str", "one_hour_reminder", "closed", "ended_by", "embed_color",
+    "reminder_status",
+)
+
+
+async def ensure_schema(pool):
+    await pool.execute(SCHEMA_SQL)
+
+
+def _aware(dt):
+    if dt is None:
+        return None
+    if isinstance(dt, str):
+        dt = datetime.fromisoformat(dt)
+    return dt if dt.tzinfo else dt.replace(tzinfo=pytz.utc)
+
+
+def _meta_args(poll):
+    return (
+        poll.id,
+        poll.channel_id,
+        poll.question,
+        poll.author,
+        poll.author_id,
+        poll.voting_type,
+        poll.mention_text,
+        _aware(poll.end_time),
+        poll.end_time_str,
+        poll.one_hour_reminder,
+        poll.closed,
+        poll.ended_by,
+        poll.embed_color,
+        poll.reminder_status,
+    )
+
+
+async def _insert_poll(conn, poll, created_at=None):
+    await conn.execute(
+        """
+        INSERT INTO poll_meta(id, channel_id, question, author, author_id, voting_type,
+                              mention_text, end_time, end_time_str, one_hour_reminder,
+                              closed, ended_by, embed_color, reminder_status, created_at)
+        VALUES($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, COALESCE($15, now()))
+        ON CONFLICT (id) DO NOTHING
+        """,
+        *_meta_args(poll), created_at
+    )
+    await conn.executemany(
+        "INSERT INTO poll_options(poll_id, position, label) VALUES($1, $2, $3) ON CONFLICT DO NOTHING",
+        [(poll.id, i, label) for i, label in enumerate(poll.options)]
+    )
+
+
+async def insert_poll(pool, poll):
+    """Persist a freshly created poll (metadata + options) in one transaction."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await _insert_poll(conn, poll)
+
+
+async def update_meta(pool, poll_id, **fields):
+    """
+    Update only the given poll_meta columns, e.g. update_meta(pool, pid, embed_color=0xFF0000).
+    Archived polls carry the same columns, so their archive row is updated instead.
+    """
+    unknown = set(fields) - set(META_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown poll_meta column(s): {', '.join(sorted(unknown))}")
+    if not fields:
+        return
+    if "end_time" in fields:
+        fields["end_time"] = _aware(fields["end_time"])
+    cols = list(fields)
+    assignments = ", ".join(f"{col} = ${i + 2}" for i, col in enumerate(cols))
+    values = [fields[c] for c in cols]
+    status = await pool.execute(f"UPDATE poll_meta SET {assignments} WHERE id = $1", int(poll_id), *values)
+    if status == "UPDATE 0":
+        await pool.execute(f"UPDATE poll_archive SET {assignments} WHERE id = $1", int(poll_id), *values)
+
+
+async def close_overdue(pool, poll_ids):
+    """
+    Startup catch-up: close polls whose end time passed while the bot was
+    down, in one statement. A one-hour reminder that never went out is
+    recorded as 'missed'.
+    """
+    await pool.execute(
+        """
+        UPDATE poll_meta SET closed = TRUE,
+               reminder_status = CASE WHEN one_hour_reminder AND reminder_status IS NULL
+                                      THEN 'missed' ELSE reminder_status END
+        WHERE id = ANY($1::bigint[])
+        """,
+        [int(pid) for pid in poll_ids]
+    )
+
+
+async def set_reminder_status(pool, poll_ids, status):
+    """Record the same reminder outcome for several polls in one statement."""
+    await pool.execute(
+        "UPDATE poll_meta SET reminder_status = $2 WHERE id = ANY($1::bigint[])",
+        [int(pid) for pid in poll_ids], status
+    )
+
+
+async def add_option(pool, poll_id, position, label):
+    await pool.execute(
+        "INSERT INTO poll_options(poll_id, position, label) VALUES($1, $2, $3) "
+        "ON CONFLICT (poll_id, position) DO UPDATE SET label = EXCLUDED.label",
+        int(poll_id), position, label
+    )
+
+
+async def save_options(pool, poll_id, labels, remap, **meta):
+    """
+    Rewrite a poll's option rows after an edit.
+    `remap` maps old position → new position for options that kept their votes;
+    votes on old positions missing from `remap` are dropped. When every kept
+    option stays where it was (rename / append / trim) no vote row is touched.
+    `meta` columns (as for update_meta) are updated in the same transaction.
+    """
+    pid = int(poll_id)
+    moved = {old: new for old, new in remap.items() if old != new}
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if not await _save_archived_options(conn, pid, labels, remap):
+                await conn.execute(
+                    "DELETE FROM poll_votes WHERE poll_id = $1 AND NOT (position = ANY($2::smallint[]))",
+                    pid, list(remap)
+                )
+                if moved:
+                    # two-step shift so swapped positions never collide on the primary key
+                    await conn.executemany(
+                        "UPDATE poll_votes SET position = $3 + 1000 WHERE poll_id = $1 AND position = $2",
+                        [(pid, old, new) for old, new in moved.items()]
+                    )
+                    await conn.execute(
+                        "UPDATE poll_votes SET position = position - 1000 WHERE poll_id = $1 AND position >= 1000",
+                        pid
+                    )
+                await conn.execute(
+                    "DELETE FROM poll_options WHERE poll_id = $1 AND position >= $2", pid, len(labels)
+                )
+                await conn.executemany(
+                    "INSERT INTO poll_options(poll_id, position, label) VALUES($1, $2, $3) "
+                    "ON CONFLICT (poll_id, position) DO UPDATE SET label = EXCLUDED.label "
+                    "WHERE poll_options.label IS DISTINCT FROM EXCLUDED.label",
+                    [(pid, i, label) for i, label in enumerate(labels)]
+                )
+            await update_meta(conn, pid, **meta)
+
+
+async def _save_archived_options(conn, pid, labels, remap):
+    """save_options for a poll that lives in poll_archive; False if it isn't archived."""
+    row = await conn.fetchrow(
+        "SELECT voting_type, voter_ids, vote_masks, ballots FROM poll_archive WHERE id = $1 FOR UPDATE", pid
+    )
+    if row is None:
+        return False
+    poll = PollState(pid, labels, voting_type=row["voting_type"])
+    if row["ballots"] is not None:
+        for uid, code in zip(row["voter_ids"], row["ballots"]):
+            poll.apply(uid, 'rank', ranking=[remap[p] for p in unpack_ballot(code) if p in remap])
+    else:
+        for uid, mask in zip(row["voter_ids"], row["vote_masks"]):
+            for old, new in remap.items():
+                if mask >> old & 1:
+                    poll.add_vote(uid, new)
+    await conn.execute(
+        "UPDATE poll_archive SET options = $2, counts = $3, total_votes = $4, "
+        "voter_ids = $5, vote_masks = $6, ballots = $7 WHERE id = $1",
+        pid, *_archive_results(poll)
+    )
+    return True
+
+
+async def delete_poll(pool, poll_id):
+    """Remove a poll from either tier; options and votes go with it via ON DELETE CASCADE."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("DELETE FROM poll_meta WHERE id = $1", int(poll_id))
+            await conn.execute("DELETE FROM poll_archive WHERE id = $1", int(poll_id))
+            await conn.execute("DELETE FROM poll_timeline WHERE poll_id = $1", int(poll_id))
+
+
+def _assemble(meta, options, votes):
+    """Build a PollState from normalized rows."""
+    labels = [o["label"] for o in sorted(options, key=lambda o: o["position"])]
+    poll = PollState(meta["id"], labels, **{k: meta[k] for k in META_FIELDS})
+    poll.end_time = _aware(meta["end_time"])
+    if poll.ranked is not None:
+        rankings = {}
+        for v in votes:
+            rankings.setdefault(v["user_id"], []).append((v["rank"] or MAX_OPTIONS + 1, v["position"]))
+        for uid, ranked in rankings.items():
+            poll.apply(uid, 'rank', ranking=[pos for _, pos in sorted(ranked)])
+        return poll
+    for v in votes:
+        if v["position"] < len(labels):
+            poll.add_vote(v["user_id"], v["position"])
+    return poll
+
+
+async def _load_rows(pool, metas):
+    """Fetch option and vote rows for a batch of poll_meta rows and assemble them."""
+    ids = [m["id"] for m in metas]
+    options = await pool.fetch(
+        "SELECT poll_id, position, label FROM poll_options WHERE poll_id = ANY($1::bigint[])", ids
+    )
+    votes = await pool.fetch(
+        "SELECT poll_id, user_id, position, rank FROM poll_votes WHERE poll_id = ANY($1::bigint[]) ORDER BY voted_at",
+        ids
+    )
+    opts_by, votes_by = {}, {}
+    for o in options:
+        opts_by.setdefault(o["poll_id"], []).append(o)
+    for v in votes:
+        votes_by.setdefault(v["poll_id"], []).append(v)
+    polls = [_assemble(m, opts_by.get(m["id"], []), votes_by.get(m["id"], [])) for m in metas]
+    await _attach_timelines(pool, polls)
+    return polls
+
+
+async def load_open_polls(pool, page_size=200):
+    """Yield open polls as lists of PollState, one page at a time (keyset pagination on id)."""
+    last_id = 0
+    while True:
+        metas = await pool.fetch(
+            f"SELECT id, {', '.join(META_FIELDS)} FROM poll_meta "
+            "WHERE NOT closed AND id > $1 ORDER BY id LIMIT $2",
+            last_id, page_size
+        )
+        if not metas:
+            return
+        yield await _load_rows(pool, metas)
+        last_id = metas[-1]["id"]
+
+
+async def load_poll(pool, poll_id):
+    """Load a single poll (open, closed or archived), or None if it isn't stored."""
+    meta = await pool.fetchrow(
+        f"SELECT id, {', '.join(META_FIELDS)} FROM poll_meta WHERE id = $1", int(poll_id)
+    )
+    if meta is None:
+        return await load_archived(pool, poll_id)
+    return (await _load_rows(pool, [meta]))[0]
+
+
+# ─── Archive tier ───────────────────────────────────────
+def _archive_results(poll):
+    """(options, counts, total_votes, voter_ids, vote_masks, ballots) as stored in poll_archive."""
+    return (
+        list(poll.options),
+        list(poll.counts),
+        poll.total_votes,
+        list(poll.user_votes),
+        list(poll.user_votes.values()),
+        [pack_ballot(poll.ranked.ballot(uid)) for uid in poll.user_votes] if poll.ranked is not None else None,
+    )
+
+
+async def load_archived(pool, poll_id):
+    """Rebuild a closed poll from its archive row, or None."""
+    row = await pool.fetchrow(
+        f"SELECT {', '.join(META_FIELDS)}, options, voter_ids, vote_masks, ballots FROM poll_archive WHERE id = $1",
+        int(poll_id)
+    )
+    if row is None:
+        return None
+    poll = PollState(poll_id, row["options"], **{k: row[k] for k in META_FIELDS})
+    poll.end_time = _aware(row["end_time"])
+    if poll.ranked is not None and row["ballots"] is not None:
+        for uid, code in zip(row["voter_ids"], row["ballots"]):
+            poll.apply(uid, 'rank', ranking=unpack_ballot(code))
+    else:
+        for uid, mask in zip(row["voter_ids"], row["vote_masks"]):
+            for pos in range(len(poll.options)):
+                if mask >> pos & 1:
+                    poll.add_vote(uid, pos)
+    await _attach_timelines(pool, [poll])
+    return poll
+
+
+async def archive_closed_polls(pool, older_than, batch_size=100):
+    """
+    Move up to `batch_size` polls that closed before `older_than` out of the
+    normalized tables into one poll_archive row each. The archive insert and
+    the poll_meta delete (which cascades to options and votes) share a
+    transaction. Returns how many polls were archived.
+    """
+    metas = await pool.fetch(
+        f"SELECT id, {', '.join(META_FIELDS)}, created_at FROM poll_meta "
+        "WHERE closed AND COALESCE(end_time, created_at) < $1 ORDER BY id LIMIT $2",
+        _aware(older_than), batch_size
+    )
+    if not metas:
+        return 0
+    polls = await _load_rows(pool, metas)
+    rows = [
+        (*_meta_args(poll), meta["created_at"], *_archive_results(poll))
+        for meta, poll in zip(metas, polls)
+    ]
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.executemany(
+                """
+                INSERT INTO poll_archive(id, channel_id, question, author, author_id, voting_type,
+                                         mention_text, end_time, end_time_str, one_hour_reminder,
+                                         closed, ended_by, embed_color, reminder_status, created_at,
+                                         options, counts, total_votes, voter_ids, vote_masks, ballots)
+                VALUES($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15,
+                       $16, $17, $18, $19, $20, $21)
+                ON CONFLICT (id) DO NOTHING
+                """,
+                rows
+            )
+            await conn.execute(
+                "DELETE FROM poll_meta WHERE id = ANY($1::bigint[])", [m["id"] for m in metas]
+            )
+    return len(metas)
+
+
+async def prune_archive(pool, older_than, batch_size=500):
+    """Delete up to `batch_size` archive rows (and their timelines) archived before `older_than`; returns the count."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            ids = await conn.fetch(
+                "DELETE FROM poll_archive WHERE id IN ("
+                "  SELECT id FROM poll_archive WHERE archived_at < $1 ORDER BY archived_at LIMIT $2) "
+                "RETURNING id",
+                _aware(older_than), batch_size
+            )
+            if ids:
+                await conn.execute(
+                    "DELETE FROM poll_timeline WHERE poll_id = ANY($1::bigint[])", [r["id"] for r in ids]
+                )
+    return len(ids)
+
+
+# ─── Vote timelines ─────────────────────────────────────
+async def _attach_timelines(pool, polls):
+    if not polls:
+        return
+    rows = await pool.fetch(
+        "SELECT poll_id, series FROM poll_timeline WHERE poll_id = ANY($1::bigint[])", [p.id for p in polls]
+    )
+    by_id = {p.id: p for p in polls}
+    for row in rows:
+        by_id[row["poll_id"]].timeline = VoteTimeline.from_doc(json.loads(row["series"]))
+
+
+async def save_timelines(pool, polls):
+    """Upsert the vote timeline of each poll in one batch."""
+    rows = [(p.id, json.dumps(p.timeline.to_doc())) for p in polls if p.timeline is not None]
+    if rows:
+        await pool.executemany(
+            "INSERT INTO poll_timeline(poll_id, series) VALUES($1, $2::jsonb) "
+            "ON CONFLICT (poll_id) DO UPDATE SET series = EXCLUDED.series, updated_at = now()",
+            rows
+        )
+
+
+async def migrate_legacy(pool):
+    """
+    One-time migration of the old whole-document storage.
+    Each `polls.data` JSONB document is exploded into poll_meta / poll_options /
+    poll_votes rows, and the legacy row is deleted in the same transaction, so
+    the migration can be interrupted and simply re-run on the next start.
+    """
+    if not await pool.fetchval("SELECT to_regclass('public.polls') IS NOT NULL"):
+        return 0
+
+    rows = await pool.fetch("SELECT id, data, embed_color, created_at FROM polls")
+    migrated = 0
+    for row in rows:
+        try:
+            doc = json.loads(row["data"])
+            doc["id"] = row["id"]
+            doc["embed_color"] = row["embed_color"]
+            doc["user_votes"] = {int(uid): v for uid, v in doc.get("user_votes", {}).items()}
+            poll = PollState.from_legacy(doc)
+            vote_rows = poll.vote_rows()
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await _insert_poll(conn, poll, row["created_at"])
+                    await conn.executemany(
+                        "INSERT INTO poll_votes(poll_id, user_id, position) VALUES($1, $2, $3) "
+                        "ON CONFLICT DO NOTHING",
+                        vote_rows
+                    )
+                    await conn.execute("DELETE FROM polls WHERE id = $1", row["id"])
+            migrated += 1
+        except Exception as e:
+            log.exception("Could not migrate legacy poll %s: %s", row["id"], e)
+
+    if migrated:
+        log.info("Migrated %d legacy poll document(s) to normalized tables", migrated)
+    return migrated
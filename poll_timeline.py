@@ -0,0 +1,136 @@
+import csv
+import io
+from array import array
+from datetime import datetime, timezone
+
+# (bucket seconds, buckets kept): 2 h by the minute, 2 days by the quarter
+# hour, 30 days by the 6 hours. Each step divides the next, so coarse buckets
+# line up with fine ones when the series is stitched together.
+TIERS = ((60, 120), (900, 192), (21600, 120))
+
+
+class Ring:
+    """
+    One fixed-size round-robin archive: `slots` buckets of `step` seconds.
+    A bucket is reused once its slot comes round again, so the ring only
+    holds the most recent slots × step seconds of deltas.
+    """
+
+    __slots__ = ("step", "slots", "stamps", "adds", "removes", "horizon")
+
+    def __init__(self, step, slots):
+        self.step = step
+        self.slots = slots
+        self.stamps = array("i", [-1] * slots)   # bucket number held by each slot, -1 if empty
+        self.adds = array("I", [0] * slots)
+        self.removes = array("I", [0] * slots)
+        # start (epoch seconds) of the oldest time this ring still has every delta for
+        self.horizon = 0
+
+    def add(self, ts, adds=0, removes=0):
+        bucket = int(ts // self.step)
+        i = bucket % self.slots
+        held = self.stamps[i]
+        if held != bucket:
+            if held > bucket:
+                return      # older than anything this ring still keeps
+            if held >= 0:
+                self.horizon = max(self.horizon, (held + 1) * self.step)
+            self.stamps[i] = bucket
+            self.adds[i] = self.removes[i] = 0
+        self.adds[i] += adds
+        self.removes[i] += removes
+
+    def points(self):
+        """[(bucket start, adds, removes), ...] oldest first."""
+        return sorted(
+            (self.stamps[i] * self.step, self.adds[i], self.removes[i])
+            for i in range(self.slots) if self.stamps[i] >= 0
+        )
+
+
+class VoteTimeline:
+    """
+    When a poll's votes arrived, with bounded memory and storage.
+
+    Every vote delta is counted into each tier of TIERS. Fine tiers forget
+    old buckets first, so recent activity is kept by the minute and older
+    activity only in coarser buckets, like a round-robin database.
+    series() stitches the tiers back into one timeline at the finest
+    resolution still available for each stretch of time.
+    """
+
+    __slots__ = ("rings",)
+
+    def __init__(self, tiers=TIERS):
+        self.rings = [Ring(step, slots) for step, slots in tiers]
+
+    def record(self, ts, changes):
+        """Count the row changes of one click, as returned by PollState.apply."""
+        adds = sum(1 for op, _ in changes if op == "add")
+        removes = len(changes) - adds
+        if adds or removes:
+            for ring in self.rings:
+                ring.add(ts, adds, removes)
+
+    def series(self):
+        """[(bucket start, step, adds, removes), ...] oldest first, without overlaps."""
+        out = []
+        edge = None     # points from here on were already taken from a finer ring
+        for i, ring in enumerate(self.rings):
+            out[:0] = [(start, ring.step, adds, removes) for start, adds, removes in ring.points()
+                       if edge is None or start < edge]
+            coarser = self.rings[i + 1] if i + 1 < len(self.rings) else None
+            if not ring.horizon or coarser is None:
+                break   # this ring still has the whole history (or there's nothing coarser)
+            # before the first coarse boundary past this ring's horizon, use the coarser ring
+            edge = -(-ring.horizon // coarser.step) * coarser.step
+            out = [p for p in out if p[0] >= edge]
+        return out
+
+    def votes_since(self, ts):
+        """Votes added in buckets that start at or after `ts`."""
+        return sum(adds for start, _, adds, _ in self.series() if start >= ts)
+
+    # ── persistence ────────────────────────────────────
+    def to_doc(self):
+        """Compact JSON-able form: only the filled buckets of each ring."""
+        return {
+            str(ring.step): {
+                "horizon": ring.horizon,
+                "buckets": [[ring.stamps[i], ring.adds[i], ring.removes[i]]
+                            for i in range(ring.slots) if ring.stamps[i] >= 0],
+            }
+            for ring in self.rings
+        }
+
+    @classmethod
+    def from_doc(cls, doc):
+        timeline = cls()
+        for ring in timeline.rings:
+            saved = doc.get(str(ring.step))
+            if not saved:
+                continue
+            ring.horizon = saved.get("horizon", 0)
+            for bucket, adds, removes in saved.get("buckets", []):
+                i = bucket % ring.slots
+                if bucket > ring.stamps[i]:
+                    ring.stamps[i] = bucket
+                    ring.adds[i] = adds
+                    ring.removes[i] = removes
+        return timeline
+
+
+def timeline_csv(series):
+    """CSV of a series(): one row per bucket with running totals."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["bucket_start_utc", "bucket_seconds", "added", "removed", "net", "cumulative_net"])
+    running = 0
+    for start, step, adds, removes in series:
+        running += adds - removes
+        writer.writerow([
+            datetime.fromtimestamp(start, timezone.utc).strftime("%Y-%m-%d %H:%M"),
+            step, adds, removes, adds - removes, running,
+        ])
+    return out.getvalue()
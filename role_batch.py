@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import random
+import time
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class RestBatch:
+    """
+    Runs one REST call per item (`await action(item)`) with a small pool of
+    workers.
+
+    discord.py already queues requests behind the shared per-route bucket;
+    a handful of workers keep that bucket busy instead of paying one full
+    round trip per item in sequence, without flooding it either. A 429 or
+    5xx that still escapes the library's own retries is retried here with
+    exponential backoff (honouring Retry-After when Discord sends one).
+    Permission errors and items that no longer exist are counted, not retried.
+    """
+
+    def __init__(self, items, action, *, concurrency=4, max_retries=4,
+                 on_progress=None, progress_every=5.0, label="REST batch"):
+        self.items = list(items)
+        self.action = action
+        self.label = label
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.on_progress = on_progress          # async def on_progress(batch)
+        self.progress_every = progress_every    # seconds between progress callbacks
+
+        self.done = 0
+        self.failed = 0
+        self.forbidden = 0
+        self.retries = 0
+        self.started = None
+        self.finished = None
+        self._task = None
+
+    @property
+    def total(self):
+        return len(self.items)
+
+    @property
+    def pending(self):
+        return self.total - self.done - self.failed - self.forbidden
+
+    def stats(self):
+        end = self.finished or time.monotonic()
+        return {
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "forbidden": self.forbidden,
+            "retries": self.retries,
+            "pending": self.pending,
+            "seconds": (end - self.started) if self.started else 0.0,
+        }
+
+    async def run(self, deadline=None):
+        """
+        Start the batch and wait until it finishes or `deadline` seconds pass.
+        Returns True if every member was handled; on a deadline the remaining
+        work carries on in the background (see wait()).
+        """
+        if self._task is None:
+            self.started = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+        done, _ = await asyncio.wait({self._task}, timeout=deadline)
+        return bool(done)
+
+    async def wait(self):
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def _run(self):
+        queue = asyncio.Queue()
+        for item in self.items:
+            queue.put_nowait(item)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        reporter = asyncio.create_task(self._report()) if self.on_progress else None
+        try:
+            await queue.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            if reporter:
+                reporter.cancel()
+            self.finished = time.monotonic()
+        if self.on_progress:
+            await self._progress()
+
+    async def _worker(self, queue):
+        while True:
+            item = await queue.get()
+            try:
+                await self._apply(item)
+            finally:
+                queue.task_done()
+
+    async def _apply(self, item):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.action(item)
+                self.done += 1
+                return
+            except discord.Forbidden:
+                self.forbidden += 1
+                log.error("%s: missing permission for %s", self.label, item)
+                return
+            except discord.NotFound:
+                # gone (member left, message deleted) since the batch was built
+                self.failed += 1
+                return
+            except discord.HTTPException as e:
+                if (e.status != 429 and e.status < 500) or attempt == self.max_retries:
+                    self.failed += 1
+                    log.warning("%s: giving up on %s: %s", self.label, item, e)
+                    return
+                self.retries += 1
+                await asyncio.sleep(self._backoff(e, attempt))
+            except Exception as e:
+                self.failed += 1
+                log.exception("%s: error on %s: %s", self.label, item, e)
+                return
+
+    @staticmethod
+    def _backoff(error, attempt):
+        retry_after = 0.0
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            retry_after = float(headers.get("Retry-After", 0))
+        except (TypeError, ValueError):
+            pass
+        return max(retry_after, 0.5 * 2 ** attempt) + random.uniform(0, 0.25)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.progress_every)
+            await self._progress()
+
+    async def _progress(self):
+        try:
+            await self.on_progress(self)
+        except Exception as e:
+            log.warning("%s progress callback failed: %s", self.label, e)
+
+
+class RoleBatch(RestBatch):
+    """Adds (or removes) one role on many members; see RestBatch for pacing and retries."""
+
+    def __init__(self, role, members, *, add=True, reason=None, **kwargs):
+        self.role = role
+        self.add = add
+        self.reason = reason
+        super().__init__(members, self._change, label=f"Role {role}", **kwargs)
+
+    @property
+    def members(self):
+        return self.items
+
+    async def _change(self, member):
+        if self.add:
+            await member.add_roles(self.role, reason=self.reason)
+        else:
+            await member.remove_roles(self.role, reason=self.reason)
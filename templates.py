@@ -0,0 +1,171 @@
+import os
+import re
+from string import Formatter
+
+ANNOUNCEMENTS_FILE = "announcements.txt"
+TEST_ANNOUNCEMENTS_FILE = "testannouncements.txt"
+
+_formatter = Formatter()
+_FIELD_ROOT = re.compile(r"[^.\[]*")
+
+
+class Template:
+    """
+    One announcement template, compiled when its file is parsed.
+
+    `fields` is the set of {NAME} placeholders the template needs. Plain
+    placeholders compile to alternating literal/field parts that render()
+    joins, so rendering skips str.format's parsing; a template that uses
+    format specs, conversions or attribute/index access keeps using
+    str.format. `error` is set (and rendering refused) when the text can't
+    be used as a keyword template at all, e.g. an unmatched brace or {0}.
+    """
+
+    __slots__ = ("text", "fields", "error", "_parts")
+
+    def __init__(self, text):
+        self.text = text
+        self.fields = frozenset()
+        self.error = None
+        self._parts = None          # [literal, field, literal, field, ..., literal]; None → str.format
+        parts, fields, simple = [], set(), True
+        literal_run = ""            # escaped braces split the literal text into several chunks
+        try:
+            for literal, field, spec, conversion in _formatter.parse(text):
+                literal_run += literal
+                if field is None:
+                    continue
+                root = _FIELD_ROOT.match(field).group()
+                if not root or root.isdigit():
+                    raise ValueError(f"positional placeholder {{{field}}}")
+                fields.add(root)
+                parts += (literal_run, root)
+                literal_run = ""
+                simple = simple and root == field and not spec and not conversion
+        except ValueError as e:
+            self.error = str(e)
+            return
+        parts.append(literal_run)
+        self.fields = frozenset(fields)
+        self._parts = parts if simple else None
+
+    def problem(self, substitutions):
+        """Why `substitutions` can't fill this template (missing or unknown keys), or None if they fit."""
+        if self.error:
+            return f"the template is invalid ({self.error})"
+        given = set(substitutions or ())
+        missing, extra = self.fields - given, given - self.fields
+        problems = []
+        if missing:
+            problems.append("missing " + ", ".join(f"{{{name}}}" for name in sorted(missing)))
+        if extra:
+            problems.append("not in the template: " + ", ".join(sorted(extra)))
+        return "; ".join(problems) or None
+
+    def render(self, substitutions):
+        """The filled-in text; raises KeyError for a missing placeholder, like str.format."""
+        if self.error:
+            raise ValueError(self.error)
+        parts = self._parts
+        if parts is None:
+            return self.text.format(**substitutions)
+        out = parts[:]
+        for i in range(1, len(out), 2):
+            out[i] = str(substitutions[out[i]])
+        return "".join(out)
+
+
+class TemplateFile:
+    """
+    One "==="-separated template file (announcements.txt and friends).
+
+    Each section is a title line followed by the template text. The file is
+    parsed once into a lowercased-title → Template dict and parsed again
+    only when its mtime or size changes, so a lookup is one stat() plus a
+    dict get, and edits to the file are picked up without a restart. When a
+    title repeats, the first section wins (as the old linear scans did).
+    Templates that won't compile are reported when the file is parsed.
+    """
+
+    __slots__ = ("path", "_stamp", "_templates", "_titles")
+
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None          # (mtime_ns, size) of the parsed version; "missing" if unreadable
+        self._templates = {}        # lowercased title → Template
+        self._titles = []           # titles as written, in file order
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except OSError as e:
+            if self._stamp != "missing":
+                print(f"Error reading announcements from {self.path}: {e}")
+                self._stamp, self._templates, self._titles = "missing", {}, []
+            return
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                content = file.read()
+        except OSError as e:
+            print(f"Error reading announcements from {self.path}: {e}")
+            return                  # keep serving the last good parse
+        templates, titles = {}, []
+        for section in content.split("==="):
+            lines = section.strip().splitlines()
+            if not lines:
+                continue
+            title = lines[0].strip()
+            if title.lower() not in templates:
+                template = templates[title.lower()] = Template("\n".join(lines[1:]))
+                titles.append(title)
+                if template.error:
+                    print(f"Template '{title}' in {self.path} can't be filled in: {template.error}")
+        self._stamp, self._templates, self._titles = stamp, templates, titles
+
+    def get(self, name):
+        """Template text for a title (case-insensitive), or None."""
+        template = self.template(name)
+        return template.text if template else None
+
+    def template(self, name):
+        """Compiled Template for a title (case-insensitive), or None."""
+        self._refresh()
+        return self._templates.get(name.strip().lower())
+
+    def __contains__(self, name):
+        self._refresh()
+        return name.strip().lower() in self._templates
+
+    def titles(self):
+        """Titles in file order, as written."""
+        self._refresh()
+        return list(self._titles)
+
+
+_files = {}
+
+
+def template_file(test_mode=False):
+    """The shared registry for announcements.txt (or testannouncements.txt in test mode)."""
+    path = TEST_ANNOUNCEMENTS_FILE if test_mode else ANNOUNCEMENTS_FILE
+    registry = _files.get(path)
+    if registry is None:
+        registry = _files[path] = TemplateFile(path)
+    return registry
+
+
+def get_template(name, test_mode=False):
+    return template_file(test_mode).get(name)
+
+
+def compiled_template(name, test_mode=False):
+    return template_file(test_mode).template(name)
+
+
+def template_fields(name, test_mode=False):
+    """Placeholders a template needs (empty if there's no such template)."""
+    template = compiled_template(name, test_mode)
+    return template.fields if template else frozenset()